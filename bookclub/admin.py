@@ -7,8 +7,15 @@ from .models import (
     Comment,
     CommentReaction,
     DollarBet,
+    GroupAnalyticsSnapshot,
     GroupInvitation,
+    HardcoverProgressSync,
+    KavitaLibraryItem,
+    MediaLinkJob,
     MemberStartingPoint,
+    PlexLibraryItem,
+    PushNotification,
+    PushSubscription,
     UserBookProgress,
     UserProfile,
 )
@@ -280,6 +287,88 @@ class CommentReactionAdmin(admin.ModelAdmin):
     raw_id_fields = ["comment", "user"]
 
 
+class MediaLinkJobAdmin(admin.ModelAdmin):
+    list_display = [
+        "book",
+        "service",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "updated_at",
+    ]
+    list_filter = ["service", "status"]
+    search_fields = ["book__title", "last_error"]
+    raw_id_fields = ["book"]
+
+
+class HardcoverProgressSyncAdmin(admin.ModelAdmin):
+    list_display = [
+        "user",
+        "book",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "synced_at",
+    ]
+    list_filter = ["status"]
+    search_fields = ["user__username", "book__title", "last_error"]
+    raw_id_fields = ["user", "book"]
+
+
+class PushSubscriptionAdmin(admin.ModelAdmin):
+    list_display = [
+        "user",
+        "user_agent",
+        "last_success_at",
+        "success_count",
+        "failure_count",
+        "created_at",
+    ]
+    search_fields = ["user__username", "endpoint", "user_agent"]
+    raw_id_fields = ["user"]
+
+
+class PushNotificationAdmin(admin.ModelAdmin):
+    list_display = [
+        "title",
+        "user",
+        "notification_type",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "updated_at",
+    ]
+    list_filter = ["status", "notification_type", "digest"]
+    search_fields = ["user__username", "title", "last_error"]
+    raw_id_fields = ["user"]
+
+
+class PlexLibraryItemAdmin(admin.ModelAdmin):
+    list_display = ["title", "artist", "rating_key", "updated_at", "synced_at"]
+    search_fields = ["title", "artist"]
+
+
+class KavitaLibraryItemAdmin(admin.ModelAdmin):
+    list_display = ["title", "kind", "library_id", "series_id", "synced_at"]
+    list_filter = ["kind"]
+    search_fields = ["title", "normalized_title"]
+
+
+class GroupAnalyticsSnapshotAdmin(admin.ModelAdmin):
+    list_display = [
+        "group",
+        "version",
+        "built_version",
+        "bets_version",
+        "bets_built_version",
+        "media_version",
+        "media_built_version",
+        "data_format",
+        "built_at",
+    ]
+    readonly_fields = ["data"]
+
+
 # Register models with try/except pattern to handle already registered models
 try:
     admin.site.unregister(UserProfile)
@@ -340,3 +429,45 @@ try:
 except admin.sites.NotRegistered:
     pass
 admin.site.register(DollarBet, DollarBetAdmin)
+
+try:
+    admin.site.unregister(MediaLinkJob)
+except admin.sites.NotRegistered:
+    pass
+admin.site.register(MediaLinkJob, MediaLinkJobAdmin)
+
+try:
+    admin.site.unregister(HardcoverProgressSync)
+except admin.sites.NotRegistered:
+    pass
+admin.site.register(HardcoverProgressSync, HardcoverProgressSyncAdmin)
+
+try:
+    admin.site.unregister(PushSubscription)
+except admin.sites.NotRegistered:
+    pass
+admin.site.register(PushSubscription, PushSubscriptionAdmin)
+
+try:
+    admin.site.unregister(PushNotification)
+except admin.sites.NotRegistered:
+    pass
+admin.site.register(PushNotification, PushNotificationAdmin)
+
+try:
+    admin.site.unregister(PlexLibraryItem)
+except admin.sites.NotRegistered:
+    pass
+admin.site.register(PlexLibraryItem, PlexLibraryItemAdmin)
+
+try:
+    admin.site.unregister(KavitaLibraryItem)
+except admin.sites.NotRegistered:
+    pass
+admin.site.register(KavitaLibraryItem, KavitaLibraryItemAdmin)
+
+try:
+    admin.site.unregister(GroupAnalyticsSnapshot)
+except admin.sites.NotRegistered:
+    pass
+admin.site.register(GroupAnalyticsSnapshot, GroupAnalyticsSnapshotAdmin)
@@ -0,0 +1,116 @@
+"""
+Stale-while-revalidate cache for Hardcover edition metadata.
+
+Editions are served from the Django cache when available. Entries older than
+HARDCOVER_EDITION_CACHE_MAX_AGE are still served immediately, but trigger a
+background refresh so the next request sees fresh data.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .hardcover_api import HardcoverAPI
+
+logger = logging.getLogger(__name__)
+
+_stats = {"hits": 0, "misses": 0, "stale": 0, "refreshes": 0, "refresh_errors": 0}
+_stats_lock = threading.Lock()
+
+# Book IDs with a background refresh currently running in this process
+_refreshing = set()
+
+
+def _cache_key(hardcover_id):
+    return f"hardcover:editions:{hardcover_id}"
+
+
+def _record(stat):
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def get_edition_cache_stats():
+    """Get hit/miss/staleness counters for the edition cache in this process"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def has_cached_editions(hardcover_id):
+    """Check whether editions for a book are in the cache, fresh or stale"""
+    return bool(hardcover_id) and cache.get(_cache_key(hardcover_id)) is not None
+
+
+def store_editions(hardcover_id, editions):
+    """Put freshly fetched editions for a book into the cache"""
+    if not editions:
+        # Don't cache failed or empty lookups, they'd hide real editions
+        return
+
+    cache.set(
+        _cache_key(hardcover_id),
+        {"editions": editions, "fetched_at": time.time()},
+        settings.HARDCOVER_EDITION_CACHE_TTL,
+    )
+
+
+def _fetch_and_store(hardcover_id, user):
+    editions = HardcoverAPI.get_book_editions(hardcover_id, user=user)
+    store_editions(hardcover_id, editions)
+    return editions
+
+
+def _refresh_in_background(hardcover_id, user):
+    """Re-fetch editions for a book in a daemon thread, once at a time per book"""
+    with _stats_lock:
+        if hardcover_id in _refreshing:
+            return
+        _refreshing.add(hardcover_id)
+
+    def refresh():
+        try:
+            _fetch_and_store(hardcover_id, user)
+            _record("refreshes")
+        except Exception as e:
+            _record("refresh_errors")
+            logger.exception(f"Error refreshing editions for {hardcover_id}: {str(e)}")
+        finally:
+            with _stats_lock:
+                _refreshing.discard(hardcover_id)
+            connection.close()
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+def get_cached_book_editions(hardcover_id, user=None, force_refresh=False):
+    """
+    Get the editions for a book, preferring the cache over the Hardcover API
+
+    Args:
+        hardcover_id: The Hardcover book ID
+        user: The User whose API key is used if a fetch is needed
+        force_refresh: Skip the cache and fetch from Hardcover
+
+    Returns:
+        list: Editions in the same format as HardcoverAPI.get_book_editions
+    """
+    if not hardcover_id:
+        return HardcoverAPI.get_book_editions(hardcover_id, user=user)
+
+    if not force_refresh:
+        entry = cache.get(_cache_key(hardcover_id))
+        if entry:
+            age = time.time() - entry["fetched_at"]
+            if age > settings.HARDCOVER_EDITION_CACHE_MAX_AGE:
+                _record("stale")
+                _refresh_in_background(hardcover_id, user)
+            else:
+                _record("hits")
+            return entry["editions"]
+
+    _record("misses")
+    return _fetch_and_store(hardcover_id, user)
@@ -1,22 +1,229 @@
 import requests
+import functools
+import hashlib
 import json
 import logging
+import threading
+import time
 from datetime import datetime
 
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 logger = logging.getLogger(__name__)
 
+# Status codes that indicate a transient upstream problem worth retrying
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Selection sets shared by the single-book queries and HardcoverBatch
+BOOK_DETAILS_FIELDS = """
+            id
+            title
+            description
+            cached_image
+            cached_contributors
+            slug
+        """
+
+EDITION_FIELDS = """
+            id
+            title
+            cached_image
+            asin
+            pages
+            audio_seconds
+            reading_format_id
+            isbn_10
+            isbn_13
+            publisher {
+                name
+            }
+            release_date
+            edition_format
+        """
+
+_session = None
+_session_lock = threading.Lock()
+_retry_count = 0
+
+
+def get_session():
+    """
+    Get the process-wide pooled session used for all Hardcover requests.
+
+    Connections are kept alive and reused between calls, so only the first
+    request in each worker pays for the TCP and TLS handshake.
+    """
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # Connection failures are safe to retry at the transport level
+                # since the request never reached Hardcover. Status based
+                # retries are handled in execute_query so mutations can opt out.
+                retries = Retry(
+                    total=settings.HARDCOVER_MAX_RETRIES,
+                    connect=settings.HARDCOVER_MAX_RETRIES,
+                    read=0,
+                    status=0,
+                    other=0,
+                    backoff_factor=settings.HARDCOVER_RETRY_BACKOFF,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=settings.HARDCOVER_POOL_SIZE,
+                    max_retries=retries,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+
+    return _session
+
+
+def get_pool_stats():
+    """
+    Get connection pool counters for the Hardcover session
+
+    Returns:
+        dict: requests made, pool hits (reused connections), pool misses
+        (new connections opened) and retries performed in this process
+    """
+    stats = {"requests": 0, "hits": 0, "misses": 0, "retries": _retry_count}
+
+    if _session is None:
+        return stats
+
+    adapter = _session.get_adapter(HardcoverAPI.BASE_URL)
+    pools = adapter.poolmanager.pools
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        stats["requests"] += pool.num_requests
+        stats["misses"] += pool.num_connections
+
+    stats["hits"] = max(stats["requests"] - stats["misses"], 0)
+    return stats
+
+
+def _record_retry():
+    """Count a retried request for the pool stats"""
+    global _retry_count
+    with _session_lock:
+        _retry_count += 1
+
+
+def _get_retry_delay(response, attempt):
+    """Work out how long to wait before retrying a failed request"""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(float(retry_after), 60.0)
+        except ValueError:
+            pass
+
+    return settings.HARDCOVER_RETRY_BACKOFF * (2**attempt)
+
+
+class HardcoverRequestError(Exception):
+    """Hardcover couldn't be reached or failed to answer a request"""
+
+
+def _report_unavailable(method):
+    """
+    Return a retryable error result when Hardcover is unavailable
+
+    For methods that return {"error": ...} dicts, so callers such as the
+    background progress sync can tell a failure worth retrying apart from
+    one that will fail the same way again.
+    """
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except HardcoverRequestError as e:
+            logger.warning(f"Hardcover is unavailable: {str(e)}")
+            return {"error": f"Hardcover is unavailable: {str(e)}", "retryable": True}
+
+    return wrapper
+
+
+def _post(payload, headers, is_mutation=False):
+    """
+    Send a request to Hardcover on the pooled session
+
+    Transient failures are retried with backoff. Mutations are only retried
+    when rate limited, since a 5xx response doesn't tell us whether the write
+    was applied.
+
+    Returns:
+        requests.Response: The final response
+
+    Raises:
+        requests.RequestException: If no response was received
+    """
+    session = get_session()
+    timeout = (
+        settings.HARDCOVER_CONNECT_TIMEOUT,
+        settings.HARDCOVER_READ_TIMEOUT,
+    )
+
+    for attempt in range(settings.HARDCOVER_MAX_RETRIES + 1):
+        response = session.post(
+            HardcoverAPI.BASE_URL,
+            headers=headers,
+            json=payload,
+            timeout=timeout,
+        )
+
+        should_retry = response.status_code in RETRY_STATUS_CODES and (
+            not is_mutation or response.status_code == 429
+        )
+        if not should_retry or attempt >= settings.HARDCOVER_MAX_RETRIES:
+            break
+
+        delay = _get_retry_delay(response, attempt)
+        logger.warning(
+            f"Hardcover returned {response.status_code}, retrying in {delay:.1f}s"
+        )
+        _record_retry()
+        time.sleep(delay)
+
+    logger.debug(f"Hardcover connection pool stats: {get_pool_stats()}")
+    return response
+
+
+def _user_id_cache_key(api_key):
+    """Build the cache key for an API key without storing the key itself"""
+    fingerprint = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    return f"hardcover:user_id:{fingerprint}"
+
+
+def forget_hardcover_user_id(api_key):
+    """Drop the cached Hardcover user ID for an API key"""
+    if api_key:
+        cache.delete(_user_id_cache_key(api_key))
+
 
 class HardcoverAPI:
     BASE_URL = "https://api.hardcover.app/v1/graphql"
 
     @staticmethod
-    def get_headers(user=None):
+    def get_headers(user=None, api_key=None):
         """Get request headers with the user's API key if available"""
         headers = {
             "Content-Type": "application/json",
         }
 
-        if user and hasattr(user, "profile") and user.profile.hardcover_api_key:
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        elif user and hasattr(user, "profile") and user.profile.hardcover_api_key:
             headers["Authorization"] = f"Bearer {user.profile.hardcover_api_key}"
         else:
             logger.warning("No API key available for request")
@@ -24,16 +231,23 @@ class HardcoverAPI:
         return headers
 
     @staticmethod
-    def execute_query(query, variables=None, user=None):
-        """Execute a GraphQL query against the Hardcover API"""
+    def execute_query(
+        query, variables=None, user=None, api_key=None, raise_unavailable=False
+    ):
+        """
+        Execute a GraphQL query against the Hardcover API
+
+        Returns None if the request fails. With `raise_unavailable`, failures
+        worth retrying later, network errors and rate limited or server error
+        responses, raise HardcoverRequestError instead.
+        """
         payload = {"query": query, "variables": variables or {}}
 
-        headers = HardcoverAPI.get_headers(user)
+        headers = HardcoverAPI.get_headers(user, api_key=api_key)
+        is_mutation = query.lstrip().startswith("mutation")
 
         try:
-            response = requests.post(
-                HardcoverAPI.BASE_URL, headers=headers, json=payload
-            )
+            response = _post(payload, headers, is_mutation=is_mutation)
 
             if response.status_code == 200:
                 data = response.json()
@@ -47,12 +261,113 @@ class HardcoverAPI:
             else:
                 logger.error(f"API Error: {response.status_code}")
                 logger.error(f"Response text: {response.text}")
+                if raise_unavailable and response.status_code in RETRY_STATUS_CODES:
+                    raise HardcoverRequestError(
+                        f"Hardcover returned HTTP {response.status_code}"
+                    )
                 return None
 
+        except HardcoverRequestError:
+            raise
+        except requests.RequestException as e:
+            logger.exception(f"Request Error: {str(e)}")
+            if raise_unavailable:
+                raise HardcoverRequestError(str(e)) from e
+            return None
         except Exception as e:
             logger.exception(f"Request Error: {str(e)}")
             return None
 
+    @staticmethod
+    def validate_api_key(api_key, interactive=False):
+        """Check an API key against Hardcover and cache the user ID it maps to
+
+        Args:
+            api_key (str): The Hardcover API key to validate
+            interactive (bool): Make a single attempt limited to
+                HARDCOVER_VALIDATE_TIMEOUT, for checks a user is waiting on
+
+        Returns:
+            int: The Hardcover user ID, or None if Hardcover rejected the key
+
+        Raises:
+            HardcoverRequestError: If Hardcover couldn't be reached or failed
+                to answer, so whether the key is valid is unknown
+        """
+        user_id = cache.get(_user_id_cache_key(api_key))
+        if user_id is not None:
+            return user_id
+
+        user_id_query = """
+        query ValidateAuth {
+        me {
+            id
+            username
+        }
+        }
+        """
+        payload = {"query": user_id_query, "variables": {}}
+        headers = HardcoverAPI.get_headers(api_key=api_key)
+
+        try:
+            if interactive:
+                # A bare request, so the pooled session's connection retries
+                # don't apply either
+                response = requests.post(
+                    HardcoverAPI.BASE_URL,
+                    headers=headers,
+                    json=payload,
+                    timeout=settings.HARDCOVER_VALIDATE_TIMEOUT,
+                )
+            else:
+                response = _post(payload, headers)
+        except requests.RequestException as e:
+            raise HardcoverRequestError(str(e)) from e
+
+        if response.status_code in (401, 403):
+            return None
+        if response.status_code != 200:
+            raise HardcoverRequestError(
+                f"Hardcover returned HTTP {response.status_code}"
+            )
+
+        try:
+            user_result = response.json()
+        except ValueError as e:
+            raise HardcoverRequestError("Hardcover returned an invalid response") from e
+
+        # Hardcover answers a bad key with a GraphQL error rather than a 401
+        if (
+            "errors" in user_result
+            or "data" not in user_result
+            or not user_result["data"].get("me")
+        ):
+            return None
+
+        user_id = user_result["data"]["me"][0]["id"]
+        cache.set(
+            _user_id_cache_key(api_key),
+            user_id,
+            settings.HARDCOVER_USER_ID_CACHE_TTL,
+        )
+        return user_id
+
+    @staticmethod
+    def get_hardcover_user_id(user):
+        """Get the Hardcover user ID for a user, using the cache when possible"""
+        if (
+            not user
+            or not hasattr(user, "profile")
+            or not user.profile.hardcover_api_key
+        ):
+            return None
+
+        try:
+            return HardcoverAPI.validate_api_key(user.profile.hardcover_api_key)
+        except HardcoverRequestError as e:
+            logger.error(f"Could not look up Hardcover user ID: {str(e)}")
+            return None
+
     @staticmethod
     def search_books(query, page=1, per_page=10, user=None):
         """Search for books via the Hardcover GraphQL API"""
@@ -132,17 +447,10 @@ class HardcoverAPI:
             logger.error("No hardcover_id provided")
             return None
 
-        graphql_query = """
-        query GetBookDetails($id: Int!) {
-        books_by_pk(id: $id) {
-            id
-            title
-            description
-            cached_image
-            cached_contributors
-            slug
-        }
-        }
+        graphql_query = f"""
+        query GetBookDetails($id: Int!) {{
+        books_by_pk(id: $id) {{{BOOK_DETAILS_FIELDS}}}
+        }}
         """
 
         variables = {"id": int(hardcover_id)}
@@ -150,39 +458,46 @@ class HardcoverAPI:
         result = HardcoverAPI.execute_query(graphql_query, variables, user)
 
         if result and "data" in result and "books_by_pk" in result["data"]:
-            book_data = result["data"]["books_by_pk"]
-            logger.info(
-                f"Successfully retrieved details for book: {book_data.get('title', 'Unknown')}"
-            )
-
-            # Create a simplified structure for book data
-            processed_data = {
-                "id": book_data["id"],
-                "title": book_data["title"],
-                "description": book_data["description"],
-                "url": f"https://hardcover.app/books/{book_data['slug']}?referrer_id=8674",
-            }
-
-            # Add cover image URL
-            if book_data.get("cached_image") and book_data["cached_image"].get("url"):
-                processed_data["cover_image_url"] = book_data["cached_image"]["url"]
-
-            # Add author information
-            if (
-                book_data.get("cached_contributors")
-                and len(book_data["cached_contributors"]) > 0
-            ):
-                contributor = book_data["cached_contributors"][0]
-                if contributor.get("author"):
-                    processed_data["author"] = {"name": contributor["author"]["name"]}
-
-            return processed_data
+            return HardcoverAPI.process_book_details(result["data"]["books_by_pk"])
         else:
             logger.error(f"Failed to retrieve book details for ID: {hardcover_id}")
             if result and "errors" in result:
                 logger.error(f"GraphQL errors: {result['errors']}")
             return None
 
+    @staticmethod
+    def process_book_details(book_data):
+        """Convert a raw books_by_pk result into our simplified book structure"""
+        if not book_data:
+            return None
+
+        logger.info(
+            f"Successfully retrieved details for book: {book_data.get('title', 'Unknown')}"
+        )
+
+        # Create a simplified structure for book data
+        processed_data = {
+            "id": book_data["id"],
+            "title": book_data["title"],
+            "description": book_data["description"],
+            "url": f"https://hardcover.app/books/{book_data['slug']}?referrer_id=8674",
+        }
+
+        # Add cover image URL
+        if book_data.get("cached_image") and book_data["cached_image"].get("url"):
+            processed_data["cover_image_url"] = book_data["cached_image"]["url"]
+
+        # Add author information
+        if (
+            book_data.get("cached_contributors")
+            and len(book_data["cached_contributors"]) > 0
+        ):
+            contributor = book_data["cached_contributors"][0]
+            if contributor.get("author"):
+                processed_data["author"] = {"name": contributor["author"]["name"]}
+
+        return processed_data
+
     @staticmethod
     def get_reading_progress(book_id, user=None):
         """Get user's reading progress for a specific book from the Hardcover API"""
@@ -199,27 +514,12 @@ class HardcoverAPI:
             }
 
         # First, get the user_id from Hardcover
-        user_id_query = """
-        query ValidateAuth {
-        me {
-            id
-            username
-        }
-        }
-        """
-
-        user_result = HardcoverAPI.execute_query(user_id_query, {}, user)
+        user_id = HardcoverAPI.get_hardcover_user_id(user)
 
-        if (
-            not user_result
-            or "data" not in user_result
-            or "me" not in user_result["data"]
-        ):
+        if user_id is None:
             logger.error("Failed to fetch user ID from Hardcover")
             return {"error": "Could not authenticate with Hardcover."}
 
-        user_id = user_result["data"]["me"][0]["id"]
-
         # Now fetch reading progress using the user_id and book_id
         progress_query = """
         query GetReadingProgress($user_id: Int!, $book_id: Int!) {
@@ -323,25 +623,10 @@ class HardcoverAPI:
             logger.error("No hardcover_id provided")
             return None
 
-        graphql_query = """
-        query GetBookEditions($id: Int!) {
-        editions(where: {book_id: {_eq: $id}}) {
-            id
-            title
-            cached_image
-            asin
-            pages
-            audio_seconds
-            reading_format_id
-            isbn_10
-            isbn_13
-            publisher {
-                name
-            }
-            release_date
-            edition_format
-        }
-        }
+        graphql_query = f"""
+        query GetBookEditions($id: Int!) {{
+        editions(where: {{book_id: {{_eq: $id}}}}) {{{EDITION_FIELDS}}}
+        }}
         """
 
         variables = {"id": int(hardcover_id)}
@@ -353,43 +638,7 @@ class HardcoverAPI:
             logger.info(
                 f"Successfully retrieved {len(editions)} editions for book ID: {hardcover_id}"
             )
-
-            # Process editions to add reading format name
-            for edition in editions:
-                # Add cover image URL
-                if edition.get("cached_image") and edition["cached_image"].get("url"):
-                    edition["cover_image_url"] = edition["cached_image"]["url"]
-
-                # Map reading_format_id to human-readable name
-                format_id = edition.get("reading_format_id")
-                if format_id == 1:
-                    edition["reading_format"] = "physical"
-                elif format_id == 2:
-                    edition["reading_format"] = "audio"
-                elif format_id == 4:
-                    edition["reading_format"] = "ebook"
-                else:
-                    edition["reading_format"] = "unknown"
-
-                # Format publication date if present
-                if edition.get("release_date"):
-                    try:
-                        pub_date = datetime.strptime(
-                            edition["release_date"], "%Y-%m-%d"
-                        )
-                        edition["release_date_formatted"] = pub_date.strftime(
-                            "%B %d, %Y"
-                        )
-                    except (ValueError, TypeError):
-                        edition["release_date_formatted"] = edition["release_date"]
-
-                # Format audio duration if present
-                if edition.get("audio_seconds"):
-                    hours = edition["audio_seconds"] // 3600
-                    minutes = (edition["audio_seconds"] % 3600) // 60
-                    edition["audio_duration_formatted"] = f"{hours}h {minutes}m"
-
-            return editions
+            return HardcoverAPI.process_editions(editions)
         else:
             logger.error(f"Failed to retrieve editions for book ID: {hardcover_id}")
             if result and "errors" in result:
@@ -397,6 +646,42 @@ class HardcoverAPI:
             return []
 
     @staticmethod
+    def process_editions(editions):
+        """Add display fields (format name, cover, dates, duration) to raw editions"""
+        for edition in editions:
+            # Add cover image URL
+            if edition.get("cached_image") and edition["cached_image"].get("url"):
+                edition["cover_image_url"] = edition["cached_image"]["url"]
+
+            # Map reading_format_id to human-readable name
+            format_id = edition.get("reading_format_id")
+            if format_id == 1:
+                edition["reading_format"] = "physical"
+            elif format_id == 2:
+                edition["reading_format"] = "audio"
+            elif format_id == 4:
+                edition["reading_format"] = "ebook"
+            else:
+                edition["reading_format"] = "unknown"
+
+            # Format publication date if present
+            if edition.get("release_date"):
+                try:
+                    pub_date = datetime.strptime(edition["release_date"], "%Y-%m-%d")
+                    edition["release_date_formatted"] = pub_date.strftime("%B %d, %Y")
+                except (ValueError, TypeError):
+                    edition["release_date_formatted"] = edition["release_date"]
+
+            # Format audio duration if present
+            if edition.get("audio_seconds"):
+                hours = edition["audio_seconds"] // 3600
+                minutes = (edition["audio_seconds"] % 3600) // 60
+                edition["audio_duration_formatted"] = f"{hours}h {minutes}m"
+
+        return editions
+
+    @staticmethod
+    @_report_unavailable
     def update_reading_progress(
         read_id,
         started_at=None,
@@ -418,7 +703,8 @@ class HardcoverAPI:
             user (User, optional): The User object to retrieve API key from
 
         Returns:
-            dict: Success or error info
+            dict: Success or error info. Errors have "retryable" set if
+            Hardcover was unavailable.
         """
         logger.info(f"Updating reading record {read_id} with complete data")
 
@@ -484,7 +770,9 @@ class HardcoverAPI:
         logger.debug(f"Complete update for reading record: {variables}")
 
         # Execute the mutation
-        result = HardcoverAPI.execute_query(update_mutation, variables, user)
+        result = HardcoverAPI.execute_query(
+            update_mutation, variables, user, raise_unavailable=True
+        )
 
         if (
             result
@@ -514,6 +802,7 @@ class HardcoverAPI:
             return {"error": "Failed to update reading record"}
 
     @staticmethod
+    @_report_unavailable
     def start_reading_progress(
         book_id, edition_id=None, pages=None, seconds=None, started_at=None, user=None
     ):
@@ -528,7 +817,8 @@ class HardcoverAPI:
             user (User, optional): The User object to retrieve API key from
 
         Returns:
-            dict: Response data with the new read_id if successful, or error message
+            dict: Response data with the new read_id if successful, or error
+            message. Errors have "retryable" set if Hardcover was unavailable.
         """
         logger.info(
             f"Starting new reading progress on Hardcover for book ID: {book_id}"
@@ -556,27 +846,14 @@ class HardcoverAPI:
             formatted_started_at = started_at
 
         # First, we need to get the current user's ID from Hardcover
-        user_id_query = """
-        query ValidateAuth {
-            me {
-                id
-                username
-            }
-        }
-        """
-
-        user_result = HardcoverAPI.execute_query(user_id_query, {}, user)
+        hardcover_user_id = HardcoverAPI.validate_api_key(
+            user.profile.hardcover_api_key
+        )
 
-        if (
-            not user_result
-            or "data" not in user_result
-            or "me" not in user_result["data"]
-            or not user_result["data"]["me"]
-        ):
+        if hardcover_user_id is None:
             logger.error("Failed to fetch user ID from Hardcover")
             return {"error": "Could not authenticate with Hardcover."}
 
-        hardcover_user_id = user_result["data"]["me"][0]["id"]
         logger.info(f"Retrieved Hardcover user ID: {hardcover_user_id}")
 
         # Now, check if the user_book already exists
@@ -598,7 +875,9 @@ class HardcoverAPI:
 
         variables = {"book_id": int(book_id), "user_id": int(hardcover_user_id)}
 
-        user_book_result = HardcoverAPI.execute_query(user_book_query, variables, user)
+        user_book_result = HardcoverAPI.execute_query(
+            user_book_query, variables, user, raise_unavailable=True
+        )
 
         user_book_id = None
         read_id = None
@@ -648,7 +927,7 @@ class HardcoverAPI:
                 f"Updating user_book to 'currently reading': {update_variables}"
             )
             update_result = HardcoverAPI.execute_query(
-                update_book_mutation, update_variables, user
+                update_book_mutation, update_variables, user, raise_unavailable=True
             )
 
             if (
@@ -720,7 +999,7 @@ class HardcoverAPI:
                 f"Creating new user_book with 'currently reading' status: {create_variables}"
             )
             create_result = HardcoverAPI.execute_query(
-                create_book_mutation, create_variables, user
+                create_book_mutation, create_variables, user, raise_unavailable=True
             )
 
             if (
@@ -772,7 +1051,10 @@ class HardcoverAPI:
 
             logger.debug(f"Creating reading record: {create_read_variables}")
             create_read_result = HardcoverAPI.execute_query(
-                create_read_mutation, create_read_variables, user
+                create_read_mutation,
+                create_read_variables,
+                user,
+                raise_unavailable=True,
             )
 
             if (
@@ -826,3 +1108,184 @@ class HardcoverAPI:
             }
         else:
             return {"error": "Failed to start reading progress on Hardcover"}
+
+
+class BatchResult:
+    """
+    A value that is filled in when its HardcoverBatch is dispatched
+
+    If the lookup itself failed, `error` says why and `value` is None, so a
+    failed editions lookup can be told apart from a book with no editions.
+    """
+
+    def __init__(self, batch, default=None):
+        self._batch = batch
+        self._value = default
+        self._loaded = False
+        self.error = None
+
+    @property
+    def value(self):
+        """Get the loaded value, dispatching the batch first if needed"""
+        if not self._loaded:
+            self._batch.dispatch()
+        return self._value
+
+    def resolve(self, value):
+        self._value = value
+        self._loaded = True
+
+    def fail(self, error):
+        self._value = None
+        self.error = error
+        self._loaded = True
+
+
+class HardcoverBatch:
+    """
+    Collect Hardcover book lookups and send them as one aliased GraphQL query
+
+    Loads are deduplicated and merged into a single document
+    (b0: books_by_pk(...), b1: editions(...), ...) when the batch is
+    dispatched. That happens when leaving a ``with`` block, on an explicit
+    dispatch(), or the first time a pending result's value is read.
+
+    Hardcover rejects the whole document if any one lookup is invalid, so a
+    rejected chunk is split in half and retried until the bad lookups are
+    isolated. Those, and every lookup in a chunk that couldn't reach
+    Hardcover at all, are failed with an error instead of resolving to
+    None or [].
+
+    Usage:
+        with HardcoverBatch(user=request.user) as batch:
+            details = batch.load_book_details(book.hardcover_id)
+            editions = batch.load_book_editions(book.hardcover_id)
+
+        book_data = details.value
+    """
+
+    def __init__(self, user=None, max_batch_size=None):
+        self.user = user
+        self.max_batch_size = max_batch_size or settings.HARDCOVER_BATCH_SIZE
+        self._pending = {}
+        self._loaded = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.dispatch()
+        return False
+
+    def load_book_details(self, hardcover_id):
+        """Queue a book details lookup, same result as get_book_details"""
+        return self._load("details", hardcover_id)
+
+    def load_book_editions(self, hardcover_id):
+        """Queue an editions lookup, same result as get_book_editions"""
+        return self._load("editions", hardcover_id)
+
+    def _load(self, kind, hardcover_id):
+        key = (kind, int(hardcover_id))
+
+        if key in self._loaded:
+            return self._loaded[key]
+
+        if key not in self._pending:
+            default = [] if kind == "editions" else None
+            self._pending[key] = BatchResult(self, default)
+
+        return self._pending[key]
+
+    def dispatch(self):
+        """Send all pending lookups, split into chunks of max_batch_size"""
+        pending = list(self._pending.items())
+        self._pending = {}
+
+        for start in range(0, len(pending), self.max_batch_size):
+            self._dispatch_chunk(pending[start : start + self.max_batch_size])
+
+    def _dispatch_chunk(self, chunk):
+        variable_definitions = []
+        fields = []
+        variables = {}
+
+        for index, ((kind, hardcover_id), _) in enumerate(chunk):
+            alias = f"b{index}"
+            variable_definitions.append(f"${alias}: Int!")
+            variables[alias] = hardcover_id
+
+            if kind == "details":
+                fields.append(
+                    f"{alias}: books_by_pk(id: ${alias}) {{{BOOK_DETAILS_FIELDS}}}"
+                )
+            else:
+                fields.append(
+                    f"{alias}: editions(where: {{book_id: {{_eq: ${alias}}}}}) "
+                    f"{{{EDITION_FIELDS}}}"
+                )
+
+        graphql_query = (
+            f"query BatchedBookLookups({', '.join(variable_definitions)}) {{\n"
+            + "\n".join(fields)
+            + "\n}"
+        )
+
+        logger.info(f"Sending batched Hardcover query with {len(chunk)} lookups")
+        # Sent with _post rather than execute_query so a document Hardcover
+        # rejected can be told apart from a request that never got through;
+        # splitting only helps with the former
+        try:
+            response = _post(
+                {"query": graphql_query, "variables": variables},
+                HardcoverAPI.get_headers(self.user),
+            )
+        except requests.RequestException as e:
+            logger.exception(f"Batched Hardcover query failed: {e}")
+            self._fail_chunk(chunk, f"Hardcover is unavailable: {e}")
+            return
+
+        if response.status_code != 200:
+            logger.error(f"Batched Hardcover query failed: {response.status_code}")
+            self._fail_chunk(chunk, f"Hardcover returned HTTP {response.status_code}")
+            return
+
+        result = response.json()
+        if "errors" in result:
+            logger.error(f"GraphQL errors: {result['errors']}")
+            if len(chunk) > 1:
+                logger.warning(
+                    f"Batched Hardcover query with {len(chunk)} lookups was "
+                    "rejected, retrying in smaller chunks"
+                )
+                middle = len(chunk) // 2
+                self._dispatch_chunk(chunk[:middle])
+                self._dispatch_chunk(chunk[middle:])
+            else:
+                [((kind, hardcover_id), _)] = chunk
+                logger.error(f"Hardcover rejected {kind} lookup for ID: {hardcover_id}")
+                self._fail_chunk(chunk, "Hardcover rejected the lookup")
+            return
+
+        data = result.get("data") or {}
+
+        for index, (key, pending) in enumerate(chunk):
+            kind, hardcover_id = key
+            raw = data.get(f"b{index}")
+
+            if kind == "details":
+                if raw is None:
+                    logger.error(
+                        f"Failed to retrieve book details for ID: {hardcover_id}"
+                    )
+                pending.resolve(HardcoverAPI.process_book_details(raw))
+            else:
+                pending.resolve(HardcoverAPI.process_editions(raw or []))
+
+            self._loaded[key] = pending
+
+    def _fail_chunk(self, chunk, error):
+        for key, pending in chunk:
+            pending.fail(error)
+            self._loaded[key] = pending
@@ -1,83 +1,199 @@
+import base64
+import json
+import logging
+import threading
+import time
+
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
 
+from .models import KavitaLibraryItem
+from .utils.matching import CachedTitleIndex, normalize_title
 
-def authenticate(api_url_base, api_key):
-    """Get authentication token from Kavita API"""
-    session = requests.Session()
-    auth_url = f"{api_url_base}/api/Plugin/authenticate/?apiKey={api_key}&pluginName=BookclubApp"
+logger = logging.getLogger(__name__)
 
-    response = session.post(auth_url)
+# Refresh the token this long before Kavita says it expires (seconds)
+TOKEN_EXPIRY_MARGIN = 60
 
-    response.raise_for_status()
-    token_response = response.json()
-    token = token_response.get("token")
+_client = None
+_client_lock = threading.Lock()
 
-    return session, token
+# In-process title index over the local library snapshot. Series are added
+# before chapters so a series wins when both match equally well. It's built
+# from the raw titles, since TitleIndex normalizes them itself and
+# normalizing twice can strip a second leading article.
+_library_index = CachedTitleIndex(
+    KavitaLibraryItem,
+    "title",
+    None,
+    ["library_id", "series_id", "volume_id"],
+    ordering=["-kind", "id"],
+)
 
 
-def get_kavita_book_url(book_title):
-    """
-    Search for a book in Kavita and return its URL if found
+def _get_token_expiry(token):
+    """Read the expiry time from a JWT's payload, or None if it has none"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+    except (IndexError, ValueError, AttributeError):
+        return None
+
+
+class KavitaClient:
     """
-    kavita_base_url = settings.KAVITA_BASE_URL
-    kavita_api_key = settings.KAVITA_API_KEY
+    Long-lived Kavita API client
 
-    # Skip if Kavita integration is not configured
-    if not kavita_base_url or not kavita_api_key:
-        return None
+    Keeps one pooled session and reuses the JWT from the plugin
+    authentication endpoint until it expires, so a sweep over many books
+    authenticates once rather than once per book.
+    """
 
-    try:
-        # Authenticate with Kavita
-        session, token = authenticate(kavita_base_url, kavita_api_key)
-        if not session or not token:
-            return None
+    def __init__(self, base_url, api_key, timeout=None):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout or (
+            settings.KAVITA_CONNECT_TIMEOUT,
+            settings.KAVITA_READ_TIMEOUT,
+        )
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=settings.KAVITA_POOL_SIZE
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._token = None
+        self._token_expires_at = 0
+        self._token_lock = threading.Lock()
+
+    def _authenticate(self):
+        auth_url = f"{self.base_url}/api/Plugin/authenticate/"
+        response = self.session.post(
+            auth_url,
+            params={"apiKey": self.api_key, "pluginName": "BookclubApp"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        token = response.json().get("token")
+
+        expires_at = _get_token_expiry(token)
+        if expires_at is None:
+            expires_at = time.time() + settings.KAVITA_TOKEN_TTL
+
+        self._token = token
+        self._token_expires_at = expires_at - TOKEN_EXPIRY_MARGIN
+        return token
+
+    def get_token(self, force_refresh=False):
+        """Get a valid JWT, authenticating only if the cached one has expired"""
+        with self._token_lock:
+            if (
+                force_refresh
+                or not self._token
+                or time.time() >= self._token_expires_at
+            ):
+                self._authenticate()
+            return self._token
+
+    def request(self, method, path, params=None, payload=None, timeout=None):
+        """
+        Make an authenticated request against the Kavita API
+
+        A 401 response discards the cached token and retries once, in case
+        Kavita restarted or revoked it early.
+        """
+        url = f"{self.base_url}{path}"
+        token = self.get_token()
+
+        for attempt in range(2):
+            response = self.session.request(
+                method,
+                url,
+                headers={"Authorization": f"Bearer {token}"},
+                params=params,
+                json=payload,
+                timeout=timeout or self.timeout,
+            )
+            if response.status_code == 401 and attempt == 0:
+                token = self.get_token(force_refresh=True)
+                continue
+            return response
+
+        return response
+
+    def get(self, path, params=None, timeout=None):
+        """Make an authenticated GET request against the Kavita API"""
+        return self.request("GET", path, params=params, timeout=timeout)
+
+    def iter_series(self, page_size=500):
+        """
+        Yield every series in every library the API key can see
+
+        Pages through /api/Series/all-v2, using the Pagination header Kavita
+        sends back to know when to stop.
+        """
+        page = 1
+        while True:
+            response = self.request(
+                "POST",
+                "/api/Series/all-v2",
+                params={"PageNumber": page, "PageSize": page_size},
+                payload={"statements": [], "combination": 1, "limitTo": 0},
+            )
+            response.raise_for_status()
+            series = response.json()
+            yield from series
+
+            pagination = json.loads(response.headers.get("Pagination", "{}"))
+            if not series or page >= pagination.get("totalPages", page):
+                return
+            page += 1
+
+    def get_volumes(self, series_id):
+        """Get the volumes, with their chapters, for a series"""
+        response = self.get("/api/Series/volumes", params={"seriesId": series_id})
+        response.raise_for_status()
+        return response.json()
 
+    def get_book_url(self, book_title):
+        """
+        Search for a book in Kavita and return its URL if found
+        """
         # Process the title to remove subtitles (anything after first colon)
         processed_title = book_title.split(":", 1)[0].strip()
 
-        # Use only the processed title for search
-        search_query = processed_title
-
-        # Search for the book
-        search_url = f"{kavita_base_url}/api/Search/search"
-        headers = {"Authorization": f"Bearer {token}"}
-        params = {
-            "queryString": search_query,
-            "includeChapterAndFiles": "true",
-        }
-
-        response = session.get(search_url, headers=headers, params=params)
+        response = self.get(
+            "/api/Search/search",
+            params={
+                "queryString": processed_title,
+                "includeChapterAndFiles": "true",
+            },
+        )
         if response.status_code != 200:
             return None
 
-        response.raise_for_status()
         data = response.json()
 
         # First check for series matches - this indicates a standalone book
-        if "series" in data and data["series"]:
-            series_matches = data["series"]
-
-            # If we found a series match, use that directly
-            best_match = series_matches[0]  # Assuming first match is best
+        if data.get("series"):
+            best_match = data["series"][0]  # Assuming first match is best
 
             series_id = best_match.get("seriesId")
             library_id = best_match.get("libraryId")
 
             if series_id and library_id:
                 # For series, we build a URL directly to the series page
-                kavita_url = (
-                    f"{kavita_base_url}/library/{library_id}/series/{series_id}"
-                )
-                return kavita_url
+                return f"{self.base_url}/library/{library_id}/series/{series_id}"
 
         # If execution reaches here, it means no valid series matches were found
         # Now try chapters as a fallback
-        if "chapters" in data and data["chapters"]:
-            chapter_matches = data["chapters"]
-
-            # Find the most relevant chapter match
-            best_match = chapter_matches[0]
+        if data.get("chapters"):
+            best_match = data["chapters"][0]
 
             chapter_id = best_match.get("id")
             volume_id = best_match.get("volumeId")
@@ -86,16 +202,13 @@ def get_kavita_book_url(book_title):
                 return None
 
             # Get series info for this chapter
-            series_url = f"{kavita_base_url}/api/search/series-for-chapter"
-            params = {"chapterId": chapter_id}
-
-            series_response = session.get(series_url, headers=headers, params=params)
+            series_response = self.get(
+                "/api/search/series-for-chapter", params={"chapterId": chapter_id}
+            )
             if series_response.status_code != 200:
                 return None
 
-            series_response.raise_for_status()
             series_data = series_response.json()
-
             series_id = series_data.get("id")
             library_id = series_data.get("libraryId")
 
@@ -103,12 +216,243 @@ def get_kavita_book_url(book_title):
                 return None
 
             # Build the final URL for chapter-based matches
-            kavita_url = f"{kavita_base_url}/library/{library_id}/series/{series_id}/volume/{volume_id}"
-            return kavita_url
+            return f"{self.base_url}/library/{library_id}/series/{series_id}/volume/{volume_id}"
 
         return None
 
+    def resolve_many(self, titles):
+        """
+        Look up Kavita URLs for many books with a single authentication
+
+        Args:
+            titles (iterable): Book titles to look up
+
+        Returns:
+            dict: Mapping of each title to its Kavita URL, or None if not found
+        """
+        results = {}
+        for title in titles:
+            if title in results:
+                continue
+            try:
+                results[title] = self.get_book_url(title)
+            except Exception as e:
+                logger.error(f"Error searching Kavita for '{title}': {str(e)}")
+                results[title] = None
+        return results
+
+
+def get_kavita_client():
+    """
+    Get the process-wide Kavita client
+
+    Returns:
+        KavitaClient or None if Kavita integration is not configured
+    """
+    global _client
+
+    if not settings.KAVITA_ENABLED:
+        return None
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = KavitaClient(
+                    settings.KAVITA_BASE_URL, settings.KAVITA_API_KEY
+                )
+
+    return _client
+
+
+def authenticate(api_url_base, api_key):
+    """Get authentication token from Kavita API"""
+    client = KavitaClient(api_url_base, api_key)
+    return client.session, client.get_token()
+
+
+def _build_book_url(base_url, library_id, series_id, volume_id=None):
+    url = f"{base_url}/library/{library_id}/series/{series_id}"
+    if volume_id:
+        url += f"/volume/{volume_id}"
+    return url
+
+
+def _make_item(kind, item_id, title, library_id, series_id, **extra):
+    return KavitaLibraryItem(
+        key=f"{kind}:{item_id}",
+        kind=kind,
+        title=title,
+        normalized_title=normalize_title(title),
+        library_id=library_id,
+        series_id=series_id,
+        **extra,
+    )
+
+
+def sync_kavita_library(full=False):
+    """
+    Snapshot the Kavita series and chapter catalogue into KavitaLibraryItem
+
+    Every series is listed on each sync, but volumes and chapters are only
+    fetched for series whose lastChapterAdded has changed, unless `full`.
+    Items no longer in Kavita are removed.
+
+    Returns:
+        tuple: (series added or changed, items removed), or None if Kavita
+        isn't configured
+    """
+    client = get_kavita_client()
+    if not client:
+        return None
+
+    known = dict(
+        KavitaLibraryItem.objects.filter(kind="series").values_list(
+            "series_id", "last_chapter_added"
+        )
+    )
+
+    items = []
+    changed = []
+    unchanged_ids = []
+    for series in client.iter_series():
+        last_chapter_added = str(series.get("lastChapterAdded") or "")
+        item = _make_item(
+            "series",
+            series["id"],
+            series.get("name") or "",
+            series["libraryId"],
+            series["id"],
+            last_chapter_added=last_chapter_added,
+        )
+        items.append(item)
+
+        if full or known.get(series["id"]) != last_chapter_added:
+            changed.append(item)
+        else:
+            unchanged_ids.append(series["id"])
+
+    for series_item in changed:
+        try:
+            volumes = client.get_volumes(series_item.series_id)
+        except RequestException as e:
+            logger.error(
+                f"Error fetching Kavita volumes for '{series_item.title}': {str(e)}"
+            )
+            # Keep the old chapters and retry this series on the next sync
+            series_item.last_chapter_added = known.get(series_item.series_id, "")
+            unchanged_ids.append(series_item.series_id)
+            continue
+
+        for volume in volumes:
+            for chapter in volume.get("chapters") or []:
+                title = chapter.get("titleName") or chapter.get("title")
+                if title:
+                    items.append(
+                        _make_item(
+                            "chapter",
+                            chapter["id"],
+                            title,
+                            series_item.library_id,
+                            series_item.series_id,
+                            volume_id=volume["id"],
+                        )
+                    )
+
+    KavitaLibraryItem.objects.bulk_create(
+        items,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["key"],
+        update_fields=[
+            "title",
+            "normalized_title",
+            "library_id",
+            "series_id",
+            "volume_id",
+            "last_chapter_added",
+            "synced_at",
+        ],
+    )
+
+    seen = {item.key for item in items}
+    seen.update(
+        KavitaLibraryItem.objects.filter(
+            kind="chapter", series_id__in=unchanged_ids
+        ).values_list("key", flat=True)
+    )
+    stale = [
+        key
+        for key in KavitaLibraryItem.objects.values_list("key", flat=True)
+        if key not in seen
+    ]
+    removed, _ = KavitaLibraryItem.objects.filter(key__in=stale).delete()
+
+    return len(changed), removed
+
+
+def match_kavita_book_url(book_title):
+    """
+    Find a book's Kavita URL in the local library snapshot
+
+    Returns:
+        str: The URL, or None if there's no good enough match
+    """
+    client = get_kavita_client()
+    if not client:
+        return None
+
+    match = _library_index.get().match(book_title)
+    if not match:
+        return None
+    return _build_book_url(client.base_url, *match)
+
+
+def has_kavita_library_index():
+    """Check whether the Kavita library has been synced locally yet"""
+    return len(_library_index.get()) > 0
+
+
+def resolve_kavita_urls(titles):
+    """
+    Find Kavita URLs for many books at once
+
+    Uses the local library snapshot if there is one, otherwise searches
+    Kavita with a single authentication for the whole batch.
+
+    Returns:
+        dict: Mapping of each title to its Kavita URL, or None if not found
+    """
+    client = get_kavita_client()
+    if not client:
+        return {title: None for title in titles}
+
+    index = _library_index.get()
+    if len(index):
+        return {
+            title: _build_book_url(client.base_url, *match) if match else None
+            for title, match in ((title, index.match(title)) for title in titles)
+        }
+    return client.resolve_many(titles)
+
+
+def get_kavita_book_url(book_title):
+    """
+    Search for a book in Kavita and return its URL if found
+    """
+    client = get_kavita_client()
+
+    # Skip if Kavita integration is not configured
+    if not client:
+        return None
+
+    if has_kavita_library_index():
+        return match_kavita_book_url(book_title)
+
+    # The library hasn't been synced yet, so ask Kavita directly
+    try:
+        return client.get_book_url(book_title)
     except Exception as e:
+        logger.error(f"Error searching Kavita for '{book_title}': {str(e)}")
         return None
 
 
@@ -0,0 +1,209 @@
+"""
+Background resolution of Kavita and Plex links for books.
+
+Views only enqueue a MediaLinkJob per missing link. The resolve_media_links
+management command works through due jobs, and lookups that find nothing are
+retried with exponential backoff instead of on every page view.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .kavita_api import get_kavita_book_url, resolve_kavita_urls
+from .models import Book, MediaLinkJob
+from .plex_api import get_plex_book_url
+
+logger = logging.getLogger(__name__)
+
+
+def _enabled_services():
+    services = []
+    if settings.KAVITA_ENABLED:
+        services.append("kavita")
+    if settings.PLEX_ENABLED:
+        services.append("plex")
+    return services
+
+
+def _url_field(service):
+    return f"{service}_url"
+
+
+def _get_book_url(book, service):
+    if service == "kavita":
+        return get_kavita_book_url(book.title)
+    return get_plex_book_url(book.title, book.author)
+
+
+def get_retry_delay(attempts):
+    """Get the backoff before retrying a lookup that has failed `attempts` times"""
+    delay = settings.MEDIA_LINK_RETRY_BASE * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(delay, settings.MEDIA_LINK_RETRY_MAX))
+
+
+def enqueue_link_resolution(book):
+    """
+    Queue lookups for any Kavita/Plex links a book is missing
+
+    Existing jobs are left alone so failed lookups keep their backoff, except
+    resolved jobs whose link has since been cleared, which are queued again.
+
+    Args:
+        book (Book): The book to find links for
+    """
+    services = [s for s in _enabled_services() if not getattr(book, _url_field(s))]
+    if not services:
+        return
+
+    existing = {
+        job.service: job
+        for job in MediaLinkJob.objects.filter(book=book, service__in=services)
+    }
+
+    missing = [
+        MediaLinkJob(book=book, service=service)
+        for service in services
+        if service not in existing
+    ]
+    if missing:
+        MediaLinkJob.objects.bulk_create(missing, ignore_conflicts=True)
+
+    requeue = [job.id for job in existing.values() if job.status == "resolved"]
+    if requeue:
+        MediaLinkJob.objects.filter(id__in=requeue).update(
+            status="pending", attempts=0, next_attempt_at=timezone.now()
+        )
+
+
+def enqueue_missing_links():
+    """Queue lookups for every book missing a Kavita or Plex link"""
+    services = _enabled_services()
+    if not services:
+        return 0
+
+    missing = Q()
+    for service in services:
+        missing |= Q(**{_url_field(service): ""})
+
+    count = 0
+    for book in Book.objects.filter(missing):
+        enqueue_link_resolution(book)
+        count += 1
+    return count
+
+
+def _claim_due_jobs(limit):
+    """Mark up to `limit` due jobs as running and return the ones this worker won"""
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.MEDIA_LINK_STALE_AFTER)
+
+    candidates = (
+        MediaLinkJob.objects.filter(
+            Q(status__in=["pending", "failed"], next_attempt_at__lte=now)
+            | Q(status="running", updated_at__lt=stale_before)
+        )
+        .select_related("book")
+        .order_by("next_attempt_at")[:limit]
+    )
+
+    claimed = []
+    for job in candidates:
+        # Only take the job if nobody else has touched it since we read it
+        won = MediaLinkJob.objects.filter(
+            id=job.id, status=job.status, updated_at=job.updated_at
+        ).update(status="running", updated_at=now)
+        if won:
+            job.status = "running"
+            claimed.append(job)
+    return claimed
+
+
+def run_job(job, kavita_urls=None):
+    """
+    Look up a single link and record the outcome on the job
+
+    Args:
+        job (MediaLinkJob): A job claimed by this worker
+        kavita_urls (dict): Kavita URLs already looked up by title, if any
+
+    Returns:
+        bool: True if a link was found
+    """
+    book = job.book
+    field = _url_field(job.service)
+    job.attempts += 1
+
+    if job.service not in _enabled_services() or getattr(book, field):
+        # The service was switched off or someone set the link by hand
+        job.status = "resolved"
+        job.last_error = ""
+        job.save(update_fields=["status", "attempts", "last_error", "updated_at"])
+        return bool(getattr(book, field))
+
+    try:
+        if job.service == "kavita" and kavita_urls and book.title in kavita_urls:
+            url = kavita_urls[book.title]
+        else:
+            url = _get_book_url(book, job.service)
+        error = "" if url else "No match found"
+    except Exception as e:
+        logger.exception(
+            f"Error resolving {job.service} link for '{book.title}': {str(e)}"
+        )
+        url = None
+        error = str(e)
+
+    if url:
+        setattr(book, field, url)
+        book.save(update_fields=[field])
+        job.status = "resolved"
+        job.last_error = ""
+    else:
+        job.status = "failed"
+        job.last_error = error
+        job.next_attempt_at = timezone.now() + get_retry_delay(job.attempts)
+        logger.info(
+            f"No {job.service} link for '{book.title}', "
+            f"retrying after {job.next_attempt_at:%Y-%m-%d %H:%M}"
+        )
+
+    job.save(
+        update_fields=[
+            "status",
+            "attempts",
+            "last_error",
+            "next_attempt_at",
+            "updated_at",
+        ]
+    )
+    return bool(url)
+
+
+def process_due_jobs(limit=None):
+    """
+    Run every due link lookup, up to `limit` jobs
+
+    Returns:
+        tuple: (resolved, failed) job counts
+    """
+    jobs = _claim_due_jobs(limit or settings.MEDIA_LINK_BATCH_SIZE)
+
+    # Look up every Kavita title in the batch up front rather than job by job
+    kavita_titles = [
+        job.book.title
+        for job in jobs
+        if job.service == "kavita" and not job.book.kavita_url
+    ]
+    kavita_urls = resolve_kavita_urls(kavita_titles) if kavita_titles else None
+
+    resolved = failed = 0
+    for job in jobs:
+        if run_job(job, kavita_urls):
+            resolved += 1
+        else:
+            failed += 1
+    return resolved, failed
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from bookclub.models import Comment
+from bookclub.views.book_utils import refresh_comment_progress
+
+
+class Command(BaseCommand):
+    help = "Calculate the stored normalized progress for comments"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recalculate every comment, not just ones without a stored value",
+        )
+        parser.add_argument(
+            "--book",
+            type=int,
+            help="Only process comments on the book with this ID",
+        )
+
+    def handle(self, *args, **options):
+        comments = Comment.objects.all()
+        if not options["all"]:
+            comments = comments.filter(normalized_progress__isnull=True)
+        if options["book"]:
+            comments = comments.filter(book_id=options["book"])
+
+        updated = refresh_comment_progress(comments)
+        self.stdout.write(
+            self.style.SUCCESS(f"Updated normalized progress for {updated} comments")
+        )
@@ -0,0 +1,98 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from bookclub.models import Book, Comment, CommentReaction, UserBookProgress
+from bookclub.utils.formatting import render_markdown
+
+PARAGRAPHS = [
+    "I did **not** see that twist coming, the whole *second act* makes sense now.",
+    "Favourite lines so far:\n\n- the letter scene\n- the storm\n- the ending of part one",
+    "> It was the best of times\n\nStill thinking about this quote days later.",
+    "Slow start but it really picks up around the *halfway* mark.\nWorth pushing through.",
+    "1. The pacing\n2. The side characters\n3. That **ending**",
+]
+
+
+class Command(BaseCommand):
+    help = "Compare discussion render time with stored comment HTML and without"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--comments",
+            type=int,
+            default=500,
+            help="Number of comments on the synthetic page",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of times to render the page in each mode",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        now = timezone.now()
+
+        # Unsaved objects, so the benchmark measures rendering without any
+        # queries and leaves the database alone
+        user = User(id=1, username="reader")
+        authors = [User(id=i, username=f"member{i}") for i in range(2, 12)]
+        book = Book(id=1, title="Benchmark", is_active=True)
+        comments = []
+        for comment_id in range(1, options["comments"] + 1):
+            text = "\n\n".join(rng.sample(PARAGRAPHS, rng.randint(1, 3)))
+            comment = Comment(
+                id=comment_id,
+                user=rng.choice(authors),
+                book=book,
+                text=text,
+                progress_type="percent",
+                progress_value="10",
+                normalized_progress=10,
+                created_at=now,
+            )
+            comment.preview_replies = []
+            comment.reaction_summary = []
+            comments.append(comment)
+
+        context = {
+            "comments": comments,
+            "user": user,
+            "user_progress": UserBookProgress(
+                user=user, book=book, normalized_progress=50
+            ),
+            "reaction_choices": CommentReaction.REACTION_CHOICES,
+        }
+
+        def render_page():
+            start = time.perf_counter()
+            render_to_string("bookclub/includes/book_detail/comment_list.html", context)
+            return time.perf_counter() - start
+
+        # Before: the Markdown is rendered and sanitized on every page view
+        for comment in comments:
+            comment.text_html = ""
+        before = [render_page() for _ in range(options["repeat"])]
+
+        # After: the HTML stored when the comment was saved is used as is
+        for comment in comments:
+            comment.text_html = render_markdown(comment.text)
+        after = [render_page() for _ in range(options["repeat"])]
+
+        self.stdout.write(
+            f"Rendering markdown per view: {statistics.mean(before) * 1000:.1f} ms "
+            f"for {len(comments)} comments"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Using stored HTML: {statistics.mean(after) * 1000:.1f} ms "
+                f"({statistics.mean(before) / statistics.mean(after):.1f}x faster)"
+            )
+        )
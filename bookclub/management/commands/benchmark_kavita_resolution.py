@@ -0,0 +1,127 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bookclub.kavita_api import KavitaClient
+from bookclub.models import Book
+from bookclub.utils.matching import TitleIndex
+
+WORDS = (
+    "shadow night storm king queen blood fire city sea song stone river "
+    "winter crown empire glass iron house star wolf dragon garden last "
+    "silent broken lost hidden golden secret ember ash moon light dark "
+    "throne sword mirror bone thorn raven tide heart door road forest gate "
+    "witch hunter ghost island tower mountain valley echo flame frost rain "
+    "summer autumn spring bridge lantern harbor ocean desert storm empire "
+    "circle kingdom path journey promise memory dream book letter map"
+).split()
+
+
+def _summarize(samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"mean {statistics.mean(samples) * 1000:.3f} ms, p95 {p95 * 1000:.3f} ms"
+
+
+class Command(BaseCommand):
+    help = "Compare Kavita URL resolution latency for live searches and the local index"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--series",
+            type=int,
+            default=5000,
+            help="Number of synthetic series to put in the local index",
+        )
+        parser.add_argument(
+            "--lookups",
+            type=int,
+            default=500,
+            help="Number of titles to resolve against the local index",
+        )
+        parser.add_argument(
+            "--live",
+            type=int,
+            default=0,
+            help="Also resolve this many real book titles with live Kavita searches",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+
+        titles = set()
+        while len(titles) < options["series"]:
+            titles.add(" ".join(rng.sample(WORDS, rng.randint(2, 5))).title())
+        titles = sorted(titles)
+
+        start = time.perf_counter()
+        index = TitleIndex(
+            (title, "", (1, series_id, None))
+            for series_id, title in enumerate(titles, start=1)
+        )
+        build_time = time.perf_counter() - start
+        self.stdout.write(
+            f"Built index of {len(index)} series in {build_time * 1000:.1f} ms"
+        )
+
+        # A mix of exact titles, titles with a subtitle and titles not in Kavita
+        lookups = []
+        for _ in range(options["lookups"]):
+            title = rng.choice(titles)
+            kind = rng.random()
+            if kind < 0.4:
+                lookups.append(title)
+            elif kind < 0.8:
+                lookups.append(f"{title}: A Novel")
+            else:
+                lookups.append(" ".join(rng.sample(WORDS, 3)) + " unknown")
+
+        samples = []
+        matched = 0
+        for title in lookups:
+            start = time.perf_counter()
+            if index.match(title):
+                matched += 1
+            samples.append(time.perf_counter() - start)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Local index: {len(samples)} lookups, {matched} matched, "
+                f"{_summarize(samples)}"
+            )
+        )
+
+        if not options["live"]:
+            return
+
+        if not settings.KAVITA_ENABLED:
+            self.stdout.write(
+                self.style.WARNING("Kavita is not configured, skipping live searches")
+            )
+            return
+
+        live_titles = list(
+            Book.objects.values_list("title", flat=True)[: options["live"]]
+        )
+        if not live_titles:
+            self.stdout.write(self.style.WARNING("No books to search for"))
+            return
+
+        # A fresh client per lookup matches the old per-book behaviour of
+        # authenticating and searching on a new session every time
+        samples = []
+        for title in live_titles:
+            start = time.perf_counter()
+            KavitaClient(
+                settings.KAVITA_BASE_URL, settings.KAVITA_API_KEY
+            ).get_book_url(title)
+            samples.append(time.perf_counter() - start)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Live search: {len(samples)} lookups, {_summarize(samples)}"
+            )
+        )
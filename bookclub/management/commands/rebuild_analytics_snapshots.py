@@ -0,0 +1,89 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import F, Q
+
+from bookclub.models import BookGroup, GroupAnalyticsSnapshot
+from bookclub.views.attribution_analytics import (
+    get_analytics_data_format,
+    rebuild_group_analytics,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _stale_filter():
+    """Match groups whose snapshot is missing, in another format or behind on a section"""
+    stale = Q(analytics_snapshot__isnull=True) | ~Q(
+        analytics_snapshot__data_format=get_analytics_data_format()
+    )
+    for version, built_version in GroupAnalyticsSnapshot.SECTION_VERSIONS.values():
+        behind = {
+            f"analytics_snapshot__{built_version}__lt": F(
+                f"analytics_snapshot__{version}"
+            )
+        }
+        stale |= Q(**behind)
+    return stale
+
+
+class Command(BaseCommand):
+    help = "Rebuild the stored attribution analytics for every group"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--group",
+            type=int,
+            help="Only rebuild the analytics for the group with this ID",
+        )
+        parser.add_argument(
+            "--stale",
+            action="store_true",
+            help="Only rebuild snapshots that are out of date or missing",
+        )
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help="Keep polling and rebuild snapshots as they go out of date",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=settings.ANALYTICS_REBUILD_INTERVAL,
+            help="Seconds to wait between polls with --watch",
+        )
+
+    def handle(self, *args, **options):
+        only_stale = options["stale"] or options["watch"]
+
+        while True:
+            close_old_connections()
+
+            try:
+                groups = BookGroup.objects.all()
+                if options["group"]:
+                    groups = groups.filter(id=options["group"])
+                if only_stale:
+                    groups = groups.filter(_stale_filter())
+
+                written = rebuild_group_analytics(list(groups), full=not only_stale)
+            except Exception as e:
+                if not options["watch"]:
+                    raise
+                # Keep polling, a database hiccup shouldn't stop the worker
+                logger.exception(f"Error rebuilding analytics snapshots: {str(e)}")
+                written = 0
+
+            if written or not options["watch"]:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Rebuilt analytics snapshots for {written} groups"
+                    )
+                )
+
+            if not options["watch"]:
+                break
+            time.sleep(options["interval"])
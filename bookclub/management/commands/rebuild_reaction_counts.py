@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from bookclub.views.comment_utils import rebuild_reaction_counts
+
+
+class Command(BaseCommand):
+    help = "Recount the stored per-comment reaction counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--book",
+            type=int,
+            help="Only recount reactions on comments for the book with this ID",
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_reaction_counts(options["book"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} reaction counters"))
@@ -0,0 +1,91 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from bookclub.edition_cache import store_editions
+from bookclub.hardcover_api import HardcoverBatch
+from bookclub.models import Book
+from bookclub.views.book_utils import update_book_from_hardcover_data
+
+
+class Command(BaseCommand):
+    help = "Refresh book details and editions from Hardcover using batched queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "username",
+            type=str,
+            help="User whose Hardcover API key is used for the requests",
+        )
+        parser.add_argument(
+            "--group",
+            type=int,
+            help="Only refresh books in the group with this ID",
+        )
+        parser.add_argument(
+            "--skip-editions",
+            action="store_true",
+            help="Only refresh book details, not their editions",
+        )
+
+    def handle(self, *args, **options):
+        username = options["username"]
+
+        try:
+            user = User.objects.select_related("profile").get(username=username)
+        except User.DoesNotExist:
+            self.stdout.write(self.style.ERROR(f"User {username} does not exist"))
+            return
+
+        if not user.profile.hardcover_api_key:
+            self.stdout.write(
+                self.style.ERROR(f"User {username} has no Hardcover API key set")
+            )
+            return
+
+        books = Book.objects.all()
+        if options["group"]:
+            books = books.filter(group_id=options["group"])
+
+        # Queue every lookup first so they go out as a few aliased queries
+        # instead of one or two requests per book
+        lookups = []
+        with HardcoverBatch(user=user) as batch:
+            for book in books:
+                details = batch.load_book_details(book.hardcover_id)
+                editions = (
+                    None
+                    if options["skip_editions"]
+                    else batch.load_book_editions(book.hardcover_id)
+                )
+                lookups.append((book, details, editions))
+
+        refreshed = 0
+        for book, details, editions in lookups:
+            book_data = details.value
+            if not book_data:
+                reason = f": {details.error}" if details.error else ""
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"Could not retrieve details for '{book.title}'{reason}"
+                    )
+                )
+                continue
+
+            if editions and editions.error:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"Could not retrieve editions for '{book.title}': "
+                        f"{editions.error}"
+                    )
+                )
+
+            update_book_from_hardcover_data(
+                book, book_data, editions.value if editions else None
+            )
+            if editions:
+                store_editions(book.hardcover_id, editions.value)
+            refreshed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Refreshed {refreshed} of {len(lookups)} books")
+        )
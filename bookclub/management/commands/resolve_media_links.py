@@ -0,0 +1,115 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from bookclub.link_resolver import enqueue_missing_links, process_due_jobs
+from bookclub.models import MediaLinkJob
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Resolve queued Kavita and Plex links for books in the background"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the jobs that are due now and exit instead of polling",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=settings.MEDIA_LINK_POLL_INTERVAL,
+            help="Seconds to wait between polls when the queue is empty",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.MEDIA_LINK_BATCH_SIZE,
+            help="Maximum number of jobs to claim per poll",
+        )
+        parser.add_argument(
+            "--enqueue-missing",
+            action="store_true",
+            help="Queue lookups for every book that is missing a link first",
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Make failed lookups due immediately instead of waiting out their backoff",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.KAVITA_ENABLED and not settings.PLEX_ENABLED:
+            self.stdout.write(
+                self.style.WARNING("Neither Kavita nor Plex is configured, exiting")
+            )
+            return
+
+        if options["retry_failed"]:
+            count = MediaLinkJob.objects.filter(status="failed").update(
+                next_attempt_at=timezone.now()
+            )
+            self.stdout.write(f"Made {count} failed lookups due again")
+
+        if options["enqueue_missing"]:
+            count = enqueue_missing_links()
+            self.stdout.write(f"Queued lookups for {count} books")
+
+        last_library_sync = 0
+        library_syncs = 0
+        while True:
+            close_old_connections()
+
+            # Keep the local library snapshots current while polling. The
+            # first sync and every MEDIA_LIBRARY_FULL_SYNC_EVERY-th one after
+            # it are full, to drop anything removed from the library.
+            if (
+                not options["once"]
+                and time.time() - last_library_sync
+                >= settings.MEDIA_LIBRARY_SYNC_INTERVAL
+            ):
+                full_every = max(settings.MEDIA_LIBRARY_FULL_SYNC_EVERY, 1)
+                self.sync_libraries(full=library_syncs % full_every == 0)
+                library_syncs += 1
+                last_library_sync = time.time()
+
+            try:
+                resolved, failed = process_due_jobs(options["batch_size"])
+            except Exception as e:
+                if options["once"]:
+                    raise
+                # Keep polling, a database hiccup shouldn't stop the worker.
+                # Jobs claimed before it are picked up again once stale.
+                logger.exception(f"Error resolving media links: {str(e)}")
+                resolved = failed = 0
+
+            if resolved or failed:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Resolved {resolved} links, {failed} not found")
+                )
+
+            # Keep going straight away while there's a backlog
+            if resolved + failed < options["batch_size"]:
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+
+    def sync_libraries(self, full):
+        if settings.PLEX_ENABLED:
+            try:
+                call_command("sync_plex_library", full=full, stdout=self.stdout)
+            except Exception as e:
+                logger.exception(f"Error syncing Plex library: {str(e)}")
+
+        if settings.KAVITA_ENABLED:
+            try:
+                call_command("sync_kavita_library", full=full, stdout=self.stdout)
+            except Exception as e:
+                logger.exception(f"Error syncing Kavita library: {str(e)}")
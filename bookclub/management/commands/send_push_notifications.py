@@ -0,0 +1,98 @@
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from bookclub.models import PushNotification
+from bookclub.notifications import (
+    is_push_enabled,
+    process_outbox,
+    purge_old_notifications,
+)
+
+logger = logging.getLogger(__name__)
+
+# How often sent and skipped notifications are cleared out (seconds)
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = "Send queued push notifications from the outbox in the background"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send the notifications that are due now and exit instead of polling",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=settings.PUSH_NOTIFICATION_POLL_INTERVAL,
+            help="Seconds to wait between polls when the outbox is empty",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.PUSH_NOTIFICATION_BATCH_SIZE,
+            help="Maximum number of notifications to claim per poll",
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Queue notifications that gave up retrying to be sent again",
+        )
+
+    def handle(self, *args, **options):
+        if not is_push_enabled():
+            self.stdout.write(
+                self.style.WARNING("Push notifications are not configured, exiting")
+            )
+            return
+
+        if options["retry_failed"]:
+            count = PushNotification.objects.filter(status="failed").update(
+                status="pending", attempts=0, next_attempt_at=timezone.now()
+            )
+            self.stdout.write(f"Queued {count} failed notifications again")
+
+        last_purge = 0
+        while True:
+            close_old_connections()
+
+            try:
+                if time.time() - last_purge >= PURGE_INTERVAL:
+                    deleted = purge_old_notifications()
+                    if deleted:
+                        self.stdout.write(f"Deleted {deleted} old notifications")
+                    last_purge = time.time()
+
+                outcomes = process_outbox(options["batch_size"])
+            except Exception as e:
+                if options["once"]:
+                    raise
+                # Keep polling, a database hiccup shouldn't stop the worker.
+                # Notifications claimed before it are picked up again once stale.
+                logger.exception(f"Error sending push notifications: {str(e)}")
+                outcomes = Counter()
+            total = sum(outcomes.values())
+
+            if total:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Sent {outcomes['sent']} notifications, "
+                        f"{outcomes['skipped']} skipped, "
+                        f"{outcomes['retry']} to retry, "
+                        f"{outcomes['failed']} failed"
+                    )
+                )
+
+            # Keep going straight away while there's a backlog
+            if total < options["batch_size"]:
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
@@ -0,0 +1,73 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from bookclub.models import HardcoverProgressSync
+from bookclub.progress_sync import process_due_syncs
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Sync queued reading progress to Hardcover in the background"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the syncs that are due now and exit instead of polling",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=settings.HARDCOVER_SYNC_POLL_INTERVAL,
+            help="Seconds to wait between polls when the queue is empty",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.HARDCOVER_SYNC_BATCH_SIZE,
+            help="Maximum number of syncs to claim per poll",
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Queue syncs that gave up retrying to be sent again",
+        )
+
+    def handle(self, *args, **options):
+        if options["retry_failed"]:
+            count = HardcoverProgressSync.objects.filter(status="failed").update(
+                status="pending", attempts=0, next_attempt_at=timezone.now()
+            )
+            self.stdout.write(f"Queued {count} failed syncs again")
+
+        while True:
+            close_old_connections()
+
+            try:
+                synced, failed = process_due_syncs(options["batch_size"])
+            except Exception as e:
+                if options["once"]:
+                    raise
+                # Keep polling, a database hiccup shouldn't stop the worker.
+                # Syncs claimed before it are picked up again once stale.
+                logger.exception(f"Error syncing progress to Hardcover: {str(e)}")
+                synced = failed = 0
+
+            if synced or failed:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Synced progress {synced} times, {failed} failed"
+                    )
+                )
+
+            # Keep going straight away while there's a backlog
+            if synced + failed < options["batch_size"]:
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bookclub.kavita_api import sync_kavita_library
+from bookclub.models import MediaLinkJob
+
+
+class Command(BaseCommand):
+    help = "Snapshot the Kavita series and chapter catalogue into the local index used for matching"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Re-fetch chapters for every series, not just ones with new chapters",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.KAVITA_ENABLED:
+            self.stdout.write(self.style.WARNING("Kavita integration is not enabled"))
+            return
+
+        changed, removed = sync_kavita_library(full=options["full"])
+        if changed:
+            # New items may match books whose lookups already failed
+            MediaLinkJob.objects.filter(service="kavita", status="failed").update(
+                next_attempt_at=timezone.now()
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Synced {changed} new or changed series, removed {removed} items"
+            )
+        )
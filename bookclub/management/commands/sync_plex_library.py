@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bookclub.models import MediaLinkJob
+from bookclub.plex_api import sync_plex_library
+
+
+class Command(BaseCommand):
+    help = "Snapshot the Plex audiobook library into the local index used for matching"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Re-fetch every album and remove ones no longer in Plex",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.PLEX_ENABLED:
+            self.stdout.write(self.style.WARNING("Plex integration is not enabled"))
+            return
+
+        result = sync_plex_library(full=options["full"])
+        if result is None:
+            self.stdout.write(self.style.ERROR("Could not connect to Plex"))
+            return
+
+        saved, removed = result
+        if saved:
+            # New albums may match books whose lookups already failed
+            MediaLinkJob.objects.filter(service="plex", status="failed").update(
+                next_attempt_at=timezone.now()
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Synced {saved} albums, removed {removed}")
+        )
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookclub", "0025_medialinkjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlexLibraryItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rating_key", models.CharField(max_length=20, unique=True)),
+                ("title", models.CharField(max_length=500)),
+                ("artist", models.CharField(blank=True, max_length=500)),
+                ("artist_rating_key", models.CharField(blank=True, max_length=20)),
+                ("added_at", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(blank=True, null=True)),
+                ("synced_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookclub", "0026_plexlibraryitem"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="KavitaLibraryItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=30, unique=True)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("series", "Series"), ("chapter", "Chapter")],
+                        max_length=10,
+                    ),
+                ),
+                ("title", models.CharField(max_length=500)),
+                ("normalized_title", models.CharField(db_index=True, max_length=500)),
+                ("library_id", models.IntegerField()),
+                ("series_id", models.IntegerField()),
+                ("volume_id", models.IntegerField(blank=True, null=True)),
+                ("last_chapter_added", models.CharField(blank=True, max_length=50)),
+                ("synced_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
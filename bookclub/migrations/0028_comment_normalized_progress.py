@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookclub", "0027_kavitalibraryitem"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="normalized_progress",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["book", "parent", "normalized_progress"],
+                name="bookclub_co_book_id_e49edd_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing_reactions(apps, schema_editor):
+    """Fill in the counters for reactions made before they existed"""
+    CommentReaction = apps.get_model("bookclub", "CommentReaction")
+    CommentReactionCount = apps.get_model("bookclub", "CommentReactionCount")
+
+    totals = CommentReaction.objects.values("comment_id", "reaction").annotate(
+        total=Count("id")
+    )
+    CommentReactionCount.objects.bulk_create(
+        [
+            CommentReactionCount(
+                comment_id=row["comment_id"],
+                reaction=row["reaction"],
+                count=row["total"],
+            )
+            for row in totals
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookclub", "0028_comment_normalized_progress"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CommentReactionCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "reaction",
+                    models.CharField(
+                        choices=[
+                            ("👍", "Thumbs Up"),
+                            ("❤️", "Heart"),
+                            ("😂", "Laugh"),
+                            ("😮", "Wow"),
+                            ("😢", "Sad"),
+                            ("🎉", "Celebrate"),
+                            ("💡", "Idea"),
+                            ("📚", "Book"),
+                            ("☠️", "Skull and Crossbones"),
+                            ("👻", "Ghost"),
+                            ("💩", "Hankey"),
+                            ("👽", "Alien"),
+                            ("🧑\u200d🦼", "Person in Motorized Wheelchair"),
+                            ("🧑\u200d🦯", "Person with Probing Cane"),
+                            ("✨", "Sparkles"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "comment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reaction_counts",
+                        to="bookclub.comment",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("comment", "reaction")},
+            },
+        ),
+        migrations.RunPython(count_existing_reactions, migrations.RunPython.noop),
+    ]
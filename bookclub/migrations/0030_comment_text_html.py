@@ -0,0 +1,41 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:41
+
+from django.db import migrations, models
+
+from bookclub.utils.formatting import render_markdown
+
+
+def render_existing_comments(apps, schema_editor):
+    """Store the rendered HTML for comments written before it was stored"""
+    Comment = apps.get_model("bookclub", "Comment")
+
+    last_id = 0
+    while True:
+        batch = list(
+            Comment.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .only("id", "text")[:500]
+        )
+        if not batch:
+            return
+
+        for comment in batch:
+            comment.text_html = render_markdown(comment.text)
+        Comment.objects.bulk_update(batch, ["text_html"])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookclub", "0029_commentreactioncount"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="text_html",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.RunPython(render_existing_comments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookclub", "0030_comment_text_html"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GroupAnalyticsSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.PositiveIntegerField(default=1)),
+                ("built_version", models.PositiveIntegerField(default=0)),
+                ("data_format", models.PositiveIntegerField(default=0)),
+                ("data", models.JSONField(default=dict)),
+                ("built_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "group",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="analytics_snapshot",
+                        to="bookclub.bookgroup",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:58
+
+import json
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_profile_subscriptions(apps, schema_editor):
+    """Move each profile's single push subscription into the new table"""
+    UserProfile = apps.get_model("bookclub", "UserProfile")
+    PushSubscription = apps.get_model("bookclub", "PushSubscription")
+
+    subscriptions = {}
+    profiles = UserProfile.objects.exclude(push_subscription__isnull=True).exclude(
+        push_subscription=""
+    )
+    for profile in profiles:
+        try:
+            endpoint = json.loads(profile.push_subscription)["endpoint"]
+        except (ValueError, KeyError, TypeError):
+            continue
+        subscriptions[endpoint] = PushSubscription(
+            user_id=profile.user_id,
+            endpoint=endpoint,
+            subscription=profile.push_subscription,
+        )
+
+    PushSubscription.objects.bulk_create(subscriptions.values(), batch_size=500)
+
+
+def copy_subscriptions_to_profiles(apps, schema_editor):
+    """Keep each user's newest subscription when going back to one per profile"""
+    UserProfile = apps.get_model("bookclub", "UserProfile")
+    PushSubscription = apps.get_model("bookclub", "PushSubscription")
+
+    for subscription in PushSubscription.objects.order_by("created_at"):
+        UserProfile.objects.filter(user_id=subscription.user_id).update(
+            push_subscription=subscription.subscription
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookclub", "0032_pushnotification"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PushSubscription",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("endpoint", models.CharField(max_length=500, unique=True)),
+                (
+                    "subscription",
+                    models.TextField(help_text="Subscription JSON from the browser"),
+                ),
+                ("user_agent", models.CharField(blank=True, max_length=300)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("last_success_at", models.DateTimeField(blank=True, null=True)),
+                ("success_count", models.PositiveIntegerField(default=0)),
+                ("failure_count", models.PositiveIntegerField(default=0)),
+                ("last_failure_at", models.DateTimeField(blank=True, null=True)),
+                ("last_error", models.TextField(blank=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="push_subscriptions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(
+            copy_profile_subscriptions, copy_subscriptions_to_profiles
+        ),
+        migrations.RemoveField(
+            model_name="userprofile",
+            name="push_subscription",
+        ),
+    ]
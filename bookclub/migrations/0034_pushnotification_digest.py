@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookclub", "0033_pushsubscription"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pushnotification",
+            name="digest",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookclub", "0035_hardcoverprogresssync"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="groupanalyticssnapshot",
+            name="bets_built_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="groupanalyticssnapshot",
+            name="bets_version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="groupanalyticssnapshot",
+            name="media_built_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="groupanalyticssnapshot",
+            name="media_version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name="groupanalyticssnapshot",
+            name="data_format",
+            field=models.CharField(blank=True, max_length=50),
+        ),
+    ]
@@ -6,12 +6,15 @@ from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models, transaction
-from django.db.models import Count
-from django.db.models.signals import post_save
+from django.db.models import DEFERRED, Count
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
+from django.utils.safestring import mark_safe
 from django_cryptography.fields import encrypt
 
+from .utils.formatting import render_markdown
+
 
 class BookGroup(models.Model):
     name = models.CharField(max_length=200)
@@ -78,6 +81,28 @@ class Book(models.Model):
     def __str__(self):
         return f"{self.title} by {self.author}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored lengths so save() can tell when they change
+        instance._loaded_length = (
+            instance.__dict__.get("pages"),
+            instance.__dict__.get("audio_seconds"),
+        )
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+        # Comments without an edition measure progress against the book
+        previous_length = getattr(self, "_loaded_length", None)
+        length = (self.pages, self.audio_seconds)
+        if previous_length is not None and previous_length != length:
+            from .views.book_utils import refresh_comment_progress
+
+            refresh_comment_progress(self.comments.all())
+        self._loaded_length = length
+
     def set_active(self):
         """Set this book as the active book for its group and deactivate others"""
         # Start a transaction to ensure consistency
@@ -127,6 +152,27 @@ class BookEdition(models.Model):
 
         super().save(*args, **kwargs)
 
+        # Stored comment progress is relative to the edition's length
+        previous_length = getattr(self, "_loaded_length", None)
+        length = (self.pages, self.audio_seconds)
+        if previous_length is not None and previous_length != length:
+            from .views.book_utils import refresh_comment_progress
+
+            refresh_comment_progress(
+                Comment.objects.filter(hardcover_edition_id=self.hardcover_edition_id)
+            )
+        self._loaded_length = length
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored lengths so save() can tell when they change
+        instance._loaded_length = (
+            instance.__dict__.get("pages"),
+            instance.__dict__.get("audio_seconds"),
+        )
+        return instance
+
     @property
     def audio_duration_formatted(self):
         """Return a human-readable audio duration"""
@@ -169,19 +215,85 @@ class Comment(models.Model):
     hardcover_reading_format = models.CharField(max_length=10, null=True, blank=True)
     hardcover_edition_id = models.CharField(max_length=50, null=True, blank=True)
 
+    # Progress as a value between 0-100, calculated on save. Null until
+    # backfilled for comments saved before it existed.
+    normalized_progress = models.FloatField(null=True, blank=True)
+
+    # Sanitized HTML of the Markdown text, rendered on save when the text changes
+    text_html = models.TextField(blank=True, default="")
+
+    class Meta:
+        indexes = [models.Index(fields=["book", "parent", "normalized_progress"])]
+
     def __str__(self):
         return f"Comment by {self.user.username} on {self.book.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored text so save() only re-renders it when it changes
+        instance._loaded_text = instance.__dict__.get("text")
+        return instance
+
+    def save(self, *args, **kwargs):
+        from .views.book_utils import _get_progress_value_for_sorting
+
+        # Calculate normalized progress before saving
+        self.normalized_progress = _get_progress_value_for_sorting(self)
+        extra_fields = ["normalized_progress"]
+
+        if not self.text_html or getattr(self, "_loaded_text", None) != self.text:
+            self.text_html = render_markdown(self.text)
+            extra_fields.append("text_html")
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = list(update_fields) + [
+                field for field in extra_fields if field not in update_fields
+            ]
+
+        super().save(*args, **kwargs)
+        self._loaded_text = self.text
+
+    @property
+    def rendered_text(self):
+        """The comment text as sanitized HTML"""
+        return mark_safe(self.text_html or render_markdown(self.text))
+
     # Method to check if this is a top-level comment
     def is_parent(self):
         return self.parent is None
 
     def get_replies(self):
+        if hasattr(self, "preview_replies"):
+            # Only the first few replies were loaded, see Comment.replies_prefetch
+            return self.preview_replies
         if not hasattr(self, "replies"):
             # Field might not exist if model was recently updated
             return Comment.objects.none()
+        if "replies" in getattr(self, "_prefetched_objects_cache", {}):
+            # Prefetched replies are already ordered, see Comment.replies_prefetch
+            return self.replies.all()
         return self.replies.all().order_by("created_at")
 
+    @staticmethod
+    def replies_prefetch(limit=None):
+        """
+        Prefetch for loading the replies of many comments in one query
+
+        Args:
+            limit (int): Only load this many of the earliest replies per
+                comment, into a preview_replies list
+        """
+        queryset = Comment.objects.select_related("user", "book").order_by(
+            "created_at", "id"
+        )
+        if limit is None:
+            return models.Prefetch("replies", queryset=queryset)
+        return models.Prefetch(
+            "replies", queryset=queryset[:limit], to_attr="preview_replies"
+        )
+
     def get_reactions_summary(self):
         """Get a summary of reactions for this comment"""
         reactions = self.reactions.values("reaction").annotate(count=Count("id"))
@@ -229,6 +341,47 @@ class CommentReaction(models.Model):
         unique_together = ("comment", "user", "reaction")
 
 
+class CommentReactionCount(models.Model):
+    """
+    Number of reactions of one type on a comment
+
+    Kept in step with CommentReaction by signals, so the totals can be read
+    without counting reaction rows. Deletes cascading from a comment or user
+    send post_delete per reaction, so they are counted too.
+    """
+
+    comment = models.ForeignKey(
+        Comment, on_delete=models.CASCADE, related_name="reaction_counts"
+    )
+    reaction = models.CharField(max_length=10, choices=CommentReaction.REACTION_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("comment", "reaction")
+
+
+@receiver(post_save, sender=CommentReaction)
+def reaction_added(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    counter, counter_created = CommentReactionCount.objects.get_or_create(
+        comment_id=instance.comment_id,
+        reaction=instance.reaction,
+        defaults={"count": 1},
+    )
+    if not counter_created:
+        CommentReactionCount.objects.filter(id=counter.id).update(
+            count=models.F("count") + 1
+        )
+
+
+@receiver(post_delete, sender=CommentReaction)
+def reaction_removed(sender, instance, **kwargs):
+    CommentReactionCount.objects.filter(
+        comment_id=instance.comment_id, reaction=instance.reaction, count__gt=0
+    ).update(count=models.F("count") - 1)
+
+
 class UserBookProgress(models.Model):
     """Track user's reading progress for a specific book."""
 
@@ -304,6 +457,15 @@ class UserBookProgress(models.Model):
         edition_str = f" ({self.edition})" if self.edition else ""
         return f"{self.user.username}'s progress on {self.book.title}{edition_str}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the rating as loaded, so saves that don't change it can be
+        # told apart, see progress_analytics_changed
+        if {"hardcover_rating", "local_rating"} <= set(field_names):
+            instance._loaded_rating = instance.effective_rating
+        return instance
+
     def save(self, *args, **kwargs):
         # Calculate normalized progress before saving
         self.normalized_progress = self._calculate_normalized_progress()
@@ -476,7 +638,6 @@ class UserProfile(models.Model):
     hardcover_api_key = encrypt(models.TextField(blank=True, null=True))
     can_create_groups = models.BooleanField(default=False)
     enable_notifications = models.BooleanField(default=False)
-    push_subscription = models.TextField(blank=True, null=True)
 
     notification_preferences = models.JSONField(
         default=dict,
@@ -493,6 +654,24 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username}'s profile"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored API key so save() can tell when it changes
+        instance._loaded_hardcover_api_key = instance.__dict__.get("hardcover_api_key")
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+        # Forget the Hardcover user ID cached for a replaced or removed key
+        previous_api_key = getattr(self, "_loaded_hardcover_api_key", None)
+        if previous_api_key and previous_api_key != self.hardcover_api_key:
+            from .hardcover_api import forget_hardcover_user_id
+
+            forget_hardcover_user_id(previous_api_key)
+        self._loaded_hardcover_api_key = self.hardcover_api_key
+
     def get_notification_preference(self, notification_type):
         """Get a specific notification preference"""
         if not self.notification_preferences:
@@ -714,3 +893,296 @@ class DollarBet(models.Model):
         self.resolved_at = timezone.now()
         self.resolved_by = resolved_by_user
         self.save()
+
+
+class MediaLinkJob(models.Model):
+    """A queued lookup for a book's link in an external media server."""
+
+    SERVICE_CHOICES = [
+        ("kavita", "Kavita"),
+        ("plex", "Plex"),
+    ]
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("resolved", "Resolved"),
+        ("failed", "Failed"),
+    ]
+
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="media_link_jobs"
+    )
+    service = models.CharField(max_length=10, choices=SERVICE_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("book", "service")
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"{self.get_service_display()} lookup for '{self.book.title}' ({self.status})"
+
+
+class PushSubscription(models.Model):
+    """A browser or device a user has subscribed to push notifications on."""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="push_subscriptions"
+    )
+    endpoint = models.CharField(max_length=500, unique=True)
+    subscription = models.TextField(help_text="Subscription JSON from the browser")
+    user_agent = models.CharField(max_length=300, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_success_at = models.DateTimeField(null=True, blank=True)
+    success_count = models.PositiveIntegerField(default=0)
+    # Failures since the last successful delivery
+    failure_count = models.PositiveIntegerField(default=0)
+    last_failure_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.user.username}'s push subscription {self.id}"
+
+
+class PushNotification(models.Model):
+    """A push notification waiting in the outbox to be sent to one user."""
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("sent", "Sent"),
+        ("skipped", "Skipped"),
+        ("failed", "Failed"),
+    ]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="push_notifications"
+    )
+    notification_type = models.CharField(max_length=50, blank=True)
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+    url = models.CharField(max_length=500, blank=True)
+    icon = models.CharField(max_length=500, blank=True)
+    # Held until next_attempt_at and sent with the user's other digest rows
+    digest = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"'{self.title}' for {self.user.username} ({self.status})"
+
+
+class HardcoverProgressSync(models.Model):
+    """A queued push of a user's latest reading progress for a book to Hardcover."""
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("synced", "Synced"),
+        ("failed", "Failed"),
+    ]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="hardcover_syncs"
+    )
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="hardcover_syncs"
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # When the sync was last asked for, so a worker doesn't record its result
+    # over a newer request that came in while it was running
+    requested_at = models.DateTimeField(default=timezone.now)
+    synced_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("user", "book")
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"Hardcover sync of '{self.book.title}' for {self.user.username} ({self.status})"
+
+
+class PlexLibraryItem(models.Model):
+    """Local snapshot of an album in the configured Plex audiobook library."""
+
+    rating_key = models.CharField(max_length=20, unique=True)
+    title = models.CharField(max_length=500)
+    artist = models.CharField(max_length=500, blank=True)
+    artist_rating_key = models.CharField(max_length=20, blank=True)
+    added_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.title} by {self.artist}"
+
+
+class KavitaLibraryItem(models.Model):
+    """Local snapshot of a series or chapter in the Kavita library."""
+
+    KIND_CHOICES = [
+        ("series", "Series"),
+        ("chapter", "Chapter"),
+    ]
+
+    # "series:<id>" or "chapter:<id>", unique across both kinds
+    key = models.CharField(max_length=30, unique=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    title = models.CharField(max_length=500)
+    normalized_title = models.CharField(max_length=500, db_index=True)
+    library_id = models.IntegerField()
+    series_id = models.IntegerField()
+    volume_id = models.IntegerField(null=True, blank=True)
+    # Kavita's lastChapterAdded for series rows, used to skip unchanged series
+    last_chapter_added = models.CharField(max_length=50, blank=True)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
+
+
+class GroupAnalyticsSnapshot(models.Model):
+    """
+    Precomputed attribution analytics for a group
+
+    The analytics are split into sections that are rebuilt separately. Each
+    has a version that signals bump whenever something it depends on
+    changes, and a built version recording what the stored data reflects.
+    The rebuild_analytics_snapshots worker rebuilds just the sections that
+    have fallen behind. Data stored in an older `data_format`, or under
+    different site settings, is never served.
+    """
+
+    # Section name: (version field, built version field)
+    SECTION_VERSIONS = {
+        "core": ("version", "built_version"),
+        "dollar_bets": ("bets_version", "bets_built_version"),
+        "media": ("media_version", "media_built_version"),
+    }
+
+    group = models.OneToOneField(
+        BookGroup, on_delete=models.CASCADE, related_name="analytics_snapshot"
+    )
+    # Picks, ratings, rotation and fairness
+    version = models.PositiveIntegerField(default=1)
+    built_version = models.PositiveIntegerField(default=0)
+    bets_version = models.PositiveIntegerField(default=1)
+    bets_built_version = models.PositiveIntegerField(default=0)
+    media_version = models.PositiveIntegerField(default=1)
+    media_built_version = models.PositiveIntegerField(default=0)
+    data_format = models.CharField(max_length=50, blank=True)
+    data = models.JSONField(default=dict)
+    built_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Analytics for {self.group.name} (v{self.version})"
+
+    @property
+    def has_current_format(self):
+        from .views.attribution_analytics import get_analytics_data_format
+
+        return self.built_at is not None and (
+            self.data_format == get_analytics_data_format()
+        )
+
+    @property
+    def stale_sections(self):
+        return [
+            section
+            for section, (version, built_version) in self.SECTION_VERSIONS.items()
+            if getattr(self, version) != getattr(self, built_version)
+        ]
+
+    @property
+    def is_current(self):
+        return self.has_current_format and not self.stale_sections
+
+
+def mark_analytics_stale(sections, **group_filter):
+    """Bump the versions of analytics sections for the groups matching the filter"""
+    versions = [
+        GroupAnalyticsSnapshot.SECTION_VERSIONS[section][0] for section in sections
+    ]
+    GroupAnalyticsSnapshot.objects.filter(**group_filter).update(
+        **{version: models.F(version) + 1 for version in versions}
+    )
+
+
+@receiver([post_save, post_delete], sender=Book)
+def book_changed(sender, instance, **kwargs):
+    mark_analytics_stale(["core", "media"], group_id=instance.group_id)
+
+
+@receiver([post_save, post_delete], sender=MemberStartingPoint)
+def starting_point_changed(sender, instance, **kwargs):
+    mark_analytics_stale(["core"], group_id=instance.group_id)
+
+
+@receiver([post_save, post_delete], sender=DollarBet)
+def dollar_bet_changed(sender, instance, **kwargs):
+    mark_analytics_stale(["dollar_bets"], group_id=instance.group_id)
+
+
+@receiver([post_save, post_delete], sender=BookEdition)
+def edition_changed(sender, instance, **kwargs):
+    mark_analytics_stale(["media"], group__books=instance.book_id)
+
+
+@receiver(post_save, sender=UserBookProgress)
+def progress_analytics_changed(sender, instance, created, update_fields, **kwargs):
+    # Only ratings feed into the analytics, so most progress saves, including
+    # the background Hardcover syncs, leave the snapshot alone
+    if update_fields is not None and not {"hardcover_rating", "local_rating"} & set(
+        update_fields
+    ):
+        return
+
+    rating = instance.effective_rating
+    previous = None if created else getattr(instance, "_loaded_rating", DEFERRED)
+    instance._loaded_rating = rating
+    if rating != previous:
+        mark_analytics_stale(["core"], group__books=instance.book_id)
+
+
+@receiver(post_delete, sender=UserBookProgress)
+def progress_analytics_deleted(sender, instance, **kwargs):
+    if instance.effective_rating is not None:
+        mark_analytics_stale(["core"], group__books=instance.book_id)
+
+
+@receiver(post_save, sender=BookGroup)
+def group_analytics_changed(sender, instance, **kwargs):
+    # Dollar bet stats depend on the group's enable_dollar_bets
+    mark_analytics_stale(["dollar_bets"], group_id=instance.id)
+
+
+@receiver(m2m_changed, sender=BookGroup.members.through)
+@receiver(m2m_changed, sender=BookGroup.admins.through)
+def group_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        mark_analytics_stale(["core"], group_id=instance.id)
+    elif pk_set:
+        mark_analytics_stale(["core"], group_id__in=pk_set)
+    else:
+        # All of a user's groups were cleared
+        mark_analytics_stale(["core"])
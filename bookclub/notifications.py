@@ -1,9 +1,19 @@
 import json
 import logging
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
 
+import requests
 from django.conf import settings
+from django.db.models import F, Max, Q, QuerySet
+from django.utils import timezone
+from django.utils.text import Truncator
 from pywebpush import WebPushException, webpush
 
+from .models import PushNotification, PushSubscription
+
 logger = logging.getLogger(__name__)
 
 # Get VAPID settings from Django settings
@@ -12,15 +22,20 @@ VAPID_CLAIMS = {
     "sub": f"mailto:{getattr(settings, 'VAPID_CONTACT_EMAIL', 'your-email@example.com')}"
 }
 
-# Define notification types
+# Define notification types. Digest types are held for PUSH_DIGEST_WINDOW
+# seconds and sent together with any others the user gets in that time, the
+# rest are sent as soon as possible
 NOTIFICATION_TYPES = {
-    "new_active_books": "New Active Books",
-    "new_dollar_bets": "New Dollar Bets",
-    "bet_accepted": "Bet Accepted",
-    "bet_added_to": "Added to Bet",
-    "bet_resolved": "Bet Resolved",
+    "new_active_books": {"label": "New Active Books", "digest": True},
+    "new_dollar_bets": {"label": "New Dollar Bets", "digest": True},
+    "bet_accepted": {"label": "Bet Accepted", "digest": False},
+    "bet_added_to": {"label": "Added to Bet", "digest": True},
+    "bet_resolved": {"label": "Bet Resolved", "digest": True},
 }
 
+# Longest line, in characters, for each notification listed in a digest
+DIGEST_LINE_LENGTH = 120
+
 
 def is_push_enabled():
     """
@@ -29,11 +44,258 @@ def is_push_enabled():
     return getattr(settings, "PUSH_NOTIFICATIONS_ENABLED", False)
 
 
+def is_digest_type(notification_type):
+    """Check if notifications of a type are held back and sent as a digest"""
+    if settings.PUSH_DIGEST_WINDOW <= 0:
+        return False
+    return NOTIFICATION_TYPES.get(notification_type, {}).get("digest", False)
+
+
+def _skip_reason(user, notification_type):
+    """Get why a user shouldn't be sent a notification, or None if they should"""
+    user_profile = getattr(user, "profile", None)
+    if user_profile is None or not user_profile.enable_notifications:
+        return f"Notifications not enabled for user {user.username}"
+
+    # Check for specific notification type preference if provided
+    if notification_type:
+        preferences = user_profile.notification_preferences or {}
+        if not preferences.get(notification_type, False):
+            return f"User {user.username} has opted out of {notification_type} notifications"
+
+    return None
+
+
+@lru_cache(maxsize=1024)
+def _parse_subscription(push_subscription):
+    """
+    Parse a stored push subscription, or get None if it isn't valid JSON
+
+    Subscriptions rarely change, so each one is only parsed once per process.
+    The returned dict is shared and must not be modified.
+    """
+    try:
+        return json.loads(push_subscription)
+    except (TypeError, json.JSONDecodeError):
+        return None
+
+
+def save_push_subscription(user, subscription_info, user_agent=""):
+    """
+    Store a device's push subscription for a user
+
+    Subscriptions are keyed by endpoint, so subscribing the same browser
+    again updates it, and a browser used by someone new moves to them.
+
+    Returns:
+        PushSubscription: The stored subscription
+    """
+    subscription, _ = PushSubscription.objects.update_or_create(
+        endpoint=subscription_info["endpoint"],
+        defaults={
+            "user": user,
+            "subscription": json.dumps(subscription_info),
+            "user_agent": user_agent[:300],
+            "failure_count": 0,
+        },
+    )
+    return subscription
+
+
+def get_push_recipients(users, notification_type=None):
+    """
+    Get the users who should be sent a notification, with their devices
+
+    Subscriptions are loaded with their users and profiles in a single query,
+    rather than one lookup per user.
+
+    Args:
+        users: QuerySet or iterable of users to consider
+        notification_type: Type of notification (from NOTIFICATION_TYPES)
+
+    Returns:
+        list: (user, subscriptions) pairs for every eligible user
+    """
+    if isinstance(users, QuerySet):
+        subscriptions = PushSubscription.objects.filter(user__in=users)
+    else:
+        subscriptions = PushSubscription.objects.filter(
+            user_id__in=[user.pk for user in users]
+        )
+
+    subscriptions = (
+        subscriptions.filter(user__profile__enable_notifications=True)
+        .select_related("user__profile")
+        .order_by("user_id", "id")
+    )
+
+    recipients = {}
+    for subscription in subscriptions:
+        if subscription.user_id not in recipients:
+            if _skip_reason(subscription.user, notification_type):
+                recipients[subscription.user_id] = None
+                continue
+            recipients[subscription.user_id] = (subscription.user, [])
+        if recipients[subscription.user_id] is not None:
+            recipients[subscription.user_id][1].append(subscription)
+    return [recipient for recipient in recipients.values() if recipient]
+
+
+def _deliver(subscription_info, title, body, url=None, icon=None):
+    """Send a notification to one push subscription, raising on failure"""
+    data = {
+        "title": title,
+        "body": body,
+        "url": url or "/",
+    }
+    if icon:
+        data["icon"] = icon
+
+    webpush(
+        subscription_info=subscription_info,
+        data=json.dumps(data),
+        vapid_private_key=VAPID_PRIVATE_KEY,
+        # webpush adds the push service's audience to the claims it's given,
+        # so each send needs its own copy
+        vapid_claims=dict(VAPID_CLAIMS),
+        timeout=settings.PUSH_NOTIFICATION_TIMEOUT,
+    )
+
+
+def _response_status(error):
+    response = getattr(error, "response", None)
+    return response.status_code if response is not None else None
+
+
+def _send_to_device(subscription, title, body, url=None, icon=None):
+    """
+    Send a notification to one of a user's devices
+
+    Runs in a thread pool, so it only uses the subscription and its user,
+    which must already be loaded, and never queries the database.
+
+    Returns:
+        tuple: (outcome, error) where outcome is "sent", "expired", "retry"
+        or "failed"
+    """
+    username = subscription.user.username
+    subscription_info = _parse_subscription(subscription.subscription)
+    if subscription_info is None:
+        logger.error(f"Invalid subscription JSON for user {username}")
+        return "expired", "Invalid subscription JSON"
+
+    try:
+        _deliver(subscription_info, title, body, url, icon)
+    except WebPushException as e:
+        status = _response_status(e)
+        if status in (404, 410):
+            logger.info(f"Subscription {subscription.id} expired for user {username}")
+            return "expired", "Subscription expired"
+
+        logger.warning(f"WebPush error for user {username}: {str(e)}")
+        # Rate limits and push service outages are worth trying again
+        if status is None or status == 429 or status >= 500:
+            return "retry", str(e)
+        return "failed", str(e)
+    except requests.RequestException as e:
+        logger.warning(f"Could not reach push service for {username}: {str(e)}")
+        return "retry", str(e)
+    except Exception as e:
+        logger.exception(f"Error sending notification to {username}: {str(e)}")
+        return "retry", str(e)
+
+    logger.info(f"Successfully sent notification to {username}")
+    return "sent", ""
+
+
+def _send_to_devices(deliveries):
+    """
+    Send notifications to devices all at once
+
+    They're sent from a pool of PUSH_NOTIFICATION_WORKERS threads, so one slow
+    push service doesn't hold up the rest.
+
+    Args:
+        deliveries: List of (subscription, title, body, url, icon) tuples
+
+    Returns:
+        list: (outcome, error) for each delivery, in the same order
+    """
+    if not deliveries:
+        return []
+
+    workers = min(settings.PUSH_NOTIFICATION_WORKERS, len(deliveries))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda delivery: _send_to_device(*delivery), deliveries))
+
+
+def _record_device_outcomes(subscriptions, outcomes):
+    """
+    Update each device's counters and remove the ones that are gone
+
+    Devices are removed when the push service says the subscription has
+    expired, or after PUSH_SUBSCRIPTION_MAX_FAILURES failures in a row.
+    """
+    now = timezone.now()
+    sent = []
+    expired = []
+    failed = defaultdict(list)
+    for subscription, (outcome, error) in zip(subscriptions, outcomes):
+        if outcome == "sent":
+            sent.append(subscription.id)
+        elif outcome == "expired":
+            expired.append(subscription.id)
+        else:
+            failed[error].append(subscription.id)
+
+    if sent:
+        PushSubscription.objects.filter(id__in=sent).update(
+            last_success_at=now,
+            success_count=F("success_count") + 1,
+            failure_count=0,
+            last_error="",
+        )
+
+    for error, ids in failed.items():
+        PushSubscription.objects.filter(id__in=ids).update(
+            failure_count=F("failure_count") + 1,
+            last_failure_at=now,
+            last_error=error,
+        )
+
+    failing = PushSubscription.objects.filter(
+        id__in=[device_id for ids in failed.values() for device_id in ids],
+        failure_count__gte=settings.PUSH_SUBSCRIPTION_MAX_FAILURES,
+    ).values_list("id", flat=True)
+    dead = expired + list(failing)
+    if dead:
+        logger.info(f"Removing {len(dead)} dead push subscriptions")
+        PushSubscription.objects.filter(id__in=dead).delete()
+
+
+def _combine_outcomes(outcomes):
+    """
+    Get a notification's outcome from the outcomes on each of the user's
+    devices
+
+    It counts as sent if any device got it, and is only retried if none did,
+    so devices that already have it aren't sent it twice.
+    """
+    for wanted in ("sent", "retry"):
+        for outcome, error in outcomes:
+            if outcome == wanted:
+                return outcome, error
+    return "failed", outcomes[0][1]
+
+
 def send_push_notification(
     user, title, body, url=None, icon=None, notification_type=None
 ):
     """
-    Send a push notification to a user
+    Send a push notification to all of a user's devices straight away
+
+    Views should use queue_push_notifications() instead, so the push service
+    is called by the outbox worker rather than during the request.
 
     Args:
         user: User object to send notification to
@@ -42,6 +304,9 @@ def send_push_notification(
         url: URL to open when notification is clicked
         icon: URL to the notification icon
         notification_type: Type of notification (from NOTIFICATION_TYPES)
+
+    Returns:
+        bool: True if at least one device was sent the notification
     """
     # First check if push notifications are enabled globally
     if not is_push_enabled():
@@ -49,73 +314,283 @@ def send_push_notification(
         return False
 
     try:
-        user_profile = user.profile
-
-        # Check if user has enabled notifications globally
-        if not user_profile.enable_notifications:
-            logger.info(f"Notifications not enabled for user {user.username}")
+        reason = _skip_reason(user, notification_type)
+        if reason:
+            logger.info(reason)
             return False
 
-        if not user_profile.push_subscription:
+        subscriptions = list(user.push_subscriptions.select_related("user"))
+        if not subscriptions:
             logger.info(f"No push subscription for user {user.username}")
             return False
 
-        # Check for specific notification type preference if provided
-        if notification_type:
-            # Get preferences, defaulting to empty dict if None
-            preferences = user_profile.notification_preferences or {}
-
-            # Check if this specific notification type is enabled
-            if not preferences.get(notification_type, False):
-                logger.info(
-                    f"User {user.username} has opted out of {notification_type} notifications"
-                )
-                return False
-
-        # Prepare the notification data
-        data = {
-            "title": title,
-            "body": body,
-            "url": url or "/",
-        }
-
-        if icon:
-            data["icon"] = icon
-
-        # Get the subscription info
-        try:
-            subscription_info = json.loads(user_profile.push_subscription)
-        except json.JSONDecodeError:
-            logger.error(f"Invalid subscription JSON for user {user.username}")
-            user_profile.push_subscription = None
-            user_profile.save()
-            return False
-
         # Log that we're sending a notification
         logger.info(
-            f"Sending push notification to {user.username}: {title} (type: {notification_type or 'general'})"
+            f"Sending push notification to {user.username} on {len(subscriptions)} devices: "
+            f"{title} (type: {notification_type or 'general'})"
         )
 
-        # Send the notification
-        webpush(
-            subscription_info=subscription_info,
-            data=json.dumps(data),
-            vapid_private_key=VAPID_PRIVATE_KEY,
-            vapid_claims=VAPID_CLAIMS,
+        outcomes = _send_to_devices(
+            [(subscription, title, body, url, icon) for subscription in subscriptions]
         )
-
-        logger.info(f"Successfully sent notification to {user.username}")
-        return True
-    except WebPushException as e:
-        if e.response and e.response.status_code == 410:
-            # Subscription expired
-            logger.info(f"Subscription expired for user {user.username}")
-            user_profile.push_subscription = None
-            user_profile.enable_notifications = False
-            user_profile.save()
-        else:
-            logger.exception(f"WebPush error for user {user.username}: {str(e)}")
-        return False
+        _record_device_outcomes(subscriptions, outcomes)
+        return _combine_outcomes(outcomes)[0] == "sent"
     except Exception as e:
         logger.exception(f"Error sending notification to {user.username}: {str(e)}")
         return False
+
+
+def queue_push_notifications(
+    users, title, body, url=None, icon=None, notification_type=None
+):
+    """
+    Add a push notification for each user to the outbox
+
+    Users who wouldn't receive the notification are left out, so this costs
+    one query to find the recipients and one insert however many users there
+    are. The send_push_notifications worker delivers them.
+
+    Digest types join the user's open digest, or start one that is sent
+    PUSH_DIGEST_WINDOW seconds from now.
+
+    Args:
+        users: QuerySet or iterable of users to notify
+        title: Title of the notification
+        body: Body text of the notification
+        url: URL to open when notification is clicked
+        icon: URL to the notification icon
+        notification_type: Type of notification (from NOTIFICATION_TYPES)
+
+    Returns:
+        int: Number of notifications queued
+    """
+    if not is_push_enabled():
+        return 0
+
+    recipients = [user for user, _ in get_push_recipients(users, notification_type)]
+    if not recipients:
+        return 0
+
+    now = timezone.now()
+    digest = is_digest_type(notification_type)
+    window_end = now
+    send_at = {}
+    if digest:
+        # Digests that haven't gone out yet, by when they're due
+        send_at = dict(
+            PushNotification.objects.filter(
+                user__in=recipients,
+                digest=True,
+                status="pending",
+                attempts=0,
+                next_attempt_at__gt=now,
+            )
+            .values("user_id")
+            .annotate(send_at=Max("next_attempt_at"))
+            .values_list("user_id", "send_at")
+        )
+        window_end = now + timedelta(seconds=settings.PUSH_DIGEST_WINDOW)
+
+    notifications = PushNotification.objects.bulk_create(
+        [
+            PushNotification(
+                user=user,
+                notification_type=notification_type or "",
+                title=title,
+                body=body,
+                url=url or "",
+                icon=icon or "",
+                digest=digest,
+                next_attempt_at=send_at.get(user.id, window_end),
+            )
+            for user in recipients
+        ]
+    )
+    return len(notifications)
+
+
+def get_retry_delay(attempts):
+    """Get the backoff before retrying a notification that has failed `attempts` times"""
+    delay = settings.PUSH_NOTIFICATION_RETRY_BASE * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(delay, settings.PUSH_NOTIFICATION_RETRY_MAX))
+
+
+def _claim_due_notifications(limit):
+    """
+    Mark due notifications as running and return the ones this worker won
+
+    Takes up to `limit` notifications, plus any more needed to complete the
+    digests of the users among them.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.PUSH_NOTIFICATION_STALE_AFTER)
+    due = Q(status="pending", next_attempt_at__lte=now) | Q(
+        status="running", updated_at__lt=stale_before
+    )
+
+    rows = list(
+        PushNotification.objects.filter(due)
+        .order_by("next_attempt_at", "user_id")
+        .values_list("id", "user_id", "digest")[:limit]
+    )
+    if not rows:
+        return []
+
+    # The limit can cut through a user's digest, so take the rest of the due
+    # digest rows for those users too rather than send them a second push
+    ids = [row_id for row_id, _, _ in rows]
+    digest_users = {user_id for _, user_id, digest in rows if digest}
+    if digest_users:
+        ids += (
+            PushNotification.objects.filter(due, digest=True, user_id__in=digest_users)
+            .exclude(id__in=ids)
+            .values_list("id", flat=True)
+        )
+
+    # Only rows still due are taken, so another worker claiming the same
+    # rows in the meantime leaves them with a different updated_at
+    PushNotification.objects.filter(due, id__in=ids).update(
+        status="running", updated_at=now
+    )
+    return list(
+        PushNotification.objects.filter(
+            id__in=ids, status="running", updated_at=now
+        ).select_related("user__profile")
+    )
+
+
+def _record_outcomes(notifications, outcomes):
+    """Save the outcome of each notification with as few queries as possible"""
+    now = timezone.now()
+    finished = defaultdict(list)
+
+    for notification, (outcome, error) in zip(notifications, outcomes):
+        if outcome == "retry":
+            attempts = notification.attempts + 1
+            if attempts < settings.PUSH_NOTIFICATION_MAX_ATTEMPTS:
+                PushNotification.objects.filter(id=notification.id).update(
+                    status="pending",
+                    attempts=attempts,
+                    last_error=error,
+                    next_attempt_at=now + get_retry_delay(attempts),
+                    updated_at=now,
+                )
+                continue
+            outcome = "failed"
+
+        finished[(outcome, error)].append(notification.id)
+
+    for (status, error), ids in finished.items():
+        PushNotification.objects.filter(id__in=ids).update(
+            status=status,
+            attempts=F("attempts") + 1,
+            last_error=error,
+            updated_at=now,
+        )
+
+
+def _build_digest(notifications):
+    """
+    Combine several notifications for a user into one
+
+    Returns:
+        tuple: (title, body, url, icon) of the combined notification
+    """
+    first = notifications[0]
+    if len(notifications) == 1:
+        return first.title, first.body, first.url, first.icon
+
+    # List each notification on its own line, since titles alone don't say
+    # which book or bet they're about. Keep the link and icon only if they're
+    # the same for everything.
+    lines = [
+        Truncator(
+            f"{notification.title}: {notification.body}"
+            if notification.body
+            else notification.title
+        ).chars(DIGEST_LINE_LENGTH)
+        for notification in notifications
+    ]
+    urls = {notification.url for notification in notifications}
+    icons = {notification.icon for notification in notifications}
+    return (
+        f"{len(notifications)} new updates",
+        "\n".join(lines),
+        first.url if len(urls) == 1 else "",
+        first.icon if len(icons) == 1 else "",
+    )
+
+
+def process_outbox(limit=None):
+    """
+    Send every due notification in the outbox, up to `limit` of them
+
+    A user's digest notifications are combined into a single push, and every
+    device of every recipient in the batch is sent to at once from the
+    worker thread pool.
+
+    Returns:
+        Counter: Number of notifications by outcome
+    """
+    notifications = _claim_due_notifications(
+        limit or settings.PUSH_NOTIFICATION_BATCH_SIZE
+    )
+    if not notifications:
+        return Counter()
+
+    devices = defaultdict(list)
+    for subscription in PushSubscription.objects.filter(
+        user_id__in={notification.user_id for notification in notifications}
+    ).order_by("id"):
+        devices[subscription.user_id].append(subscription)
+
+    # Group the notifications into the pushes that will be sent, as lists of
+    # their indexes
+    outcomes = [None] * len(notifications)
+    pushes = []
+    digests = defaultdict(list)
+    for index, notification in enumerate(notifications):
+        user = notification.user
+        reason = _skip_reason(user, notification.notification_type)
+        if not reason and not devices[user.id]:
+            reason = f"No push subscription for user {user.username}"
+        if reason:
+            outcomes[index] = ("skipped", reason)
+        elif notification.digest:
+            digests[user.id].append(index)
+        else:
+            pushes.append([index])
+    pushes.extend(digests.values())
+
+    deliveries = []
+    owners = []
+    for push, indexes in enumerate(pushes):
+        user = notifications[indexes[0]].user
+        content = _build_digest([notifications[index] for index in indexes])
+        for subscription in devices[user.id]:
+            subscription.user = user
+            deliveries.append((subscription, *content))
+            owners.append(push)
+
+    device_outcomes = _send_to_devices(deliveries)
+    _record_device_outcomes([delivery[0] for delivery in deliveries], device_outcomes)
+
+    by_push = defaultdict(list)
+    for push, outcome in zip(owners, device_outcomes):
+        by_push[push].append(outcome)
+    for push, push_outcomes in by_push.items():
+        outcome = _combine_outcomes(push_outcomes)
+        for index in pushes[push]:
+            outcomes[index] = outcome
+
+    _record_outcomes(notifications, outcomes)
+    return Counter(outcome for outcome, _ in outcomes)
+
+
+def purge_old_notifications():
+    """Delete sent and skipped notifications older than PUSH_NOTIFICATION_RETENTION"""
+    cutoff = timezone.now() - timedelta(seconds=settings.PUSH_NOTIFICATION_RETENTION)
+    deleted, _ = PushNotification.objects.filter(
+        status__in=["sent", "skipped"], updated_at__lt=cutoff
+    ).delete()
+    return deleted
@@ -1,11 +1,34 @@
 import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
 from plexapi.exceptions import BadRequest, NotFound, Unauthorized
 from plexapi.server import PlexServer
+from requests.exceptions import RequestException
+
+from .models import PlexLibraryItem
+from .utils.matching import CachedTitleIndex
 
 logger = logging.getLogger(__name__)
 
+# Process-wide connection state, see get_plex_library
+_connection = {
+    "server": None,
+    "section": None,
+    "machine_identifier": None,
+    "checked_at": 0,
+}
+_connection_lock = threading.Lock()
+
+# In-process title index over the local library snapshot
+_library_index = CachedTitleIndex(PlexLibraryItem, "title", "artist", ["rating_key"])
+
+MACHINE_IDENTIFIER_CACHE_KEY = "plex:machine_identifier"
+
 
 def get_plex_server():
     """
@@ -19,12 +42,165 @@ def get_plex_server():
         return None
 
     try:
-        return PlexServer(settings.PLEX_BASE_URL, settings.PLEX_TOKEN)
-    except (NotFound, Unauthorized, BadRequest) as e:
+        return PlexServer(
+            settings.PLEX_BASE_URL,
+            settings.PLEX_TOKEN,
+            timeout=settings.PLEX_TIMEOUT,
+        )
+    except (NotFound, Unauthorized, BadRequest, RequestException) as e:
         logger.error(f"Error connecting to Plex server: {str(e)}")
         return None
 
 
+def reset_plex_connection():
+    """Drop the cached Plex connection so the next lookup reconnects"""
+    with _connection_lock:
+        _connection.update(
+            server=None, section=None, machine_identifier=None, checked_at=0
+        )
+
+
+def _is_healthy(server):
+    try:
+        server.query("/identity")
+        return True
+    except Exception as e:
+        logger.warning(f"Plex health check failed, reconnecting: {str(e)}")
+        return False
+
+
+def get_plex_library():
+    """
+    Get the cached Plex server, audiobook library section and server identifier
+
+    The connection is made once per process. If it hasn't been used for
+    PLEX_HEALTH_CHECK_INTERVAL seconds it is checked with a cheap identity
+    request first, and rebuilt if that fails.
+
+    Returns:
+        tuple: (PlexServer, LibrarySection, machine identifier), or
+        (None, None, None) if Plex can't be reached
+    """
+    with _connection_lock:
+        server = _connection["server"]
+        now = time.time()
+
+        if server is not None and (
+            now - _connection["checked_at"] < settings.PLEX_HEALTH_CHECK_INTERVAL
+            or _is_healthy(server)
+        ):
+            _connection["checked_at"] = now
+            return server, _connection["section"], _connection["machine_identifier"]
+
+        server = get_plex_server()
+        if not server:
+            return None, None, None
+
+        try:
+            section = server.library.section(settings.PLEX_LIBRARY_NAME)
+        except NotFound:
+            logger.error(f"Plex library not found: {settings.PLEX_LIBRARY_NAME}")
+            return None, None, None
+
+        _connection.update(
+            server=server,
+            section=section,
+            machine_identifier=server.machineIdentifier,
+            checked_at=now,
+        )
+        cache.set(MACHINE_IDENTIFIER_CACHE_KEY, server.machineIdentifier, None)
+        return server, section, server.machineIdentifier
+
+
+def _to_aware(value):
+    """Convert plexapi's naive local datetimes to aware UTC ones"""
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value.timestamp(), tz=timezone.utc)
+
+
+def _fetch_albums(section, since=None):
+    if since is None:
+        return section.search(libtype="album")
+
+    try:
+        return section.search(libtype="album", filters={"updatedAt>>": since})
+    except (BadRequest, NotFound):
+        # Older servers don't filter on updatedAt, new albums still show up
+        # by addedAt and edits are picked up by the periodic full sync, see
+        # MEDIA_LIBRARY_FULL_SYNC_EVERY
+        logger.warning("Plex rejected the updatedAt filter, using addedAt")
+        return section.search(libtype="album", filters={"addedAt>>": since})
+
+
+def sync_plex_library(full=False):
+    """
+    Snapshot the albums in the Plex audiobook library into PlexLibraryItem
+
+    Args:
+        full (bool): Fetch every album and drop ones no longer in Plex,
+            instead of only those added or updated since the last sync
+
+    Returns:
+        tuple: (albums saved, albums removed), or None if Plex is unavailable
+    """
+    _, section, _ = get_plex_library()
+    if not section:
+        return None
+
+    since = None
+    if not full:
+        latest = PlexLibraryItem.objects.aggregate(latest=Max("updated_at"))["latest"]
+        # Plex compares whole seconds, so go back one to include albums
+        # updated in the same second as the newest one we have
+        if latest:
+            since = latest - timedelta(seconds=1)
+
+    albums = _fetch_albums(section, since)
+    items = [
+        PlexLibraryItem(
+            rating_key=str(album.ratingKey),
+            title=album.title or "",
+            artist=album.parentTitle or "",
+            artist_rating_key=str(album.parentRatingKey or ""),
+            added_at=_to_aware(album.addedAt),
+            updated_at=_to_aware(album.updatedAt or album.addedAt),
+        )
+        for album in albums
+    ]
+
+    PlexLibraryItem.objects.bulk_create(
+        items,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["rating_key"],
+        update_fields=[
+            "title",
+            "artist",
+            "artist_rating_key",
+            "added_at",
+            "updated_at",
+            "synced_at",
+        ],
+    )
+
+    removed = 0
+    if full:
+        seen = {item.rating_key for item in items}
+        stale = [
+            key
+            for key in PlexLibraryItem.objects.values_list("rating_key", flat=True)
+            if key not in seen
+        ]
+        removed, _ = PlexLibraryItem.objects.filter(rating_key__in=stale).delete()
+
+    return len(items), removed
+
+
+def _build_book_url(machine_identifier, rating_key):
+    return f"https://app.plex.tv/desktop#!/server/{machine_identifier}/details?key=%2Flibrary%2Fmetadata%2F{rating_key}"
+
+
 def get_plex_book_url(book_title, book_author):
     """
     Search for a book in Plex and return its URL if found
@@ -40,59 +216,68 @@ def get_plex_book_url(book_title, book_author):
     if not settings.PLEX_ENABLED:
         return None
 
-    try:
-        # Connect to Plex server
-        plex = get_plex_server()
-        if not plex:
-            return None
+    index = _library_index.get()
+    if not len(index):
+        # The library hasn't been synced yet, so ask Plex directly
+        return _search_plex_book_url(book_title, book_author)
 
-        # Get the server identifier
-        plex_server_identifier = plex.machineIdentifier
+    match = index.match(book_title, book_author)
+    if not match:
+        logger.info(f"No matches found in Plex for '{book_title}' by '{book_author}'")
+        return None
 
-        # Get the audiobooks library section
-        try:
-            audiobooks = plex.library.section(settings.PLEX_LIBRARY_NAME)
-        except NotFound:
-            logger.error(f"Plex library not found: {settings.PLEX_LIBRARY_NAME}")
+    machine_identifier = cache.get(MACHINE_IDENTIFIER_CACHE_KEY)
+    if not machine_identifier:
+        _, _, machine_identifier = get_plex_library()
+        if not machine_identifier:
             return None
 
-        # Process the title to remove subtitles (anything after first colon)
-        processed_title = book_title.split(":", 1)[0].strip()
+    return _build_book_url(machine_identifier, match[0])
+
+
+def _search_plex_book_url(book_title, book_author):
+    """Search the Plex library for a book and return its URL if found"""
+    # Process the title to remove subtitles (anything after first colon)
+    processed_title = book_title.split(":", 1)[0].strip()
+
+    # A failure on the cached connection may just mean Plex restarted, so
+    # reconnect and try once more before giving up
+    for attempt in range(2):
+        _, audiobooks, plex_server_identifier = get_plex_library()
+        if not audiobooks:
+            return None
 
-        # Search for the book using the processed title and author filter
         try:
             book_search = audiobooks.search(
                 filters={"artist.title": f"{book_author}"},
                 title=f"{processed_title}",
                 libtype="album",
             )
+            break
+        except (RequestException, Unauthorized) as e:
+            logger.warning(f"Plex connection error, reconnecting: {str(e)}")
+            reset_plex_connection()
+            if attempt:
+                return None
         except Exception as e:
             logger.error(
                 f"Error searching Plex for '{processed_title}' by '{book_author}': {str(e)}"
             )
             return None
 
-        # Check if we found any matches
-        if not book_search:
-            logger.info(
-                f"No matches found in Plex for '{processed_title}' by '{book_author}'"
-            )
-            return None
-
-        # Get the best match (first result)
-        best_match = book_search[0]
-
-        # Construct the URL to the book in Plex
-        book_url = f"https://app.plex.tv/desktop#!/server/{plex_server_identifier}/details?key=%2Flibrary%2Fmetadata%2F{best_match.ratingKey}"
-
-        return book_url
-
-    except Exception as e:
-        logger.exception(
-            f"Unexpected error searching Plex for '{book_title}': {str(e)}"
+    # Check if we found any matches
+    if not book_search:
+        logger.info(
+            f"No matches found in Plex for '{processed_title}' by '{book_author}'"
         )
         return None
 
+    # Get the best match (first result)
+    best_match = book_search[0]
+
+    # Construct the URL to the book in Plex
+    return _build_book_url(plex_server_identifier, best_match.ratingKey)
+
 
 def update_plex_info_for_book(book):
     """
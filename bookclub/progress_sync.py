@@ -0,0 +1,161 @@
+"""
+Background syncing of reading progress to Hardcover.
+
+Views only enqueue a HardcoverProgressSync for the user and book. There is
+one per pair, so saving progress several times before the sync_hardcover_progress
+command gets to it sends just the latest progress. Syncs that fail because
+Hardcover was unreachable, rate limited or erroring are retried with
+exponential backoff. Anything else, such as a rejected API key or an error
+from Hardcover about the data, fails straight away since retrying would
+fail the same way.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import HardcoverProgressSync, UserBookProgress
+from .views.book_utils import get_hardcover_position, sync_progress_to_hardcover
+
+logger = logging.getLogger(__name__)
+
+
+def get_retry_delay(attempts):
+    """Get the backoff before retrying a sync that has failed `attempts` times"""
+    delay = settings.HARDCOVER_SYNC_RETRY_BASE * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(delay, settings.HARDCOVER_SYNC_RETRY_MAX))
+
+
+def enqueue_progress_sync(user, book):
+    """
+    Queue a sync of a user's current progress on a book to Hardcover
+
+    Any sync already queued for the book is reset, so it sends the latest
+    progress as soon as a worker is free instead of waiting out a backoff.
+
+    Args:
+        user (User): The user whose progress is synced
+        book (Book): The book to sync progress for
+    """
+    now = timezone.now()
+    HardcoverProgressSync.objects.update_or_create(
+        user=user,
+        book=book,
+        defaults={
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "requested_at": now,
+            "last_error": "",
+        },
+    )
+
+
+def _claim_due_syncs(limit):
+    """Mark up to `limit` due syncs as running and return the ones this worker won"""
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.HARDCOVER_SYNC_STALE_AFTER)
+
+    candidates = HardcoverProgressSync.objects.filter(
+        Q(status="pending", next_attempt_at__lte=now)
+        | Q(status="running", updated_at__lt=stale_before)
+    ).order_by("next_attempt_at")[:limit]
+
+    claimed = []
+    for sync in candidates:
+        # Only take the sync if nobody else has touched it since we read it
+        won = HardcoverProgressSync.objects.filter(
+            id=sync.id, status=sync.status, updated_at=sync.updated_at
+        ).update(status="running", updated_at=now)
+        if won:
+            sync.status = "running"
+            claimed.append(sync)
+    return claimed
+
+
+def run_sync(sync):
+    """
+    Send the current progress for a claimed sync to Hardcover
+
+    Args:
+        sync (HardcoverProgressSync): A sync claimed by this worker
+
+    Returns:
+        bool: True if Hardcover was updated
+    """
+    user_progress = (
+        UserBookProgress.objects.select_related("user__profile", "book", "edition")
+        .filter(user_id=sync.user_id, book_id=sync.book_id)
+        .first()
+    )
+
+    error = ""
+    retry = False
+    if user_progress is None:
+        error = "No reading progress to sync"
+    elif not user_progress.user.profile.hardcover_api_key:
+        error = "No Hardcover API key configured"
+    else:
+        pages, seconds = get_hardcover_position(user_progress)
+        try:
+            result = sync_progress_to_hardcover(
+                user_progress.user,
+                user_progress.book,
+                user_progress,
+                pages=pages,
+                seconds=seconds,
+            )
+        except Exception as e:
+            logger.exception(
+                f"Error syncing progress for sync {sync.id} to Hardcover: {str(e)}"
+            )
+            result = {"error": str(e)}
+
+        if not isinstance(result, dict):
+            error = "Hardcover sync failed"
+        elif "error" in result:
+            error, retry = result["error"], result.get("retryable", False)
+
+    now = timezone.now()
+    attempts = sync.attempts + 1
+    if not error:
+        changes = {"status": "synced", "synced_at": now, "last_error": ""}
+    elif retry and attempts < settings.HARDCOVER_SYNC_MAX_ATTEMPTS:
+        changes = {
+            "status": "pending",
+            "last_error": error,
+            "next_attempt_at": now + get_retry_delay(attempts),
+        }
+        logger.info(
+            f"Hardcover sync {sync.id} failed, retrying after "
+            f"{changes['next_attempt_at']:%Y-%m-%d %H:%M}: {error}"
+        )
+    else:
+        changes = {"status": "failed", "last_error": error}
+        logger.warning(f"Giving up on Hardcover sync {sync.id}: {error}")
+
+    # Progress saved while we were running queued the sync again, which
+    # takes priority over this result
+    HardcoverProgressSync.objects.filter(
+        id=sync.id, requested_at=sync.requested_at
+    ).update(attempts=attempts, updated_at=now, **changes)
+    return not error
+
+
+def process_due_syncs(limit=None):
+    """
+    Run every due Hardcover sync, up to `limit` of them
+
+    Returns:
+        tuple: (synced, failed) sync counts
+    """
+    synced = failed = 0
+    for sync in _claim_due_syncs(limit or settings.HARDCOVER_SYNC_BATCH_SIZE):
+        if run_sync(sync):
+            synced += 1
+        else:
+            failed += 1
+    return synced, failed
@@ -0,0 +1,142 @@
+"""
+In-process cache for Hardcover book searches.
+
+Results are kept in an LRU cache with a TTL, keyed by the normalized query
+and page. Identical searches that arrive while one is already running wait
+for that request instead of sending their own.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection
+
+from .hardcover_api import HardcoverAPI
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_results = OrderedDict()
+_in_flight = {}
+
+
+class _PendingSearch:
+    """A search currently running upstream that other callers can wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.results = None
+        # The exception the search raised, re-raised in every waiter
+        self.error = None
+
+
+def normalize_query(query):
+    """Normalize a search query so trivially different searches share results"""
+    return " ".join((query or "").split()).casefold()
+
+
+def _get_cached(key):
+    with _lock:
+        entry = _results.get(key)
+        if entry is None:
+            return None
+
+        stored_at, results = entry
+        if time.time() - stored_at > settings.SEARCH_CACHE_TTL:
+            del _results[key]
+            return None
+
+        _results.move_to_end(key)
+        return results
+
+
+def _set_cached(key, results):
+    with _lock:
+        _results[key] = (time.time(), results)
+        _results.move_to_end(key)
+        while len(_results) > settings.SEARCH_CACHE_MAX_ENTRIES:
+            _results.popitem(last=False)
+
+
+def search_books(query, page=1, user=None):
+    """
+    Search Hardcover for books, reusing cached or in-flight results
+
+    Args:
+        query (str): The search text
+        page (int): The results page to fetch
+        user (User): The User whose API key is used for the search
+
+    Returns:
+        list: Search hits in the format returned by HardcoverAPI.search_books,
+        or None if waiting on an identical in-flight search timed out
+
+    Raises:
+        Exception: Whatever the upstream search raised, in the caller that
+        ran it and in every caller waiting on it
+    """
+    normalized = normalize_query(query)
+    if not normalized:
+        return []
+
+    key = (normalized, page)
+    results = _get_cached(key)
+    if results is not None:
+        return results
+
+    with _lock:
+        pending = _in_flight.get(key)
+        is_leader = pending is None
+        if is_leader:
+            pending = _PendingSearch()
+            _in_flight[key] = pending
+
+    if not is_leader:
+        # Give up early rather than hold the request open indefinitely, the
+        # running search still finishes and fills the cache for next time
+        if not pending.event.wait(settings.SEARCH_WAIT_TIMEOUT):
+            logger.warning(f"Timed out waiting for in-flight search '{normalized}'")
+            return None
+        if pending.error is not None:
+            raise pending.error
+        return pending.results
+
+    try:
+        results = HardcoverAPI.search_books(
+            normalized, page=page, per_page=settings.SEARCH_RESULTS_PER_PAGE, user=user
+        )
+        # Empty results can't be told apart from a failed request
+        if results:
+            _set_cached(key, results)
+        pending.results = results
+    except Exception as e:
+        pending.error = e
+        raise
+    finally:
+        with _lock:
+            _in_flight.pop(key, None)
+        pending.event.set()
+
+    return results
+
+
+def prefetch_page(query, page, user=None):
+    """Fetch a results page in the background so paging forward is instant"""
+    key = (normalize_query(query), page)
+
+    with _lock:
+        if key in _results or key in _in_flight:
+            return
+
+    def prefetch():
+        try:
+            search_books(query, page=page, user=user)
+        except Exception as e:
+            logger.exception(f"Error prefetching search page {page}: {str(e)}")
+        finally:
+            connection.close()
+
+    threading.Thread(target=prefetch, daemon=True).start()
@@ -3,6 +3,7 @@ import { ProgressTracker } from './modules/progress-tracker.js';
 import { HardcoverSync } from './modules/hardcover-sync.js';
 import { SpoilerManager } from './modules/spoiler-manager.js';
 import { CommentReactions } from './modules/comment-reactions.js';
+import { CommentLoader } from './modules/comment-loader.js';
 import { AccessibilityHelper } from './modules/accessibility.js';
 import { RatingManager } from './modules/rating-manager.js';
 import { SortManager } from './modules/sort-manager.js';
@@ -22,6 +23,7 @@ document.addEventListener('DOMContentLoaded', function() {
         const hardcoverSync = HardcoverSync.init(bookId, hardcoverId, progressTracker);
         const spoilerManager = SpoilerManager.init(currentUsername);
         const commentReactions = CommentReactions.init();
+        const commentLoader = CommentLoader.init(bookId);
         const accessibilityHelper = AccessibilityHelper.init();
         const ratingManager = RatingManager.init(bookId);
         const sortManager = SortManager.init(bookId);
@@ -48,6 +50,7 @@ document.addEventListener('DOMContentLoaded', function() {
         window.ProgressTracker = progressTracker;
         window.HardcoverSync = hardcoverSync;
         window.SpoilerManager = spoilerManager;
+        window.CommentLoader = commentLoader;
         window.RatingManager = ratingManager;
         window.AccessibilityHelper = accessibilityHelper;
         window.SortManager = sortManager;
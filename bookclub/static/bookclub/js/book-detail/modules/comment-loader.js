@@ -0,0 +1,106 @@
+// comment-loader.js - Loads further pages of comments and replies on demand
+export const CommentLoader = {
+    bookId: null,
+
+    /**
+     * Initialize the comment loader
+     * @param {string} bookId - ID of the book
+     * @returns {object} - CommentLoader instance
+     */
+    init(bookId) {
+        this.bookId = bookId;
+
+        // Use event delegation, since reply buttons arrive with loaded comments
+        document.addEventListener('click', (e) => {
+            const commentsButton = e.target.closest('.load-comments-btn');
+            if (commentsButton) {
+                this._loadMoreComments(commentsButton);
+                return;
+            }
+
+            const repliesButton = e.target.closest('.load-replies-btn');
+            if (repliesButton) {
+                this._loadMoreReplies(repliesButton);
+            }
+        });
+
+        return this;
+    },
+
+    /**
+     * Fetch a page of rendered comments from the API
+     * @param {HTMLElement} button - Button holding the URL and cursor
+     * @param {object} params - Extra query parameters
+     * @returns {Promise<object>} - The page's html and next_cursor
+     */
+    async _fetchPage(button, params = {}) {
+        const url = new URL(button.dataset.url, window.location.origin);
+        url.searchParams.set('cursor', button.dataset.cursor);
+        Object.entries(params).forEach(([key, value]) => url.searchParams.set(key, value));
+
+        const response = await fetch(url, {
+            headers: { 'X-Requested-With': 'XMLHttpRequest' }
+        });
+        if (!response.ok) {
+            throw new Error(`Request failed with status ${response.status}`);
+        }
+        return response.json();
+    },
+
+    /**
+     * Load the next page of top-level comments
+     * @param {HTMLElement} button - The "Load more comments" button
+     */
+    async _loadMoreComments(button) {
+        await this._loadInto(button, document.getElementById('comments-list'), {
+            sort: button.dataset.sort
+        });
+    },
+
+    /**
+     * Load the next page of replies to a comment
+     * @param {HTMLElement} button - The "Show more replies" button
+     */
+    async _loadMoreReplies(button) {
+        const replies = button.closest('.replies');
+        await this._loadInto(button, replies, {}, button);
+    },
+
+    /**
+     * Fetch a page and add it to a container, updating or removing the button
+     * @param {HTMLElement} button - Button that was clicked
+     * @param {HTMLElement} container - Element to add the rendered page to
+     * @param {object} params - Extra query parameters
+     * @param {HTMLElement} before - Insert the page before this element, if given
+     */
+    async _loadInto(button, container, params, before = null) {
+        if (!container || button.disabled) return;
+
+        const label = button.textContent;
+        button.disabled = true;
+        button.textContent = 'Loading...';
+
+        try {
+            const data = await this._fetchPage(button, params);
+
+            const template = document.createElement('template');
+            template.innerHTML = data.html;
+            container.insertBefore(template.content, before);
+
+            if (data.next_cursor) {
+                button.dataset.cursor = data.next_cursor;
+                button.textContent = before ? 'Show more replies' : label;
+                button.disabled = false;
+            } else {
+                button.remove();
+            }
+
+            // Apply the reader's progress to the new comments
+            window.SpoilerManager?._checkSpoilersOnLoad();
+        } catch (error) {
+            console.error('Error loading comments:', error);
+            button.textContent = label;
+            button.disabled = false;
+        }
+    }
+};
@@ -0,0 +1,173 @@
+// book-search.js
+// This code shows search results as the user types, using the typeahead endpoint
+
+document.addEventListener('DOMContentLoaded', function () {
+    const form = document.querySelector('.search-form[data-typeahead-url]');
+    if (!form) return;
+
+    const input = form.querySelector('input[name="query"]');
+    const container = document.getElementById('typeahead-results');
+    const list = document.getElementById('typeahead-results-list');
+    const noResults = document.getElementById('typeahead-no-results');
+    const loadMoreButton = document.getElementById('typeahead-load-more');
+    const serverResults = document.getElementById('search-results');
+    const url = form.getAttribute('data-typeahead-url');
+
+    const DEBOUNCE_MS = 300;
+    const MIN_QUERY_LENGTH = 2;
+
+    let debounceTimer = null;
+    let controller = null;
+    let currentQuery = '';
+    let currentPage = 1;
+
+    input.setAttribute('autocomplete', 'off');
+
+    input.addEventListener('input', function () {
+        clearTimeout(debounceTimer);
+        debounceTimer = setTimeout(function () {
+            const query = input.value.trim();
+            if (query.length < MIN_QUERY_LENGTH) {
+                // Leave whatever the page was rendered with in place
+                cancelPending();
+                return;
+            }
+            currentQuery = query;
+            currentPage = 1;
+            runSearch(query, 1, false);
+        }, DEBOUNCE_MS);
+    });
+
+    loadMoreButton.addEventListener('click', function () {
+        runSearch(currentQuery, currentPage + 1, true);
+    });
+
+    function cancelPending() {
+        // Abort the previous request so a slow, outdated response can't
+        // overwrite the results for what the user is typing now
+        if (controller) {
+            controller.abort();
+            controller = null;
+        }
+    }
+
+    function runSearch(query, page, append) {
+        cancelPending();
+        controller = new AbortController();
+        loadMoreButton.disabled = true;
+
+        const params = new URLSearchParams({ q: query, page: page });
+        fetch(`${url}?${params}`, {
+            signal: controller.signal,
+            headers: { 'X-Requested-With': 'XMLHttpRequest' },
+        })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`Search failed with status ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(data => {
+                // Ignore responses for queries the user has since moved on from
+                if (data.query !== currentQuery) return;
+                currentPage = data.page;
+                renderResults(data.results, data.has_more, append);
+            })
+            .catch(error => {
+                if (error.name !== 'AbortError') {
+                    console.error('Error searching books:', error);
+                }
+            })
+            .finally(() => {
+                loadMoreButton.disabled = false;
+            });
+    }
+
+    function renderResults(results, hasMore, append) {
+        if (!append) {
+            list.innerHTML = '';
+        }
+
+        results.forEach(book => list.appendChild(createBookCard(book)));
+
+        if (serverResults) {
+            serverResults.classList.add('d-none');
+        }
+        container.classList.remove('d-none');
+        noResults.classList.toggle('d-none', list.children.length > 0);
+        loadMoreButton.classList.toggle('d-none', !hasMore);
+    }
+
+    function createBookCard(book) {
+        const column = document.createElement('div');
+        column.className = 'col-md-4 mb-4';
+
+        const card = document.createElement('div');
+        card.className = 'card search-book-card h-100 shadow-sm';
+        column.appendChild(card);
+
+        const header = document.createElement('div');
+        header.className = 'card-header d-flex justify-content-between align-items-center';
+        const idLabel = document.createElement('span');
+        const idStrong = document.createElement('strong');
+        idStrong.textContent = 'Book ID:';
+        idLabel.appendChild(idStrong);
+        idLabel.appendChild(document.createTextNode(` ${book.id}`));
+        header.appendChild(idLabel);
+
+        if (book.reading_format) {
+            const badgeClasses = {
+                physical: 'bg-success',
+                ebook: 'bg-info',
+                audio: 'bg-warning text-dark',
+            };
+            const badge = document.createElement('span');
+            badge.className = `badge ${badgeClasses[book.reading_format] || 'bg-secondary'}`;
+            badge.textContent = book.reading_format.charAt(0).toUpperCase() + book.reading_format.slice(1);
+            header.appendChild(badge);
+        }
+        card.appendChild(header);
+
+        if (book.image_url) {
+            const imageContainer = document.createElement('div');
+            imageContainer.className = 'card-img-top-container';
+            const image = document.createElement('img');
+            image.className = 'img-fluid book-cover';
+            image.src = book.image_url;
+            image.alt = book.title;
+            image.loading = 'lazy';
+            imageContainer.appendChild(image);
+            card.appendChild(imageContainer);
+        } else {
+            const noCover = document.createElement('div');
+            noCover.className = 'no-cover';
+            noCover.innerHTML = '<i class="bi bi-book text-muted" style="font-size: 2rem;"></i>';
+            card.appendChild(noCover);
+        }
+
+        const body = document.createElement('div');
+        body.className = 'card-body';
+        const title = document.createElement('h5');
+        title.className = 'card-title';
+        title.textContent = book.title;
+        const author = document.createElement('h6');
+        author.className = 'card-subtitle mb-2 text-muted';
+        author.textContent = book.author || 'Unknown';
+        const description = document.createElement('p');
+        description.className = 'card-text';
+        description.textContent = book.description || '';
+        body.append(title, author, description);
+        card.appendChild(body);
+
+        const footer = document.createElement('div');
+        footer.className = 'card-footer bg-white border-top-0';
+        const addLink = document.createElement('a');
+        addLink.className = 'btn btn-success w-100';
+        addLink.href = book.add_url;
+        addLink.innerHTML = '<i class="bi bi-plus-circle me-1"></i>Add to Group';
+        footer.appendChild(addLink);
+        card.appendChild(footer);
+
+        return column;
+    }
+});
@@ -1,12 +1,12 @@
 import json
 import math
 
-import bleach
-import markdown as md
 from django import template
 from django.contrib.auth.models import User
 from django.utils.safestring import mark_safe
 
+from ..utils.formatting import render_markdown
+
 register = template.Library()
 
 
@@ -44,16 +44,37 @@ def floor(value):
 
 
 @register.filter
-def get_username_from_id(user_id):
-    """Convert a user ID to a username."""
-    try:
-        user = User.objects.get(id=user_id)
-        return user.username
-    except User.DoesNotExist:
+def get_username_from_id(user_id, directory=None):
+    """
+    Convert a user ID to a username.
+
+    Pass the view's user directory to avoid a query per call:
+    {{ user_id|get_username_from_id:user_directory }}
+    Users missing from it, such as people who have left the group, are
+    looked up and added to it.
+    """
+    if user_id is None:
         return "Unknown User"
+    try:
+        user_id = int(user_id)
     except (ValueError, TypeError):
         return "Invalid ID"
 
+    # Templates rendered without a directory pass the empty string instead
+    if not isinstance(directory, dict):
+        directory = None
+    elif user_id in directory:
+        return directory[user_id]
+
+    try:
+        username = User.objects.get(id=user_id).username
+    except User.DoesNotExist:
+        username = "Unknown User"
+
+    if directory is not None:
+        directory[user_id] = username
+    return username
+
 
 @register.filter
 def get_item(dictionary, key):
@@ -306,33 +327,4 @@ def markdown_format(text):
     Supports: bold, italic, lists, and blockquotes.
     Links and code blocks are not supported.
     """
-    if not text:
-        return ""
-
-    # Convert markdown to HTML with minimal extensions
-    html = md.markdown(
-        text,
-        extensions=[
-            "nl2br",  # Convert newlines to <br> tags
-            "sane_lists",  # Better list handling
-        ],
-    )
-
-    # Sanitize HTML - only allow basic text formatting tags
-    allowed_tags = [
-        "b",
-        "strong",
-        "em",
-        "i",
-        "p",
-        "br",
-        "ul",
-        "ol",
-        "li",
-        "blockquote",
-    ]
-
-    # No attributes allowed (prevents links from working)
-    clean_html = bleach.clean(html, tags=allowed_tags, attributes={}, strip=True)
-
-    return mark_safe(clean_html)
+    return mark_safe(render_markdown(text))
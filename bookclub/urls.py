@@ -7,7 +7,12 @@ from django.http import HttpResponse
 from django.urls import path
 from django.views.generic import TemplateView
 
-from bookclub.views.api_views import get_hardcover_progress
+from bookclub.views.api_views import (
+    book_comments_page,
+    comment_replies_page,
+    get_hardcover_progress,
+    search_books_typeahead,
+)
 from bookclub.views.attribution_analytics import attribution_analytics
 from bookclub.views.auth_views import landing_page, register_with_invite
 from bookclub.views.book_views import (
@@ -146,6 +151,11 @@ urlpatterns = [
     # Book related URLs
     path("books/<int:book_id>/", book_detail, name="book_detail"),
     path("groups/<int:group_id>/search/", search_books, name="search_books"),
+    path(
+        "api/groups/<int:group_id>/search/",
+        search_books_typeahead,
+        name="search_books_typeahead",
+    ),
     path(
         "groups/<int:group_id>/add-book/<str:hardcover_id>/",
         add_book_to_group,
@@ -219,6 +229,16 @@ urlpatterns = [
         get_hardcover_progress,
         name="get_hardcover_progress",
     ),
+    path(
+        "api/books/<int:book_id>/comments/",
+        book_comments_page,
+        name="book_comments_page",
+    ),
+    path(
+        "api/comments/<int:comment_id>/replies/",
+        comment_replies_page,
+        name="comment_replies_page",
+    ),
     path(
         "comments/<int:comment_id>/reaction-users/",
         get_comment_reaction_users,
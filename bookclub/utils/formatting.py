@@ -0,0 +1,37 @@
+import bleach
+import markdown as md
+
+# Only basic text formatting survives sanitizing, links and code blocks don't
+ALLOWED_TAGS = [
+    "b",
+    "strong",
+    "em",
+    "i",
+    "p",
+    "br",
+    "ul",
+    "ol",
+    "li",
+    "blockquote",
+]
+
+
+def render_markdown(text):
+    """
+    Convert Markdown text to sanitized HTML with basic text formatting only.
+    Supports: bold, italic, lists, and blockquotes.
+    """
+    if not text:
+        return ""
+
+    # Convert markdown to HTML with minimal extensions
+    html = md.markdown(
+        text,
+        extensions=[
+            "nl2br",  # Convert newlines to <br> tags
+            "sane_lists",  # Better list handling
+        ],
+    )
+
+    # No attributes allowed (prevents links from working)
+    return bleach.clean(html, tags=ALLOWED_TAGS, attributes={}, strip=True)
@@ -0,0 +1,215 @@
+import re
+import threading
+import unicodedata
+from collections import Counter
+from difflib import SequenceMatcher
+
+from django.db.models import Count, Max
+
+# Minimum combined score for a candidate to count as the same book
+MATCH_THRESHOLD = 0.8
+
+LEADING_ARTICLES = ("the ", "a ", "an ")
+
+# Only the items sharing the most title words with a book are fuzzy scored
+MAX_FUZZY_CANDIDATES = 50
+
+# Weight of the author in the combined score, when both sides have one
+AUTHOR_WEIGHT = 0.25
+
+# Words too common to narrow down fuzzy candidates
+STOP_WORDS = {"a", "an", "and", "in", "of", "on", "the", "to"}
+
+_non_word = re.compile(r"[^\w\s]")
+
+
+def normalize_title(text):
+    """
+    Normalize a title or author name for comparison
+
+    Accents, punctuation, case and leading articles are dropped, so
+    "The Hobbit" and "hobbit" normalize to the same string.
+    """
+    if not text:
+        return ""
+
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _non_word.sub(" ", text.casefold().replace("&", " and "))
+    text = " ".join(text.split())
+
+    for article in LEADING_ARTICLES:
+        if text.startswith(article):
+            text = text[len(article) :]
+            break
+
+    return text
+
+
+def title_variants(title):
+    """Get the normalized title with and without any subtitle"""
+    variants = {normalize_title(title)}
+    for separator in (":", " - ", "("):
+        if separator in title:
+            variants.add(normalize_title(title.split(separator, 1)[0]))
+    variants.discard("")
+    return variants
+
+
+def _similarity(a, b, minimum=0.0):
+    """Get the similarity ratio of two strings, or 0 if it's below `minimum`"""
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+
+    # The quick ratios are cheap upper bounds, so most poor candidates are
+    # rejected without the full comparison
+    matcher = SequenceMatcher(None, a, b)
+    if matcher.real_quick_ratio() < minimum or matcher.quick_ratio() < minimum:
+        return 0.0
+    return matcher.ratio()
+
+
+def score_match(title, author, candidate_title, candidate_author):
+    """
+    Score how likely a library item is to be the given book
+
+    Args:
+        title (str): Normalized book title
+        author (str): Normalized book author, may be empty
+        candidate_title (str): Normalized library item title
+        candidate_author (str): Normalized library item author, may be empty
+
+    Returns:
+        float: Score between 0 and 1, or 0 if it can't reach MATCH_THRESHOLD
+    """
+    # Unknown authors neither help nor hurt
+    if not author or not candidate_author:
+        return _similarity(title, candidate_title, MATCH_THRESHOLD)
+
+    title_weight = 1 - AUTHOR_WEIGHT
+    title_score = _similarity(
+        title, candidate_title, (MATCH_THRESHOLD - AUTHOR_WEIGHT) / title_weight
+    )
+    if not title_score:
+        return 0.0
+
+    author_score = _similarity(author, candidate_author)
+    return title_weight * title_score + AUTHOR_WEIGHT * author_score
+
+
+class TitleIndex:
+    """
+    In-memory index of library items by normalized title
+
+    Exact title matches are found with a dict lookup. Otherwise only items
+    sharing at least one title word are fuzzy scored, rather than every
+    item in the library.
+    """
+
+    def __init__(self, items):
+        """
+        Args:
+            items: Iterable of (title, author, value) tuples
+        """
+        self.entries = []
+        self.by_title = {}
+        self.by_word = {}
+
+        for title, author, value in items:
+            entry = (normalize_title(title), normalize_title(author), value)
+            position = len(self.entries)
+            self.entries.append(entry)
+            self.by_title.setdefault(entry[0], []).append(position)
+            for word in set(entry[0].split()) - STOP_WORDS:
+                self.by_word.setdefault(word, []).append(position)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def match(self, title, author=""):
+        """
+        Find the best matching item for a book
+
+        Both the full title and the title without its subtitle are tried.
+
+        Returns:
+            The value stored for the best item scoring at least
+            MATCH_THRESHOLD, or None
+        """
+        normalized_author = normalize_title(author)
+        best_score, best_value = 0.0, None
+
+        for variant in title_variants(title):
+            candidates = self.by_title.get(variant)
+            if not candidates:
+                shared_words = Counter()
+                for word in set(variant.split()) - STOP_WORDS:
+                    shared_words.update(self.by_word.get(word, ()))
+                candidates = sorted(
+                    position
+                    for position, _ in shared_words.most_common(MAX_FUZZY_CANDIDATES)
+                )
+
+            for position in candidates:
+                candidate_title, candidate_author, value = self.entries[position]
+                score = score_match(
+                    variant, normalized_author, candidate_title, candidate_author
+                )
+                if score > best_score:
+                    best_score, best_value = score, value
+
+        return best_value if best_score >= MATCH_THRESHOLD else None
+
+
+class CachedTitleIndex:
+    """
+    Process-wide TitleIndex over a library snapshot table
+
+    The index is rebuilt only when the table has changed since it was last
+    built, which costs one aggregate query on its synced_at column to check.
+    """
+
+    def __init__(self, model, title_field, author_field, value_fields, ordering=None):
+        """
+        Args:
+            model: Model with a synced_at field to index
+            title_field: Name of the title field
+            author_field: Name of the author field, or None if there isn't one
+            value_fields: Names of the fields whose values are returned for a match
+            ordering: Order to add rows in, earlier rows win ties
+        """
+        self.model = model
+        self.title_field = title_field
+        self.author_field = author_field
+        self.value_fields = value_fields
+        self.ordering = ordering or ["id"]
+        self._version = None
+        self._index = TitleIndex([])
+        self._lock = threading.Lock()
+
+    def _load_rows(self):
+        fields = [self.title_field] + self.value_fields
+        if self.author_field:
+            fields.insert(1, self.author_field)
+
+        for row in self.model.objects.order_by(*self.ordering).values_list(*fields):
+            if self.author_field:
+                yield row[0], row[1], row[2:]
+            else:
+                yield row[0], "", row[1:]
+
+    def get(self):
+        """Get the current TitleIndex, rebuilding it if the table changed"""
+        version = tuple(
+            self.model.objects.aggregate(
+                count=Count("id"), synced=Max("synced_at")
+            ).values()
+        )
+
+        with self._lock:
+            if self._version != version:
+                self._index = TitleIndex(self._load_rows())
+                self._version = version
+            return self._index
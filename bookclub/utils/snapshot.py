@@ -0,0 +1,91 @@
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.apps import apps
+from django.db import models
+
+# Markers for values JSON can't represent directly
+MODEL = "__model__"
+TUPLE = "__tuple__"
+ITEMS = "__items__"
+DATE = "__date__"
+DATETIME = "__datetime__"
+
+
+def encode(value):
+    """
+    Convert a view context into JSON-serializable data
+
+    Model instances are stored as references and loaded again by decode(),
+    so a snapshot always shows current names and titles. Tuples, dicts with
+    non-string keys and dates keep their types.
+    """
+    if isinstance(value, models.Model):
+        return {MODEL: value._meta.label, "pk": value.pk}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return {key: encode(item) for key, item in value.items()}
+        return {ITEMS: [[encode(key), encode(item)] for key, item in value.items()]}
+    if isinstance(value, tuple):
+        return {TUPLE: [encode(item) for item in value]}
+    if isinstance(value, (list, set, models.QuerySet)):
+        return [encode(item) for item in value]
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime.datetime):
+        return {DATETIME: value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {DATE: value.isoformat()}
+    return value
+
+
+def _collect_references(value, references):
+    if isinstance(value, dict):
+        if MODEL in value:
+            references[value[MODEL]].add(value["pk"])
+            return
+        for item in value.values():
+            _collect_references(item, references)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_references(item, references)
+
+
+def _rebuild(value, instances):
+    if isinstance(value, list):
+        return [_rebuild(item, instances) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    if MODEL in value:
+        return instances[value[MODEL]].get(value["pk"])
+    if TUPLE in value:
+        return tuple(_rebuild(item, instances) for item in value[TUPLE])
+    if ITEMS in value:
+        return {
+            _rebuild(key, instances): _rebuild(item, instances)
+            for key, item in value[ITEMS]
+        }
+    if DATETIME in value:
+        return datetime.datetime.fromisoformat(value[DATETIME])
+    if DATE in value:
+        return datetime.date.fromisoformat(value[DATE])
+    return {key: _rebuild(item, instances) for key, item in value.items()}
+
+
+def decode(data):
+    """
+    Rebuild a context stored with encode()
+
+    Referenced model instances are loaded with one query per model. Any that
+    no longer exist come back as None.
+    """
+    references = defaultdict(set)
+    _collect_references(data, references)
+
+    instances = {
+        label: apps.get_model(label).objects.in_bulk(pks)
+        for label, pks in references.items()
+    }
+    return _rebuild(data, instances)
@@ -3,10 +3,23 @@ API views that return JSON responses
 """
 
 import logging
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+from django.urls import reverse
 
 from ..hardcover_api import HardcoverAPI
+from ..models import Book, BookGroup, Comment, CommentReaction, UserBookProgress
+from ..search_cache import prefetch_page, search_books
+from .comment_utils import (
+    add_more_replies_cursors,
+    add_normalized_progress_to_comments,
+    add_reactions_to_comments,
+    get_top_level_comments,
+    paginate_comments,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -22,3 +35,144 @@ def get_hardcover_progress(request, hardcover_id):
     except Exception as e:
         logger.exception(f"Error fetching Hardcover progress: {str(e)}")
         return JsonResponse({"error": str(e)}, status=500)
+
+
+@login_required
+def search_books_typeahead(request, group_id):
+    """API endpoint for as-you-type book search, backed by the search cache"""
+    group = get_object_or_404(BookGroup, id=group_id)
+    query = request.GET.get("q", "").strip()
+
+    try:
+        page = max(int(request.GET.get("page", 1)), 1)
+    except ValueError:
+        return JsonResponse({"error": "Invalid page"}, status=400)
+
+    if len(query) < 2:
+        return JsonResponse({"query": query, "page": page, "results": []})
+
+    try:
+        hits = search_books(query, page=page, user=request.user)
+    except Exception as e:
+        logger.exception(f"Error during typeahead search: {str(e)}")
+        return JsonResponse({"error": str(e)}, status=500)
+
+    if hits is None:
+        return JsonResponse({"error": "Search timed out"}, status=504)
+
+    has_more = len(hits) >= settings.SEARCH_RESULTS_PER_PAGE
+
+    # Once someone pages forward they're likely to keep going
+    if has_more and page > 1:
+        prefetch_page(query, page + 1, user=request.user)
+
+    results = []
+    for hit in hits:
+        document = hit.get("document") or {}
+        if not document.get("id"):
+            continue
+
+        contributions = document.get("contributions") or []
+        author = (contributions[0].get("author") or {}) if contributions else {}
+
+        results.append(
+            {
+                "id": document["id"],
+                "title": document.get("title", ""),
+                "author": author.get("name") or "Unknown",
+                "description": (document.get("description") or "")[:100],
+                "image_url": (document.get("image") or {}).get("url"),
+                "reading_format": document.get("reading_format"),
+                "add_url": reverse(
+                    "add_book_to_group", args=[group.id, document["id"]]
+                ),
+            }
+        )
+
+    return JsonResponse(
+        {"query": query, "page": page, "results": results, "has_more": has_more}
+    )
+
+
+def _not_a_member_response(request, book):
+    """A 403 response if the user isn't in the book's group, otherwise None"""
+    if book.group.is_member(request.user):
+        return None
+    return JsonResponse({"error": "You are not a member of this group."}, status=403)
+
+
+def _get_comment_context(request, book):
+    """Template context shared by the comment and reply fragments"""
+    # Readers with no progress yet see comments as if at the start of the
+    # book, without saving a progress row for a GET
+    user_progress = UserBookProgress.objects.filter(
+        user=request.user, book=book
+    ).first() or UserBookProgress(
+        user=request.user,
+        book=book,
+        progress_type="percent",
+        progress_value="0",
+        normalized_progress=0,
+    )
+    return {
+        "user": request.user,
+        "user_progress": user_progress,
+        "reaction_choices": CommentReaction.REACTION_CHOICES,
+        "read_only": not book.is_active,
+    }
+
+
+@login_required
+def book_comments_page(request, book_id):
+    """API endpoint for the next page of a book's top-level comments"""
+    book = get_object_or_404(Book.objects.select_related("group"), id=book_id)
+    forbidden = _not_a_member_response(request, book)
+    if forbidden:
+        return forbidden
+    sort_by = request.GET.get("sort", "date_desc")
+
+    comments, next_cursor = paginate_comments(
+        get_top_level_comments(book), sort_by, cursor=request.GET.get("cursor")
+    )
+    add_more_replies_cursors(comments)
+    comments = add_normalized_progress_to_comments(comments)
+    add_reactions_to_comments(comments, request.user)
+
+    context = _get_comment_context(request, book)
+    context["comments"] = comments
+    html = render_to_string(
+        "bookclub/includes/book_detail/comment_list.html", context, request=request
+    )
+    return JsonResponse({"html": html, "next_cursor": next_cursor})
+
+
+@login_required
+def comment_replies_page(request, comment_id):
+    """API endpoint for the next page of replies to a comment"""
+    comment = get_object_or_404(
+        Comment.objects.select_related("book__group"), id=comment_id
+    )
+    forbidden = _not_a_member_response(request, comment.book)
+    if forbidden:
+        return forbidden
+
+    replies, next_cursor = paginate_comments(
+        comment.replies.select_related("user", "book"),
+        "date_asc",
+        cursor=request.GET.get("cursor"),
+        page_size=settings.COMMENT_REPLIES_PAGE_SIZE,
+    )
+
+    add_reactions_to_comments(replies, request.user, include_replies=False)
+
+    context = _get_comment_context(request, comment.book)
+    context["parent_progress"] = comment.normalized_progress or 0
+    html = "".join(
+        render_to_string(
+            "bookclub/includes/book_detail/reply.html",
+            dict(context, reply=reply),
+            request=request,
+        )
+        for reply in replies
+    )
+    return JsonResponse({"html": html, "next_cursor": next_cursor})
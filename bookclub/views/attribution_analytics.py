@@ -4,25 +4,49 @@ Attribution analytics views for tracking book picks in groups.
 
 import logging
 from collections import defaultdict
+from datetime import timedelta
 from statistics import mean, median
 
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
 
 from ..models import (
     Book,
     BookEdition,
     BookGroup,
     DollarBet,
+    GroupAnalyticsSnapshot,
     MemberStartingPoint,
     UserBookProgress,
 )
+from ..utils.snapshot import decode, encode
 
 logger = logging.getLogger(__name__)
 
 
+# Bump when the analytics context changes shape, to rebuild stored snapshots
+ANALYTICS_DATA_FORMAT = 2
+
+
+def get_analytics_data_format():
+    """
+    Get the data format snapshots are stored in under the current settings
+
+    The site-wide feature flags change which sections are computed, so a
+    snapshot built under other settings is never served.
+    """
+    bets = int(settings.ENABLE_DOLLAR_BETS)
+    kavita = int(settings.KAVITA_ENABLED)
+    plex = int(settings.PLEX_ENABLED)
+    return f"{ANALYTICS_DATA_FORMAT}:{bets}:{kavita}:{plex}"
+
+
 @login_required
 def attribution_analytics(request, group_id):
     """View for displaying analytics about book attributions in a group."""
@@ -33,8 +57,150 @@ def attribution_analytics(request, group_id):
         messages.error(request, "You are not a member of this group.")
         return redirect("home")
 
+    context = get_group_analytics(group)
+    context["group"] = group
+    context["user_directory"] = get_user_directory(group)
+
+    return render(request, "bookclub/attribution_analytics.html", context)
+
+
+def get_group_analytics(group):
+    """
+    Get the analytics for a group from its snapshot
+
+    A snapshot that is behind on changes is still served while the
+    rebuild_analytics_snapshots worker catches up, so a burst of changes
+    doesn't make every view rebuild it. The stale sections are only rebuilt
+    here when there is no snapshot yet, it was stored in another format or
+    under other settings, or it was built more than ANALYTICS_MAX_STALENESS
+    ago.
+    """
+    snapshot, _ = GroupAnalyticsSnapshot.objects.get_or_create(group=group)
+    max_staleness = timedelta(seconds=settings.ANALYTICS_MAX_STALENESS)
+    if snapshot.has_current_format and (
+        snapshot.is_current or snapshot.built_at >= timezone.now() - max_staleness
+    ):
+        return decode(snapshot.data)
+
+    data, _ = refresh_group_analytics(snapshot)
+    return decode(data)
+
+
+def refresh_group_analytics(snapshot, full=False):
+    """
+    Rebuild the out of date sections of a snapshot and store them
+
+    Sections that are current are kept as they are. Everything is rebuilt
+    if `full` is set or the snapshot was stored in another format.
+
+    Returns:
+        tuple: (data, saved). The updated encoded data, and whether it was
+        stored. It isn't when another rebuild stored the snapshot first.
+    """
+    if full or not snapshot.has_current_format:
+        sections = list(GroupAnalyticsSnapshot.SECTION_VERSIONS)
+        data = {}
+    else:
+        sections = snapshot.stale_sections
+        data = dict(snapshot.data)
+
+    # Record the versions read before building, so changes made while
+    # building leave their sections stale
+    built_versions = {}
+    for section in sections:
+        version, built_version = GroupAnalyticsSnapshot.SECTION_VERSIONS[section]
+        built_versions[built_version] = getattr(snapshot, version)
+
+    data.update(encode(build_group_analytics(snapshot.group, sections)))
+
+    # Only save over the snapshot we read, so a rebuild of other sections
+    # that finished in the meantime isn't lost
+    saved = GroupAnalyticsSnapshot.objects.filter(
+        id=snapshot.id, built_at=snapshot.built_at
+    ).update(
+        data=data,
+        data_format=get_analytics_data_format(),
+        built_at=timezone.now(),
+        **built_versions,
+    )
+    return data, bool(saved)
+
+
+def rebuild_group_analytics(groups, full=False):
+    """
+    Rebuild the analytics snapshots for many groups
+
+    Only the sections that are out of date are rebuilt, unless `full`.
+
+    Returns:
+        int: Number of snapshots written
+    """
+    snapshots = {
+        snapshot.group_id: snapshot
+        for snapshot in GroupAnalyticsSnapshot.objects.filter(group__in=groups)
+    }
+    written = 0
+    for group in groups:
+        try:
+            snapshot = snapshots.get(group.id)
+            if snapshot is None:
+                snapshot = GroupAnalyticsSnapshot.objects.create(group=group)
+            snapshot.group = group
+            _, saved = refresh_group_analytics(snapshot, full=full)
+        except Exception as e:
+            # Don't let one group's analytics hold up every other group's
+            logger.exception(
+                f"Error rebuilding analytics for group {group.id}: {str(e)}"
+            )
+            continue
+        written += saved
+    return written
+
+
+def build_group_analytics(group, sections=None):
+    """
+    Compute attribution analytics for a group from scratch
+
+    Args:
+        group: The BookGroup object
+        sections: Names of the sections to compute, see
+            GroupAnalyticsSnapshot.SECTION_VERSIONS. Defaults to all of them.
+    """
+    builders = {
+        "core": build_core_analytics,
+        "dollar_bets": build_dollar_bet_analytics,
+        "media": build_media_analytics,
+    }
+    context = {}
+    for section in sections or builders:
+        context.update(builders[section](group))
+    return context
+
+
+def build_dollar_bet_analytics(group):
+    """Compute the dollar bet section of the analytics"""
+    dollar_bet_stats, dollar_bet_summary, dollar_rivalries = calculate_dollar_bet_stats(
+        group
+    )
+    return {
+        "dollar_bet_stats": dollar_bet_stats,
+        "dollar_bet_summary": dollar_bet_summary,
+        "dollar_rivalries": dollar_rivalries,
+    }
+
+
+def build_media_analytics(group):
+    """Compute the Kavita and Plex section of the analytics"""
+    kavita_stats, plex_stats = calculate_media_stats(group)
+    return {"kavita_stats": kavita_stats, "plex_stats": plex_stats}
+
+
+def build_core_analytics(group):
+    """Compute the picks, ratings, rotation and fairness section of the analytics"""
     # Get all books for this group, ordered by display_order
-    books = group.books.all().order_by("display_order", "created_at")
+    books = list(
+        group.books.select_related("picked_by").order_by("display_order", "created_at")
+    )
 
     # Get group members for attribution analysis
     members = group.members.all()
@@ -54,68 +220,39 @@ def attribution_analytics(request, group_id):
     rating_distribution = [0, 0, 0, 0, 0]  # Count of 1-5 star ratings
     member_ratings = defaultdict(list)  # For tracking each member's ratings
 
-    for book in books:
-        # Get all progress entries for this book
-        progress_entries = UserBookProgress.objects.filter(book=book)
-
-        # Collect all valid ratings (prefer hardcover_rating, fall back to local_rating)
-        ratings = []
-        for entry in progress_entries:
-            rating = None
-            if entry.hardcover_rating is not None:
-                rating = entry.hardcover_rating
-            elif entry.local_rating is not None:
-                rating = entry.local_rating
-
-            if rating is not None:
-                float_rating = float(rating)
-                ratings.append(float_rating)
-
-                # Add to distribution count
-                star_index = min(int(float_rating) - 1, 4)  # 0-4 index for 1-5 stars
-                rating_distribution[star_index] += 1
-
-                # Add to member ratings
-                member_ratings[entry.user.id].append(float_rating)
-
-        # Calculate aggregate ratings if we have any
-        if ratings:
-            book_ratings[book.id] = {
-                "avg_rating": mean(ratings),
-                "median_rating": median(ratings),
-                "count": len(ratings),
-                "ratings": ratings,  # Include all ratings for distribution analysis
-            }
+    # Every rating in the group in one query, preferring hardcover_rating
+    # and falling back to local_rating
+    rated_entries = (
+        UserBookProgress.objects.filter(book__group=group)
+        .annotate(rating=Coalesce("hardcover_rating", "local_rating"))
+        .filter(rating__isnull=False)
+        .order_by("book_id", "id")
+        .values_list("book_id", "user_id", "rating")
+    )
 
-        # Add individual user ratings to the book_ratings
-        user_ratings = {}
-        for entry in progress_entries:
-            user_id = entry.user.id
-            rating = None
-
-            # Use the same rating preference as above
-            if entry.hardcover_rating is not None:
-                rating = entry.hardcover_rating
-            elif entry.local_rating is not None:
-                rating = entry.local_rating
-
-            if rating is not None:
-                # Also include any comments if they exist
-                comment = None
-                if hasattr(entry, "comment") and entry.comment:
-                    comment = entry.comment
-                elif hasattr(entry, "hardcover_review") and entry.hardcover_review:
-                    comment = entry.hardcover_review
-
-                # Add rating object with optional comment
-                if comment:
-                    user_ratings[user_id] = {"value": float(rating), "comment": comment}
-                else:
-                    user_ratings[user_id] = {"value": float(rating)}
-
-        # Add to book ratings if we have any ratings
-        if ratings:
-            book_ratings[book.id]["user_ratings"] = user_ratings
+    for book_id, user_id, rating in rated_entries:
+        float_rating = float(rating)
+
+        # Add to distribution count
+        star_index = min(int(float_rating) - 1, 4)  # 0-4 index for 1-5 stars
+        rating_distribution[star_index] += 1
+
+        # Add to member ratings
+        member_ratings[user_id].append(float_rating)
+
+        # Add to the book's ratings, including each user's rating
+        rating_data = book_ratings.setdefault(
+            book_id, {"ratings": [], "user_ratings": {}}
+        )
+        rating_data["ratings"].append(float_rating)
+        rating_data["user_ratings"][user_id] = {"value": float_rating}
+
+    # Calculate aggregate ratings for each rated book
+    for rating_data in book_ratings.values():
+        ratings = rating_data["ratings"]
+        rating_data["avg_rating"] = mean(ratings)
+        rating_data["median_rating"] = median(ratings)
+        rating_data["count"] = len(ratings)
 
     for book in books:
         if book.is_collective_pick:
@@ -263,41 +400,38 @@ def attribution_analytics(request, group_id):
         if has_any_books:
             break
 
-    # Add calculation of dollar bet statistics
-    dollar_bet_stats, dollar_bet_summary, dollar_rivalries = calculate_dollar_bet_stats(
-        group
-    )
+    return {
+        "member_stats": member_stats,
+        "collective_count": collective_count,
+        "unattributed_count": unattributed_count,
+        "total_books": len(books),
+        "book_sequence": book_sequence,
+        "sorted_book_sequence": sorted_book_sequence,
+        "has_any_books": has_any_books,
+        "rotation_analysis": rotation_analysis,
+        "fairness_metrics": fairness_metrics,
+        "next_picker": next_picker,
+        "group_rating_stats": group_rating_stats,
+        "member_rating_stats": member_rating_stats,
+        "rating_distribution": (
+            rating_distribution if group_rating_stats else [0, 0, 0, 0, 0]
+        ),
+    }
 
-    # Add calculation of media statistics
-    kavita_stats, plex_stats = calculate_media_stats(group)
 
-    return render(
-        request,
-        "bookclub/attribution_analytics.html",
-        {
-            "group": group,
-            "member_stats": member_stats,
-            "collective_count": collective_count,
-            "unattributed_count": unattributed_count,
-            "total_books": books.count(),
-            "book_sequence": book_sequence,
-            "sorted_book_sequence": sorted_book_sequence,
-            "has_any_books": has_any_books,
-            "rotation_analysis": rotation_analysis,
-            "fairness_metrics": fairness_metrics,
-            "next_picker": next_picker,
-            "group_rating_stats": group_rating_stats,
-            "member_rating_stats": member_rating_stats,
-            "rating_distribution": (
-                rating_distribution if group_rating_stats else [0, 0, 0, 0, 0]
-            ),
-            "dollar_bet_stats": dollar_bet_stats,
-            "dollar_bet_summary": dollar_bet_summary,
-            "dollar_rivalries": dollar_rivalries,
-            "kavita_stats": kavita_stats,
-            "plex_stats": plex_stats,
-        },
-    )
+def get_user_directory(group):
+    """
+    Map the ID of every user the analytics can mention to their username
+
+    Covers current members plus anyone who picked or rated one of the
+    group's books, so former members resolve without extra queries too.
+    """
+    users = User.objects.filter(
+        Q(book_groups=group)
+        | Q(id__in=group.books.values("picked_by"))
+        | Q(id__in=UserBookProgress.objects.filter(book__group=group).values("user"))
+    ).distinct()
+    return dict(users.values_list("id", "username"))
 
 
 def analyze_rotation(book_sequence, members, group):
@@ -539,37 +673,44 @@ def analyze_rotation(book_sequence, members, group):
     }
 
 
+def find_repeated_ngrams(sequence, n, min_count=2):
+    """
+    Find runs of n consecutive items that occur more than once in a sequence
+
+    Each run is hashed once, so this takes O(len(sequence) * n) however many
+    times the patterns repeat. Occurrences are counted without overlapping,
+    so (a, a) occurs twice in a, a, a, a rather than three times.
+
+    Args:
+        sequence (list): Items to search, which must be hashable
+        n (int): Length of the runs to look for
+        min_count (int): Fewest occurrences for a run to be included
+
+    Returns:
+        list: Dicts with the "pattern" tuple, its occurrence "count" and the
+        "positions" it starts at, in order of first occurrence
+    """
+    positions = {}
+    for start in range(len(sequence) - n + 1):
+        gram = tuple(sequence[start : start + n])
+        starts = positions.setdefault(gram, [])
+        if not starts or start >= starts[-1] + n:
+            starts.append(start)
+
+    return [
+        {"pattern": gram, "count": len(starts), "positions": starts}
+        for gram, starts in positions.items()
+        if len(starts) >= min_count
+    ]
+
+
 def detect_sub_patterns(sequence):
     """Detect common sub-patterns in a sequence (pairs or triplets that repeat)."""
-    if len(sequence) < 4:  # Need at least 4 items to find meaningful sub-patterns
-        return {"pairs": [], "triplets": []}  # Return empty dict instead of empty list
-
-    # Look for pairs that appear multiple times
-    pairs = []
-    for i in range(len(sequence) - 1):
-        pair = (sequence[i], sequence[i + 1])
-        # Check if this pair appears elsewhere in the sequence
-        for j in range(i + 2, len(sequence) - 1):
-            if sequence[j] == pair[0] and sequence[j + 1] == pair[1]:
-                pairs.append(pair)
-                break
-
-    # Look for triplets if sequence is long enough
-    triplets = []
-    if len(sequence) >= 6:
-        for i in range(len(sequence) - 2):
-            triplet = (sequence[i], sequence[i + 1], sequence[i + 2])
-            # Check if this triplet appears elsewhere
-            for j in range(i + 3, len(sequence) - 2):
-                if (
-                    sequence[j] == triplet[0]
-                    and sequence[j + 1] == triplet[1]
-                    and sequence[j + 2] == triplet[2]
-                ):
-                    triplets.append(triplet)
-                    break
-
-    return {"pairs": pairs, "triplets": triplets}
+    # A pattern needs room to occur twice without overlapping
+    return {
+        "pairs": find_repeated_ngrams(sequence, 2) if len(sequence) >= 4 else [],
+        "triplets": find_repeated_ngrams(sequence, 3) if len(sequence) >= 6 else [],
+    }
 
 
 def suggest_next_picker(book_sequence, members, group):
@@ -928,15 +1069,23 @@ def calculate_media_stats(group):
     # Get all books for this group
     books = Book.objects.filter(group=group)
 
+    def promoted_editions(flag):
+        # The first promoted edition of each book, in one query
+        editions = {}
+        for edition in BookEdition.objects.filter(
+            book__group=group, **{flag: True}
+        ).order_by("id"):
+            editions.setdefault(edition.book_id, edition)
+        return editions
+
     # Kavita Stats (if enabled)
     if settings.KAVITA_ENABLED:
         # Get books with Kavita editions
         kavita_books = []
+        kavita_editions = promoted_editions("is_kavita_promoted")
         for book in books:
             # Try to find a Kavita-promoted edition
-            kavita_edition = BookEdition.objects.filter(
-                book=book, is_kavita_promoted=True
-            ).first()
+            kavita_edition = kavita_editions.get(book.id)
 
             if kavita_edition and kavita_edition.pages:
                 book_info = {
@@ -965,11 +1114,10 @@ def calculate_media_stats(group):
     if settings.PLEX_ENABLED:
         # Get books with Plex editions
         plex_books = []
+        plex_editions = promoted_editions("is_plex_promoted")
         for book in books:
             # Try to find a Plex-promoted edition
-            plex_edition = BookEdition.objects.filter(
-                book=book, is_plex_promoted=True
-            ).first()
+            plex_edition = plex_editions.get(book.id)
 
             if plex_edition and plex_edition.audio_seconds:
                 book_info = {
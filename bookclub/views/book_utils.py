@@ -13,11 +13,82 @@ from ..models import BookEdition
 logger = logging.getLogger(__name__)
 
 
-def _get_progress_value_for_sorting(comment):
+def get_editions_by_hardcover_id(objects):
+    """
+    Load the editions referenced by comments or progress records in one query
+
+    Returns:
+        dict: BookEdition objects keyed by hardcover_edition_id
+    """
+    edition_ids = {
+        obj.hardcover_edition_id
+        for obj in objects
+        if getattr(obj, "hardcover_edition_id", None)
+    }
+    if not edition_ids:
+        return {}
+
+    return {
+        edition.hardcover_edition_id: edition
+        for edition in BookEdition.objects.filter(hardcover_edition_id__in=edition_ids)
+    }
+
+
+def refresh_comment_progress(comments, batch_size=500):
+    """
+    Recalculate and store normalized progress for a queryset of comments
+
+    Editions are loaded once per batch and rows are written with bulk_update,
+    so this is safe to run over a whole book or the whole table.
+
+    Returns:
+        int: Number of comments updated
+    """
+    updated = 0
+    comments = comments.select_related("book").order_by("id")
+
+    last_id = 0
+    while True:
+        batch = list(comments.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return updated
+
+        editions = get_editions_by_hardcover_id(batch)
+        for comment in batch:
+            comment.normalized_progress = _get_progress_value_for_sorting(
+                comment, editions
+            )
+        comments.model.objects.bulk_update(batch, ["normalized_progress"])
+
+        updated += len(batch)
+        last_id = batch[-1].id
+
+
+def _get_progress_value_for_sorting(comment, editions=None):
     """
     Helper function to convert different progress types to comparable values
     Returns a value between 0 and 100 representing the reading progress
+
+    Pass `editions` from get_editions_by_hardcover_id when scoring many
+    comments, otherwise the edition is looked up with its own query.
     """
+    edition_lookup = []
+
+    def get_edition():
+        # Look the edition up at most once, and only if a branch needs it
+        if not edition_lookup:
+            edition_id = getattr(comment, "hardcover_edition_id", None)
+            if not edition_id:
+                edition = None
+            elif editions is not None:
+                edition = editions.get(edition_id)
+            else:
+                edition = BookEdition.objects.filter(
+                    hardcover_edition_id=edition_id
+                ).first()
+            edition_lookup.append(edition)
+        return edition_lookup[0]
+
     # Prioritize hardcover_percent if available
     if comment.hardcover_percent is not None:
         return float(comment.hardcover_percent)
@@ -25,16 +96,9 @@ def _get_progress_value_for_sorting(comment):
     # Next, try hardcover_current_page if available
     if comment.hardcover_current_page:
         # First check if we have an associated edition with pages
-        if hasattr(comment, "hardcover_edition_id") and comment.hardcover_edition_id:
-            # Try to find the edition
-            from ..models import BookEdition
-
-            edition = BookEdition.objects.filter(
-                hardcover_edition_id=comment.hardcover_edition_id
-            ).first()
-
-            if edition and edition.pages:
-                return (comment.hardcover_current_page / edition.pages) * 100
+        edition = get_edition()
+        if edition and edition.pages:
+            return (comment.hardcover_current_page / edition.pages) * 100
 
         # Fall back to book pages
         if comment.book.pages:
@@ -54,19 +118,9 @@ def _get_progress_value_for_sorting(comment):
             page = int(comment.progress_value)
 
             # First check if we have an associated edition with pages
-            if (
-                hasattr(comment, "hardcover_edition_id")
-                and comment.hardcover_edition_id
-            ):
-                # Try to find the edition
-                from ..models import BookEdition
-
-                edition = BookEdition.objects.filter(
-                    hardcover_edition_id=comment.hardcover_edition_id
-                ).first()
-
-                if edition and edition.pages:
-                    return (page / edition.pages) * 100
+            edition = get_edition()
+            if edition and edition.pages:
+                return (page / edition.pages) * 100
 
             # Fall back to book pages
             if comment.book.pages:
@@ -82,21 +136,11 @@ def _get_progress_value_for_sorting(comment):
         # Use hardcover_current_position if available
         if comment.hardcover_current_position:
             # First check if we have an associated edition with audio seconds
-            if (
-                hasattr(comment, "hardcover_edition_id")
-                and comment.hardcover_edition_id
-            ):
-                # Try to find the edition
-                from ..models import BookEdition
-
-                edition = BookEdition.objects.filter(
-                    hardcover_edition_id=comment.hardcover_edition_id
-                ).first()
-
-                if edition and edition.audio_seconds:
-                    return (
-                        comment.hardcover_current_position / edition.audio_seconds
-                    ) * 100
+            edition = get_edition()
+            if edition and edition.audio_seconds:
+                return (
+                    comment.hardcover_current_position / edition.audio_seconds
+                ) * 100
 
             # Fall back to book audio seconds
             if comment.book.audio_seconds:
@@ -105,25 +149,13 @@ def _get_progress_value_for_sorting(comment):
                 ) * 100
 
         # Try parsing audio progress
-        from .book_utils import parse_audio_progress
-
         try:
             total_seconds = parse_audio_progress(comment.progress_value)
             if total_seconds:
                 # First check if we have an edition with audio seconds
-                if (
-                    hasattr(comment, "hardcover_edition_id")
-                    and comment.hardcover_edition_id
-                ):
-                    # Try to find the edition
-                    from ..models import BookEdition
-
-                    edition = BookEdition.objects.filter(
-                        hardcover_edition_id=comment.hardcover_edition_id
-                    ).first()
-
-                    if edition and edition.audio_seconds:
-                        return (total_seconds / edition.audio_seconds) * 100
+                edition = get_edition()
+                if edition and edition.audio_seconds:
+                    return (total_seconds / edition.audio_seconds) * 100
 
                 # Fall back to book audio seconds
                 if comment.book.audio_seconds:
@@ -214,6 +246,26 @@ def create_or_update_book_edition(book, edition_data):
     return edition
 
 
+def update_book_from_hardcover_data(book, book_data, editions=None):
+    """Apply refreshed Hardcover details (and optionally editions) to a book"""
+    book.title = book_data.get("title", book.title)
+    book.description = book_data.get("description", book.description)
+    book.cover_image_url = book_data.get("cover_image_url", book.cover_image_url)
+    book.url = book_data.get("url", book.url)
+
+    # Update author if available
+    if book_data.get("author"):
+        book.author = book_data["author"].get("name", book.author)
+
+    book.save()
+
+    if editions:
+        for edition_data in editions:
+            create_or_update_book_edition(book, edition_data)
+
+    return book
+
+
 def convert_progress_to_pages(progress_percent, edition=None, book=None):
     """Convert percentage to pages based on edition or book data"""
     if edition and edition.pages:
@@ -252,6 +304,43 @@ def parse_audio_progress(progress_value):
         return None
 
 
+def get_hardcover_position(user_progress):
+    """
+    Get the position to send to Hardcover for a user's progress
+
+    Returns:
+        tuple: (pages, seconds), either or both of which may be None
+    """
+    pages = None
+    seconds = None
+
+    if user_progress.progress_type == "page" and user_progress.progress_value:
+        try:
+            pages = int(user_progress.progress_value)
+        except (ValueError, TypeError):
+            pass
+    elif user_progress.progress_type == "audio":
+        # Use the hardcover_current_position if available
+        if user_progress.hardcover_current_position:
+            seconds = user_progress.hardcover_current_position
+        else:
+            # Fall back to parsing from progress_value
+            seconds = parse_audio_progress(user_progress.progress_value)
+    elif user_progress.progress_type == "percent" and user_progress.normalized_progress:
+        # For percentage, convert to pages or seconds based on edition format
+        progress_percent = user_progress.normalized_progress
+        edition = user_progress.edition
+        if edition:
+            if edition.reading_format_id == 2 and edition.audio_seconds:
+                # Audio format
+                seconds = convert_progress_to_seconds(progress_percent, edition=edition)
+            elif edition.reading_format_id in [1, 4] and edition.pages:
+                # Physical book or ebook
+                pages = convert_progress_to_pages(progress_percent, edition=edition)
+
+    return pages, seconds
+
+
 def sync_progress_to_hardcover(user, book, user_progress, pages=None, seconds=None):
     """Sync reading progress to Hardcover API"""
     from ..hardcover_api import HardcoverAPI  # Import here to avoid circular imports
@@ -368,7 +457,7 @@ def link_progress_to_edition(user_progress, hardcover_edition_id, book, user):
     Try to link user progress to a book edition
     Returns: Boolean indicating whether page reload is needed
     """
-    from ..hardcover_api import HardcoverAPI  # Import here to avoid circular imports
+    from ..edition_cache import get_cached_book_editions, has_cached_editions
 
     try:
         # Check if we already have this edition
@@ -379,11 +468,18 @@ def link_progress_to_edition(user_progress, hardcover_edition_id, book, user):
         logger.debug(f"Linked progress to existing edition ID: {hardcover_edition_id}")
         return False  # No need to reload page
     except BookEdition.DoesNotExist:
-        # Try to fetch and create the edition
+        # Try to fetch and create the edition, going back to Hardcover only if
+        # the editions came from a cache entry that predates the one being
+        # linked. A cache miss has just fetched them.
         try:
-            editions = HardcoverAPI.get_book_editions(book.hardcover_id, user=user)
-            if editions:
-                for edition_data in editions:
+            attempts = (
+                (False, True) if has_cached_editions(book.hardcover_id) else (False,)
+            )
+            for force_refresh in attempts:
+                editions = get_cached_book_editions(
+                    book.hardcover_id, user=user, force_refresh=force_refresh
+                )
+                for edition_data in editions or []:
                     if str(edition_data["id"]) == str(hardcover_edition_id):
                         # Create the edition using the helper function
                         edition = create_or_update_book_edition(book, edition_data)
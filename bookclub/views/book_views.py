@@ -15,38 +15,41 @@ from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 
+from ..edition_cache import get_cached_book_editions, store_editions
 from ..forms import BookSearchForm, CommentForm
-from ..hardcover_api import HardcoverAPI
-from ..kavita_api import update_kavita_info_for_book
+from ..hardcover_api import HardcoverAPI, HardcoverBatch
+from ..link_resolver import enqueue_link_resolution
 from ..models import (
     Book,
     BookEdition,
     BookGroup,
     Comment,
     CommentReaction,
+    HardcoverProgressSync,
     User,
     UserBookProgress,
 )
-from ..notifications import send_push_notification
-from ..plex_api import update_plex_info_for_book
+from ..notifications import queue_push_notifications
+from ..progress_sync import enqueue_progress_sync
+from ..search_cache import search_books as search_books_cached
 from ..utils.storage import is_auto_sync_enabled
 from .book_utils import (
     _get_progress_value_for_sorting,
-    convert_progress_to_pages,
-    convert_progress_to_seconds,
     create_or_update_book_edition,
     get_redirect_url_with_params,
     link_progress_to_edition,
-    parse_audio_progress,
     process_hardcover_edition_data,
     process_progress_from_request,
-    sync_progress_to_hardcover,
+    update_book_from_hardcover_data,
 )
 from .comment_utils import (
+    add_more_replies_cursors,
     add_normalized_progress_to_comments,
+    add_reactions_to_comments,
+    get_top_level_comments,
     handle_comment_reaction,
     handle_reply_to_comment,
-    sort_comments,
+    paginate_comments,
 )
 from .progress_validator import ProgressValidator
 
@@ -58,11 +61,8 @@ def book_detail(request, book_id):
     book = get_object_or_404(Book, id=book_id)
     group = book.group
 
-    if settings.KAVITA_ENABLED and not book.kavita_url:
-        update_kavita_info_for_book(book)
-
-    if settings.PLEX_ENABLED and not book.plex_url:
-        update_plex_info_for_book(book)
+    # Missing Kavita/Plex links are looked up by the resolve_media_links worker
+    enqueue_link_resolution(book)
 
     # Get or create user progress for this book
     user_progress, created = UserBookProgress.objects.get_or_create(
@@ -78,15 +78,19 @@ def book_detail(request, book_id):
     # Get sorting option from request
     sort_by = request.GET.get("sort", "date_desc")
 
-    # Get all comments for this book - but only top-level comments (not replies)
-    comments = book.comments.filter(parent=None)
-
-    # Sort the comments based on the selected option
-    comments = sort_comments(comments, sort_by)
+    # Get the first page of top-level comments (not replies), the rest are
+    # loaded on demand
+    comments, next_comments_cursor = paginate_comments(
+        get_top_level_comments(book), sort_by
+    )
+    add_more_replies_cursors(comments)
 
     # Add normalized progress for spoiler detection
     comments = add_normalized_progress_to_comments(comments)
 
+    # Load the reactions for the whole page, replies included, at once
+    add_reactions_to_comments(comments, request.user)
+
     # Get promoted editions
     kavita_promoted_edition = None
     plex_promoted_edition = None
@@ -187,6 +191,7 @@ def book_detail(request, book_id):
                         {
                             "book": book,
                             "comments": comments,
+                            "next_comments_cursor": next_comments_cursor,
                             "form": form,
                             "current_sort": sort_by,
                             "user_progress": user_progress,
@@ -276,6 +281,7 @@ def book_detail(request, book_id):
     context = {
         "book": book,
         "comments": comments,
+        "next_comments_cursor": next_comments_cursor,
         "form": form,
         "current_sort": sort_by,
         "user_progress": user_progress,
@@ -291,6 +297,9 @@ def book_detail(request, book_id):
         "edition_audio_seconds": edition_audio_seconds,
         "autoSyncEnabled": auto_sync_enabled,
         "has_dollar_bets_enabled": has_dollar_bets_enabled,
+        "hardcover_sync": HardcoverProgressSync.objects.filter(
+            user=request.user, book=book
+        ).first(),
     }
 
     return render(request, "bookclub/book_detail.html", context)
@@ -442,7 +451,7 @@ def search_books(request, group_id):
 
             # Try the search
             try:
-                search_results = HardcoverAPI.search_books(query, user=request.user)
+                search_results = search_books_cached(query, user=request.user)
                 if not search_results:
                     logger.debug("Search returned no results")
             except Exception as e:
@@ -525,17 +534,14 @@ def add_book_to_group(request, group_id, hardcover_id):
         set_active = request.POST.get("set_active") == "on"
         if set_active:
             book.set_active()
-            for member in group.members.all():
-                send_push_notification(
-                    user=member,
-                    title=f"New Active Book in {group.name}",
-                    body=f"'{book.title}' by {book.author} is now the active book.",
-                    url=request.build_absolute_uri(
-                        reverse("book_detail", args=[book.id])
-                    ),
-                    icon=book.cover_image_url if book.cover_image_url else None,
-                    notification_type="new_active_books",
-                )
+            queue_push_notifications(
+                group.members.all(),
+                title=f"New Active Book in {group.name}",
+                body=f"'{book.title}' by {book.author} is now the active book.",
+                url=request.build_absolute_uri(reverse("book_detail", args=[book.id])),
+                icon=book.cover_image_url if book.cover_image_url else None,
+                notification_type="new_active_books",
+            )
 
         messages.success(request, f"'{book.title}' has been added to the group.")
         return redirect("group_detail", group_id=group.id)
@@ -559,7 +565,7 @@ def add_book_to_group(request, group_id, hardcover_id):
 def get_book_editions(request, hardcover_id):
     """API endpoint to get all editions of a book from Hardcover"""
     try:
-        editions = HardcoverAPI.get_book_editions(hardcover_id, user=request.user)
+        editions = get_cached_book_editions(hardcover_id, user=request.user)
         return JsonResponse({"editions": editions})
     except Exception as e:
         logger.exception(f"Error fetching Hardcover editions: {str(e)}")
@@ -582,8 +588,8 @@ def select_edition(request, book_id):
         },
     )
 
-    # Try to get editions from Hardcover
-    editions = HardcoverAPI.get_book_editions(book.hardcover_id, user=request.user)
+    # Get editions from the cache, falling back to Hardcover
+    editions = get_cached_book_editions(book.hardcover_id, user=request.user)
 
     if request.method == "POST":
         edition_id = request.POST.get("edition_id")
@@ -664,6 +670,10 @@ def set_manual_progress(request, book_id):
         except Exception as e:
             logger.exception(f"Error fetching Hardcover progress: {str(e)}")
 
+    hardcover_sync = HardcoverProgressSync.objects.filter(
+        user=request.user, book=book
+    ).first()
+
     if request.method == "POST":
         progress_type = request.POST.get("progress_type")
         progress_value = request.POST.get("progress_value")
@@ -716,6 +726,7 @@ def set_manual_progress(request, book_id):
                     "user_progress": user_progress,
                     "has_hardcover_key": bool(request.user.profile.hardcover_api_key),
                     "hardcover_read_id": hardcover_read_id,
+                    "hardcover_sync": hardcover_sync,
                     "book_pages": book.pages,
                     "book_audio_seconds": book.audio_seconds,
                     "edition_pages": (
@@ -763,68 +774,13 @@ def set_manual_progress(request, book_id):
         # Update normalized progress
         user_progress.save()
 
-        # Push to Hardcover if requested and API key exists
+        # Queue a push to Hardcover if requested and API key exists, so a slow
+        # Hardcover doesn't hold up saving
         if sync_to_hardcover and request.user.profile.hardcover_api_key:
-            # Calculate pages or seconds based on progress type
-            pages = None
-            seconds = None
-
-            if user_progress.progress_type == "page" and user_progress.progress_value:
-                try:
-                    pages = int(user_progress.progress_value)
-                except (ValueError, TypeError):
-                    pass
-            elif user_progress.progress_type == "audio":
-                # Use the hardcover_current_position if available
-                if user_progress.hardcover_current_position:
-                    seconds = user_progress.hardcover_current_position
-                else:
-                    # Fall back to parsing from progress_value
-                    seconds = parse_audio_progress(user_progress.progress_value)
-            elif (
-                user_progress.progress_type == "percent"
-                and user_progress.normalized_progress
-            ):
-                # For percentage, convert to pages or seconds based on edition format
-                progress_percent = user_progress.normalized_progress
-                if user_progress.edition:
-                    if (
-                        user_progress.edition.reading_format_id == 2
-                        and user_progress.edition.audio_seconds
-                    ):
-                        # Audio format
-                        seconds = convert_progress_to_seconds(
-                            progress_percent, edition=user_progress.edition
-                        )
-                    elif (
-                        user_progress.edition.reading_format_id in [1, 4]
-                        and user_progress.edition.pages
-                    ):
-                        # Physical book or ebook
-                        pages = convert_progress_to_pages(
-                            progress_percent, edition=user_progress.edition
-                        )
-
-            # Sync to Hardcover
-            sync_result = sync_progress_to_hardcover(
-                request.user, book, user_progress, pages=pages, seconds=seconds
+            enqueue_progress_sync(request.user, book)
+            messages.success(
+                request, "Progress was updated and will be synced to Hardcover."
             )
-
-            # Handle sync result
-            if sync_result and isinstance(sync_result, dict):
-                if "error" not in sync_result:
-                    messages.success(
-                        request, "Progress was updated and synced to Hardcover."
-                    )
-                else:
-                    messages.warning(
-                        request,
-                        f"Local progress updated but Hardcover sync failed: {sync_result['error']}",
-                    )
-            else:
-                messages.warning(
-                    request, "Local progress updated but Hardcover sync failed."
-                )
         else:
             messages.success(request, "Reading progress updated successfully.")
 
@@ -849,6 +805,7 @@ def set_manual_progress(request, book_id):
             "user_progress": user_progress,
             "has_hardcover_key": bool(request.user.profile.hardcover_api_key),
             "hardcover_read_id": hardcover_read_id,
+            "hardcover_sync": hardcover_sync,
             "book_pages": book_pages,
             "book_audio_seconds": book_audio_seconds,
             "edition_pages": edition_pages,
@@ -906,17 +863,16 @@ def toggle_book_active(request, group_id, book_id):
         book.set_active()
         messages.success(request, f"'{book.title}' is now set as the active book.")
 
-        # Only notify when book becomes active, not when deactivated
-        for member in group.members.all():
-            # Send to all members including the user who made the change
-            send_push_notification(
-                user=member,
-                title=f"New Active Book in {group.name}",
-                body=f"'{book.title}' by {book.author} is now the active book.",
-                url=request.build_absolute_uri(reverse("book_detail", args=[book.id])),
-                icon=book.cover_image_url if book.cover_image_url else None,
-                notification_type="new_active_books",
-            )
+        # Only notify when book becomes active, not when deactivated. All
+        # members are notified, including the user who made the change
+        queue_push_notifications(
+            group.members.all(),
+            title=f"New Active Book in {group.name}",
+            body=f"'{book.title}' by {book.author} is now the active book.",
+            url=request.build_absolute_uri(reverse("book_detail", args=[book.id])),
+            icon=book.cover_image_url if book.cover_image_url else None,
+            notification_type="new_active_books",
+        )
 
     return redirect("group_detail", group_id=group.id)
 
@@ -1030,8 +986,8 @@ def manage_promoted_editions(request, book_id):
     ).first()
     plex_promoted = BookEdition.objects.filter(book=book, is_plex_promoted=True).first()
 
-    # Try to get editions from Hardcover API
-    editions = HardcoverAPI.get_book_editions(book.hardcover_id, user=request.user)
+    # Get editions from the cache, falling back to the Hardcover API
+    editions = get_cached_book_editions(book.hardcover_id, user=request.user)
 
     if request.method == "POST":
         # Check for clear actions
@@ -1246,35 +1202,26 @@ def refresh_book_from_hardcover(request, book_id):
         return redirect("book_detail", book_id=book.id)
 
     try:
-        # Fetch updated book details from Hardcover
-        book_data = HardcoverAPI.get_book_details(book.hardcover_id, user=request.user)
+        # Fetch updated book details and editions from Hardcover in one request
+        with HardcoverBatch(user=request.user) as batch:
+            details = batch.load_book_details(book.hardcover_id)
+            editions = batch.load_book_editions(book.hardcover_id)
 
-        if book_data:
-            # Update book fields
-            book.title = book_data.get("title", book.title)
-            book.description = book_data.get("description", book.description)
-            book.cover_image_url = book_data.get(
-                "cover_image_url", book.cover_image_url
-            )
-            book.url = book_data.get("url", book.url)
-
-            # Update author if available
-            if book_data.get("author"):
-                book.author = book_data["author"].get("name", book.author)
+        book_data = details.value
 
-            book.save()
-
-            # Optionally, refresh editions
-            editions = HardcoverAPI.get_book_editions(
-                book.hardcover_id, user=request.user
-            )
-            if editions:
-                for edition_data in editions:
-                    create_or_update_book_edition(book, edition_data)
+        if book_data:
+            update_book_from_hardcover_data(book, book_data, editions.value)
+            store_editions(book.hardcover_id, editions.value)
 
             messages.success(
                 request, f"Successfully refreshed details for '{book.title}'"
             )
+        elif details.error:
+            messages.error(
+                request,
+                f"Could not retrieve updated book details from Hardcover: "
+                f"{details.error}",
+            )
         else:
             messages.error(
                 request, "Could not retrieve updated book details from Hardcover"
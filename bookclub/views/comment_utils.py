@@ -2,55 +2,253 @@
 Comment and reaction-related utility functions.
 """
 
+import base64
 import json
 import logging
+from datetime import datetime
 
+from django.conf import settings
 from django.contrib import messages
+from django.db import transaction
+from django.db.models import Count, F, Q
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
-from ..models import Comment, CommentReaction
-from .book_utils import _get_progress_value_for_sorting, get_redirect_url_with_params
+from ..models import Comment, CommentReaction, CommentReactionCount
+from .book_utils import (
+    _get_progress_value_for_sorting,
+    get_editions_by_hardcover_id,
+    get_redirect_url_with_params,
+)
 
 logger = logging.getLogger(__name__)
 
+# Reactions are listed in the order of the reaction picker
+REACTION_POSITIONS = {
+    code: position
+    for position, (code, _) in enumerate(CommentReaction.REACTION_CHOICES)
+}
+
 
 def add_normalized_progress_to_comments(comments):
     """Add normalized progress values to comments and their replies for spoiler detection."""
-    for comment in comments:
-        comment.normalized_progress = _get_progress_value_for_sorting(comment)
-        # For each comment, get its replies and add normalized progress to them too
-        for reply in comment.get_replies():
-            reply.normalized_progress = _get_progress_value_for_sorting(reply)
+    comments = list(comments)
+    replies = [reply for comment in comments for reply in comment.get_replies()]
+
+    # Progress is stored on save, only comments from before that was added
+    # and not yet backfilled need calculating here
+    missing = [c for c in comments + replies if c.normalized_progress is None]
+    if missing:
+        editions = get_editions_by_hardcover_id(missing)
+        for comment in missing:
+            comment.normalized_progress = _get_progress_value_for_sorting(
+                comment, editions
+            )
     return comments
 
 
 def sort_comments(comments, sort_by):
-    """Sort comments based on the selected option."""
-    # Convert to list to allow custom sorting
-    comments_list = list(comments.all())
+    """
+    Sort comments based on the selected option.
 
+    Returns an ordered queryset, so callers can slice it for paging.
+    """
     if sort_by == "date_asc":
-        return sorted(comments_list, key=lambda c: c.created_at)
-    elif sort_by == "date_desc":
-        return sorted(comments_list, key=lambda c: c.created_at, reverse=True)
+        return comments.order_by("created_at", "id")
     elif sort_by == "progress_asc":
-        # Sort by progress value in ascending order
-        return sorted(
-            comments_list,
-            key=lambda c: _get_progress_value_for_sorting(c),
-            reverse=False,
-        )
+        # Sort by stored progress value in ascending order
+        return comments.order_by(F("normalized_progress").asc(nulls_first=True), "id")
     elif sort_by == "progress_desc":
-        # Sort by progress value in descending order
-        return sorted(
-            comments_list,
-            key=lambda c: _get_progress_value_for_sorting(c),
-            reverse=True,
-        )
+        # Sort by stored progress value in descending order
+        return comments.order_by(F("normalized_progress").desc(nulls_last=True), "id")
     else:
         # Default to date descending
-        return sorted(comments_list, key=lambda c: c.created_at, reverse=True)
+        return comments.order_by("-created_at", "-id")
+
+
+def _encode_cursor(comment, sort_by):
+    """Encode the sort key of the last comment on a page as an opaque cursor"""
+    if sort_by in ("progress_asc", "progress_desc"):
+        key = comment.normalized_progress
+    else:
+        key = comment.created_at.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([key, comment.id]).encode()).decode()
+
+
+def _decode_cursor(cursor, sort_by):
+    """Decode a cursor from _encode_cursor, or return None if it's invalid"""
+    try:
+        key, comment_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if sort_by not in ("progress_asc", "progress_desc"):
+            key = datetime.fromisoformat(key)
+        elif key is not None:
+            key = float(key)
+        return key, int(comment_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _after_cursor(key, comment_id, sort_by):
+    """Build the filter for rows that come after a cursor in sort_comments order"""
+    if sort_by == "date_asc":
+        return Q(created_at__gt=key) | Q(created_at=key, id__gt=comment_id)
+    if sort_by == "progress_asc":
+        # Comments without stored progress sort first
+        if key is None:
+            return Q(normalized_progress__isnull=True, id__gt=comment_id) | Q(
+                normalized_progress__isnull=False
+            )
+        return Q(normalized_progress__gt=key) | Q(
+            normalized_progress=key, id__gt=comment_id
+        )
+    if sort_by == "progress_desc":
+        # Comments without stored progress sort last
+        if key is None:
+            return Q(normalized_progress__isnull=True, id__gt=comment_id)
+        return (
+            Q(normalized_progress__lt=key)
+            | Q(normalized_progress=key, id__gt=comment_id)
+            | Q(normalized_progress__isnull=True)
+        )
+    return Q(created_at__lt=key) | Q(created_at=key, id__lt=comment_id)
+
+
+def paginate_comments(comments, sort_by, cursor=None, page_size=None):
+    """
+    Get one page of comments using keyset pagination
+
+    Pages continue from the sort key of the last comment on the previous
+    page rather than an offset, so each page costs the same however deep it
+    is and comments posted in between don't shift the pages.
+
+    Args:
+        comments: Queryset of comments to page through
+        sort_by: One of the sort_comments options
+        cursor: Cursor returned with the previous page, or None for the first
+
+    Returns:
+        tuple: (list of comments, cursor for the next page or None)
+    """
+    page_size = page_size or settings.COMMENTS_PAGE_SIZE
+    comments = sort_comments(comments, sort_by)
+
+    if cursor:
+        position = _decode_cursor(cursor, sort_by)
+        if position:
+            comments = comments.filter(_after_cursor(*position, sort_by))
+
+    page = list(comments[: page_size + 1])
+    if len(page) <= page_size:
+        return page, None
+
+    page = page[:page_size]
+    return page, _encode_cursor(page[-1], sort_by)
+
+
+def get_top_level_comments(book):
+    """
+    Get a book's top-level comments ready for rendering a page of them
+
+    Only the first few replies of each comment are loaded, the rest are
+    fetched on demand.
+    """
+    return (
+        book.comments.filter(parent=None)
+        .select_related("user")
+        .annotate(reply_count=Count("replies"))
+        .prefetch_related(Comment.replies_prefetch(settings.COMMENT_REPLIES_PREVIEW))
+    )
+
+
+def add_more_replies_cursors(comments):
+    """Note how many replies were left out of each comment, and where they start"""
+    for comment in comments:
+        shown = comment.get_replies()
+        comment.more_replies_count = getattr(comment, "reply_count", 0) - len(shown)
+        comment.more_replies_cursor = (
+            _encode_cursor(shown[len(shown) - 1], "date_asc") if shown else ""
+        )
+    return comments
+
+
+def add_reactions_to_comments(comments, user, include_replies=True):
+    """
+    Load the reactions for a page of comments in a single query
+
+    Each comment gets a reaction_summary list, in REACTION_CHOICES order, of
+    dicts with the reaction, its count, the usernames of everyone who
+    reacted with it and whether `user` is one of them.
+
+    Args:
+        comments: Comments to load reactions for
+        user: The user viewing the comments
+        include_replies (bool): Also load reactions for each comment's replies
+    """
+    comments = list(comments)
+    targets = list(comments)
+    if include_replies:
+        targets += [reply for comment in comments for reply in comment.get_replies()]
+
+    reactions = {}
+    rows = (
+        CommentReaction.objects.filter(comment_id__in=[c.id for c in targets])
+        .order_by("created_at", "id")
+        .values_list("comment_id", "reaction", "user_id", "user__username")
+    )
+    for comment_id, reaction, user_id, username in rows:
+        reacted = reactions.setdefault(comment_id, {}).setdefault(reaction, [])
+        reacted.append((user_id, username))
+
+    for comment in targets:
+        by_reaction = reactions.get(comment.id, {})
+        comment.reaction_summary = [
+            {
+                "reaction": reaction,
+                "count": len(reacted),
+                "usernames": [username for _, username in reacted],
+                "reacted": any(user_id == user.id for user_id, _ in reacted),
+            }
+            for reaction, reacted in sorted(
+                by_reaction.items(),
+                key=lambda item: REACTION_POSITIONS.get(
+                    item[0], len(REACTION_POSITIONS)
+                ),
+            )
+        ]
+    return comments
+
+
+def rebuild_reaction_counts(book_id=None):
+    """
+    Recount the stored reaction counters from the reactions themselves
+
+    Signals keep the counters up to date, this repairs counters written
+    before they did or while they were bypassed, such as by raw SQL.
+
+    Returns:
+        int: Number of counters written
+    """
+    reactions = CommentReaction.objects.all()
+    counters = CommentReactionCount.objects.all()
+    if book_id:
+        reactions = reactions.filter(comment__book_id=book_id)
+        counters = counters.filter(comment__book_id=book_id)
+
+    totals = reactions.values("comment_id", "reaction").annotate(total=Count("id"))
+    with transaction.atomic():
+        counters.delete()
+        created = CommentReactionCount.objects.bulk_create(
+            [
+                CommentReactionCount(
+                    comment_id=row["comment_id"],
+                    reaction=row["reaction"],
+                    count=row["total"],
+                )
+                for row in totals
+            ],
+            batch_size=500,
+        )
+    return len(created)
 
 
 def handle_comment_reaction(request, comment_id):
@@ -65,6 +263,9 @@ def handle_comment_reaction(request, comment_id):
         if not reaction_type:
             return JsonResponse({"error": "Reaction type is required"}, status=400)
 
+        if reaction_type not in REACTION_POSITIONS:
+            return JsonResponse({"error": "Unknown reaction type"}, status=400)
+
         comment = get_object_or_404(Comment, id=comment_id)
         book = comment.book
 
@@ -75,43 +276,42 @@ def handle_comment_reaction(request, comment_id):
                 status=403,
             )
 
-        # Check if the user already has this reaction on the comment
-        existing_reaction = CommentReaction.objects.filter(
-            comment=comment, user=request.user, reaction=reaction_type
-        ).first()
-
-        if existing_reaction:
-            # Remove the reaction if it exists
-            existing_reaction.delete()
-            action = "removed"
-        else:
-            # Add the reaction
-            CommentReaction.objects.create(
+        with transaction.atomic():
+            # Remove the reaction if the user already has it, otherwise add it
+            removed, _ = CommentReaction.objects.filter(
                 comment=comment, user=request.user, reaction=reaction_type
-            )
-            action = "added"
-
-        # Get updated reaction information
-        reactions_data = {}
-
-        # Get all reactions for this comment with user information
-        for reaction in CommentReaction.REACTION_CHOICES:
-            reaction_code = reaction[0]
-
-            # Get users who reacted with this reaction
-            user_reactions = CommentReaction.objects.filter(
-                comment=comment, reaction=reaction_code
-            ).select_related("user")
+            ).delete()
 
-            # Only include in response if there are reactions of this type
-            if user_reactions.exists():
-                reactions_data[reaction_code] = {
-                    "count": user_reactions.count(),
-                    "users": [r.user.username for r in user_reactions],
-                    "current_user_reacted": any(
-                        r.user.id == request.user.id for r in user_reactions
-                    ),
-                }
+            # The reaction counters are kept in step by signals on
+            # CommentReaction
+            if removed:
+                action = "removed"
+            else:
+                CommentReaction.objects.create(
+                    comment=comment, user=request.user, reaction=reaction_type
+                )
+                action = "added"
+
+        # Build the updated reaction information from the counters, who
+        # reacted is fetched separately when someone asks to see it
+        own_reactions = set(
+            CommentReaction.objects.filter(
+                comment=comment, user=request.user
+            ).values_list("reaction", flat=True)
+        )
+        counts = sorted(
+            CommentReactionCount.objects.filter(
+                comment=comment, count__gt=0
+            ).values_list("reaction", "count"),
+            key=lambda item: REACTION_POSITIONS.get(item[0], len(REACTION_POSITIONS)),
+        )
+        reactions_data = {
+            reaction: {
+                "count": count,
+                "current_user_reacted": reaction in own_reactions,
+            }
+            for reaction, count in counts
+        }
 
         return JsonResponse(
             {
@@ -7,7 +7,7 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 
 from ..models import Book, BookGroup, DollarBet, User
-from ..notifications import send_push_notification
+from ..notifications import queue_push_notifications
 
 
 @login_required
@@ -100,16 +100,14 @@ def create_dollar_bet(request, book_id):
         )
 
         # Send notifications to all group members (except the proposer)
-        for member in group.members.all():
-            if member != request.user:  # Don't notify the proposer
-                send_push_notification(
-                    user=member,
-                    title=f"New Dollar Bet in {group.name}",
-                    body=f"{request.user.username} proposed: \"{description[:50]}{'...' if len(description) > 50 else ''}\"",
-                    url=request.build_absolute_uri(f"/books/{book.id}/?tab=bets"),
-                    icon=book.cover_image_url if book.cover_image_url else None,
-                    notification_type="new_dollar_bets",
-                )
+        queue_push_notifications(
+            group.members.exclude(id=request.user.id),
+            title=f"New Dollar Bet in {group.name}",
+            body=f"{request.user.username} proposed: \"{description[:50]}{'...' if len(description) > 50 else ''}\"",
+            url=request.build_absolute_uri(f"/books/{book.id}/?tab=bets"),
+            icon=book.cover_image_url if book.cover_image_url else None,
+            notification_type="new_dollar_bets",
+        )
 
         # Redirect to book detail with bets tab active
         return redirect(f"/books/{book.id}/?tab=bets")
@@ -173,8 +171,8 @@ def accept_dollar_bet(request, bet_id):
             notification_body = f"{request.user.username} accepted your bet: \"{bet.description[:50]}{'...' if len(bet.description) > 50 else ''}\""
 
         # Notify the proposer that their bet was accepted
-        send_push_notification(
-            user=bet.proposer,
+        queue_push_notifications(
+            [bet.proposer],
             title="Your Dollar Bet was Accepted!",
             body=notification_body,
             url=request.build_absolute_uri(f"/books/{book.id}/?tab=bets"),
@@ -300,15 +298,14 @@ def resolve_dollar_bet(request, bet_id):
                 notification_message = f"The bet about \"{bet.description[:50]}{'...' if len(bet.description) > 50 else ''}\" was ruled inconclusive by {request.user.username}."
 
             # Notify both participants
-            for participant in [bet.proposer, bet.accepter]:
-                send_push_notification(
-                    user=participant,
-                    title="Dollar Bet Ruled Inconclusive",
-                    body=notification_message,
-                    url=request.build_absolute_uri(f"/books/{book.id}/?tab=bets"),
-                    icon=book.cover_image_url if book.cover_image_url else None,
-                    notification_type="bet_resolved",
-                )
+            queue_push_notifications(
+                [bet.proposer, bet.accepter],
+                title="Dollar Bet Ruled Inconclusive",
+                body=notification_message,
+                url=request.build_absolute_uri(f"/books/{book.id}/?tab=bets"),
+                icon=book.cover_image_url if book.cover_image_url else None,
+                notification_type="bet_resolved",
+            )
         else:
             # Regular win/loss resolution
             winner_id = request.POST.get("winner")
@@ -358,8 +355,8 @@ def resolve_dollar_bet(request, bet_id):
             )
 
             # Notify the winner
-            send_push_notification(
-                user=winner,
+            queue_push_notifications(
+                [winner],
                 title=winner_title,
                 body=winner_body,
                 url=request.build_absolute_uri(f"/books/{book.id}/?tab=bets"),
@@ -368,8 +365,8 @@ def resolve_dollar_bet(request, bet_id):
             )
 
             # Notify the loser
-            send_push_notification(
-                user=loser,
+            queue_push_notifications(
+                [loser],
                 title=loser_title,
                 body=loser_body,
                 url=request.build_absolute_uri(f"/books/{book.id}/?tab=bets"),
@@ -515,15 +512,14 @@ def admin_create_dollar_bet(request, book_id):
             notification_body = f"An admin has added you to a bet about \"{description[:50]}{'...' if len(description) > 50 else ''}\" in {group.name}."
 
         # Notify both participants that they've been added to a bet
-        for participant in [proposer, accepter]:
-            send_push_notification(
-                user=participant,
-                title="You've Been Added to a Dollar Bet",
-                body=notification_body,
-                url=request.build_absolute_uri(f"/books/{book.id}/?tab=bets"),
-                icon=book.cover_image_url if book.cover_image_url else None,
-                notification_type="bet_added_to",
-            )
+        queue_push_notifications(
+            [proposer, accepter],
+            title="You've Been Added to a Dollar Bet",
+            body=notification_body,
+            url=request.build_absolute_uri(f"/books/{book.id}/?tab=bets"),
+            icon=book.cover_image_url if book.cover_image_url else None,
+            notification_type="bet_added_to",
+        )
 
         messages.success(
             request, "Dollar bet created successfully between selected members"
@@ -5,7 +5,6 @@ User profile related views
 import json
 import logging
 
-import requests
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
@@ -19,9 +18,13 @@ from ..forms import (
     NotificationPreferencesForm,
     ProfileSettingsForm,
 )
-from ..hardcover_api import HardcoverAPI
+from ..hardcover_api import HardcoverAPI, HardcoverRequestError
 from ..models import BookGroup
-from ..notifications import is_push_enabled, send_push_notification
+from ..notifications import (
+    is_push_enabled,
+    save_push_subscription,
+    send_push_notification,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -45,38 +48,14 @@ def profile_settings(request):
         if form.is_valid():
             api_key = form.cleaned_data["hardcover_api_key"]
 
-            # Only validate if an API key was provided
+            # Only validate if an API key was provided. A successful check
+            # also primes the Hardcover user ID cache for progress syncs.
             if api_key:
-                test_query = """
-                query ValidateAuth {
-                  me {
-                    id
-                    username
-                  }
-                }
-                """
-
-                headers = {"Authorization": f"Bearer {api_key}"}
                 try:
-                    response = requests.post(
-                        HardcoverAPI.BASE_URL,
-                        headers=headers,
-                        json={"query": test_query},
-                        timeout=5,
-                    )
-
-                    data = response.json()
-                    if (
-                        response.status_code == 200
-                        and "data" in data
-                        and "me" in data["data"]
-                    ):
-                        # API key is valid - save will happen below
-                        pass
-                    else:
+                    if HardcoverAPI.validate_api_key(api_key, interactive=True) is None:
                         api_key_valid = False
                         api_key_message = "Invalid API key. Please check and try again."
-                except Exception as e:
+                except HardcoverRequestError as e:
                     api_key_valid = False
                     api_key_message = f"Could not validate API key: {str(e)}"
 
@@ -195,11 +174,16 @@ def push_subscribe(request):
         # Log what we're receiving
         logger.info(f"Received subscription from user {request.user.username}")
 
-        # Store the subscription in the user's profile
+        # Store the subscription alongside the user's other devices
+        save_push_subscription(
+            request.user,
+            subscription_json,
+            user_agent=request.META.get("HTTP_USER_AGENT", ""),
+        )
+
         user_profile = request.user.profile
-        user_profile.push_subscription = json.dumps(subscription_json)
         user_profile.enable_notifications = True
-        user_profile.save()
+        user_profile.save(update_fields=["enable_notifications"])
 
         # Log the update
         logger.info(
@@ -229,16 +213,14 @@ def push_unsubscribe(request):
         data = json.loads(request.body.decode("utf-8"))
         endpoint = data.get("endpoint")
 
-        # Find and update the user's profile
-        user_profile = request.user.profile
+        # Remove this device, leaving the user's other devices subscribed
+        request.user.push_subscriptions.filter(endpoint=endpoint).delete()
 
-        # Clear the subscription if it matches the endpoint
-        if user_profile.push_subscription:
-            stored_subscription = json.loads(user_profile.push_subscription)
-            if stored_subscription.get("endpoint") == endpoint:
-                user_profile.push_subscription = None
-                user_profile.enable_notifications = False
-                user_profile.save()
+        # Turn notifications off once the last device is gone
+        if not request.user.push_subscriptions.exists():
+            user_profile = request.user.profile
+            user_profile.enable_notifications = False
+            user_profile.save(update_fields=["enable_notifications"])
 
         return JsonResponse({"status": "success"})
     except Exception as e:
@@ -260,7 +242,10 @@ def test_push_notification(request):
     user_profile = request.user.profile
 
     # Check if the user has enabled notifications
-    if not user_profile.enable_notifications or not user_profile.push_subscription:
+    if (
+        not user_profile.enable_notifications
+        or not request.user.push_subscriptions.exists()
+    ):
         return JsonResponse(
             {"status": "error", "message": "Notifications not enabled"}, status=400
         )
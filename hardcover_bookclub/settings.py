@@ -109,6 +109,21 @@ if os.environ.get("DB_ENGINE") == "postgresql":
     }
 
 
+# Cache
+# Local memory by default. start.sh switches to the database cache so cached
+# Hardcover data survives restarts and is shared between gunicorn workers; set
+# DJANGO_CACHE_BACKEND to opt in elsewhere (run `createcachetable` first)
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("DJANGO_CACHE_LOCATION", "bookclub_cache"),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -239,16 +254,92 @@ os.makedirs(os.path.join(BASE_DIR, "logs"), exist_ok=True)
 
 # Integration Settings
 
+# Hardcover API connection pool
+HARDCOVER_POOL_SIZE = int(os.environ.get("HARDCOVER_POOL_SIZE", 10))
+HARDCOVER_CONNECT_TIMEOUT = float(os.environ.get("HARDCOVER_CONNECT_TIMEOUT", 5))
+HARDCOVER_READ_TIMEOUT = float(os.environ.get("HARDCOVER_READ_TIMEOUT", 30))
+HARDCOVER_MAX_RETRIES = int(os.environ.get("HARDCOVER_MAX_RETRIES", 3))
+# Single attempt limit for checks a user is waiting on, like API key validation
+HARDCOVER_VALIDATE_TIMEOUT = float(os.environ.get("HARDCOVER_VALIDATE_TIMEOUT", 5))
+HARDCOVER_RETRY_BACKOFF = float(os.environ.get("HARDCOVER_RETRY_BACKOFF", 0.5))
+
+# Edition cache: entries older than MAX_AGE are served while being refreshed
+# in the background, and dropped entirely after TTL (seconds)
+HARDCOVER_EDITION_CACHE_MAX_AGE = int(
+    os.environ.get("HARDCOVER_EDITION_CACHE_MAX_AGE", 60 * 60 * 24)
+)
+HARDCOVER_EDITION_CACHE_TTL = int(
+    os.environ.get("HARDCOVER_EDITION_CACHE_TTL", 60 * 60 * 24 * 30)
+)
+
+# Book search cache (per process LRU with a TTL in seconds)
+SEARCH_RESULTS_PER_PAGE = int(os.environ.get("SEARCH_RESULTS_PER_PAGE", 10))
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", 256))
+SEARCH_CACHE_TTL = int(os.environ.get("SEARCH_CACHE_TTL", 60 * 10))
+SEARCH_WAIT_TIMEOUT = float(os.environ.get("SEARCH_WAIT_TIMEOUT", 30))
+
+# Maximum number of lookups merged into one batched Hardcover query
+HARDCOVER_BATCH_SIZE = int(os.environ.get("HARDCOVER_BATCH_SIZE", 25))
+
+# How long to remember the Hardcover user ID behind each API key (seconds)
+HARDCOVER_USER_ID_CACHE_TTL = int(
+    os.environ.get("HARDCOVER_USER_ID_CACHE_TTL", 60 * 60 * 24)
+)
+
 # Kavita integration
 KAVITA_BASE_URL = os.environ.get("KAVITA_BASE_URL", "")
 KAVITA_API_KEY = os.environ.get("KAVITA_API_KEY", "")
 KAVITA_ENABLED = bool(KAVITA_BASE_URL and KAVITA_API_KEY)
+KAVITA_POOL_SIZE = int(os.environ.get("KAVITA_POOL_SIZE", 4))
+KAVITA_CONNECT_TIMEOUT = float(os.environ.get("KAVITA_CONNECT_TIMEOUT", 5))
+KAVITA_READ_TIMEOUT = float(os.environ.get("KAVITA_READ_TIMEOUT", 15))
+# Fallback lifetime for Kavita tokens that don't carry an expiry (seconds)
+KAVITA_TOKEN_TTL = int(os.environ.get("KAVITA_TOKEN_TTL", 60 * 60))
 
 # Plex integration
 PLEX_BASE_URL = os.environ.get("PLEX_BASE_URL", "")
 PLEX_TOKEN = os.environ.get("PLEX_TOKEN", "")
 PLEX_LIBRARY_NAME = os.environ.get("PLEX_LIBRARY_NAME", "")
 PLEX_ENABLED = bool(PLEX_BASE_URL and PLEX_TOKEN and PLEX_LIBRARY_NAME)
+PLEX_TIMEOUT = int(os.environ.get("PLEX_TIMEOUT", 15))
+# Re-check the cached Plex connection after it has been idle this long (seconds)
+PLEX_HEALTH_CHECK_INTERVAL = int(os.environ.get("PLEX_HEALTH_CHECK_INTERVAL", 300))
+
+# Background Kavita/Plex link resolution (seconds)
+MEDIA_LINK_POLL_INTERVAL = int(os.environ.get("MEDIA_LINK_POLL_INTERVAL", 30))
+MEDIA_LINK_BATCH_SIZE = int(os.environ.get("MEDIA_LINK_BATCH_SIZE", 20))
+MEDIA_LINK_RETRY_BASE = int(os.environ.get("MEDIA_LINK_RETRY_BASE", 60 * 15))
+MEDIA_LINK_RETRY_MAX = int(os.environ.get("MEDIA_LINK_RETRY_MAX", 60 * 60 * 24 * 7))
+# How often the resolver worker re-syncs the local Plex/Kavita library snapshots
+MEDIA_LIBRARY_SYNC_INTERVAL = int(
+    os.environ.get("MEDIA_LIBRARY_SYNC_INTERVAL", 60 * 60)
+)
+# Every Nth library sync is a full one, which drops items removed from
+# Plex/Kavita and picks up edits an incremental sync can miss
+MEDIA_LIBRARY_FULL_SYNC_EVERY = int(os.environ.get("MEDIA_LIBRARY_FULL_SYNC_EVERY", 6))
+# Running jobs older than this are assumed to belong to a dead worker
+MEDIA_LINK_STALE_AFTER = int(os.environ.get("MEDIA_LINK_STALE_AFTER", 60 * 10))
+
+# Background Hardcover progress sync (seconds unless noted)
+HARDCOVER_SYNC_POLL_INTERVAL = int(os.environ.get("HARDCOVER_SYNC_POLL_INTERVAL", 5))
+HARDCOVER_SYNC_BATCH_SIZE = int(os.environ.get("HARDCOVER_SYNC_BATCH_SIZE", 20))
+HARDCOVER_SYNC_MAX_ATTEMPTS = int(os.environ.get("HARDCOVER_SYNC_MAX_ATTEMPTS", 8))
+HARDCOVER_SYNC_RETRY_BASE = int(os.environ.get("HARDCOVER_SYNC_RETRY_BASE", 30))
+HARDCOVER_SYNC_RETRY_MAX = int(os.environ.get("HARDCOVER_SYNC_RETRY_MAX", 60 * 60))
+# Running syncs older than this are assumed to belong to a dead worker
+HARDCOVER_SYNC_STALE_AFTER = int(os.environ.get("HARDCOVER_SYNC_STALE_AFTER", 60 * 10))
+
+# Group analytics snapshots (seconds). After a change the analytics page keeps
+# serving the previous snapshot while the worker rebuilds it, unless that
+# snapshot is older than ANALYTICS_MAX_STALENESS
+ANALYTICS_REBUILD_INTERVAL = int(os.environ.get("ANALYTICS_REBUILD_INTERVAL", 60))
+ANALYTICS_MAX_STALENESS = int(os.environ.get("ANALYTICS_MAX_STALENESS", 60 * 15))
+
+# Discussion paging
+COMMENTS_PAGE_SIZE = int(os.environ.get("COMMENTS_PAGE_SIZE", 20))
+# Replies shown under each comment before "Show more replies"
+COMMENT_REPLIES_PREVIEW = int(os.environ.get("COMMENT_REPLIES_PREVIEW", 3))
+COMMENT_REPLIES_PAGE_SIZE = int(os.environ.get("COMMENT_REPLIES_PAGE_SIZE", 20))
 
 # Feature Flags
 ENABLE_DOLLAR_BETS = os.environ.get("ENABLE_DOLLAR_BETS", "False") == "True"
@@ -260,3 +351,34 @@ VAPID_CONTACT_EMAIL = os.environ.get("VAPID_CONTACT_EMAIL", "your-email@example.
 PUSH_NOTIFICATIONS_ENABLED = bool(
     VAPID_PUBLIC_KEY and VAPID_PRIVATE_KEY and VAPID_CONTACT_EMAIL
 )
+
+# Push notification outbox worker (seconds unless noted)
+PUSH_NOTIFICATION_POLL_INTERVAL = int(
+    os.environ.get("PUSH_NOTIFICATION_POLL_INTERVAL", 5)
+)
+PUSH_NOTIFICATION_BATCH_SIZE = int(os.environ.get("PUSH_NOTIFICATION_BATCH_SIZE", 100))
+# Number of notifications sent to the push services at once
+PUSH_NOTIFICATION_WORKERS = int(os.environ.get("PUSH_NOTIFICATION_WORKERS", 8))
+PUSH_NOTIFICATION_TIMEOUT = int(os.environ.get("PUSH_NOTIFICATION_TIMEOUT", 10))
+PUSH_NOTIFICATION_MAX_ATTEMPTS = int(
+    os.environ.get("PUSH_NOTIFICATION_MAX_ATTEMPTS", 5)
+)
+PUSH_NOTIFICATION_RETRY_BASE = int(os.environ.get("PUSH_NOTIFICATION_RETRY_BASE", 30))
+PUSH_NOTIFICATION_RETRY_MAX = int(
+    os.environ.get("PUSH_NOTIFICATION_RETRY_MAX", 60 * 60)
+)
+# Digest notification types are collected for this long and sent as one push,
+# 0 sends everything immediately
+PUSH_DIGEST_WINDOW = int(os.environ.get("PUSH_DIGEST_WINDOW", 60))
+# Devices are unsubscribed after this many deliveries in a row fail
+PUSH_SUBSCRIPTION_MAX_FAILURES = int(
+    os.environ.get("PUSH_SUBSCRIPTION_MAX_FAILURES", 5)
+)
+# Running notifications older than this are assumed to belong to a dead worker
+PUSH_NOTIFICATION_STALE_AFTER = int(
+    os.environ.get("PUSH_NOTIFICATION_STALE_AFTER", 60 * 5)
+)
+# Sent and skipped notifications are deleted after this long
+PUSH_NOTIFICATION_RETENTION = int(
+    os.environ.get("PUSH_NOTIFICATION_RETENTION", 60 * 60 * 24 * 7)
+)
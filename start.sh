@@ -4,9 +4,14 @@ set -e  # Exit immediately if a command exits with a non-zero status
 cd /app
 echo "Current directory: $(pwd)"
 
+# Share cached Hardcover data between gunicorn workers and across restarts
+export DJANGO_CACHE_BACKEND=${DJANGO_CACHE_BACKEND:-django.core.cache.backends.db.DatabaseCache}
+
 # Run migrations
 echo "Running migrations..."
 python manage.py migrate
+python manage.py createcachetable
+python manage.py backfill_comment_progress
 
 # Admin credentials from environment variables or defaults
 ADMIN_USERNAME=${DJANGO_ADMIN_USERNAME:-admin}
@@ -40,6 +45,22 @@ python manage.py set_group_admin $ADMIN_USERNAME || echo "Could not set admin gr
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
+# Resolve Kavita/Plex links in the background (exits if neither is configured)
+echo "Starting media link resolver..."
+python manage.py resolve_media_links --enqueue-missing &
+
+# Rebuild group analytics snapshots in the background as they go out of date
+echo "Starting analytics snapshot worker..."
+python manage.py rebuild_analytics_snapshots --watch &
+
+# Sync saved reading progress to Hardcover in the background
+echo "Starting Hardcover progress sync worker..."
+python manage.py sync_hardcover_progress &
+
+# Send queued push notifications in the background (exits if push isn't configured)
+echo "Starting push notification worker..."
+python manage.py send_push_notifications &
+
 # Start gunicorn server
 echo "Starting gunicorn server..."
 python -m gunicorn hardcover_bookclub.wsgi:application --bind 0.0.0.0:8000 --timeout 120 --workers 2
\ No newline at end of file